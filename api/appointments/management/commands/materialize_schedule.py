@@ -0,0 +1,78 @@
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.services import (
+    ScheduleMaterializationService, materialize_schedule_slots, MATERIALIZE_DOCTOR_CHUNK_SIZE
+)
+from doctors.services import DEFAULT_SLOT_MINUTES
+
+
+class Command(BaseCommand):
+    help = 'Roll verified doctors\' availability forward into ScheduleSlot rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, default=8, help='Number of weeks to materialize')
+        parser.add_argument('--chunk-size', type=int, default=MATERIALIZE_DOCTOR_CHUNK_SIZE,
+                            help='Doctors processed per chunk')
+        parser.add_argument('--slot-minutes', type=int, default=DEFAULT_SLOT_MINUTES,
+                            help='Slot length in minutes')
+        parser.add_argument('--run-id', help='Identifier used to store progress (defaults to a new UUID)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue the given --run-id from its last completed chunk')
+        parser.add_argument('--async', action='store_true', dest='run_async',
+                            help='Enqueue the Celery task instead of running in-process')
+
+    def handle(self, *args, **options):
+        if options['weeks'] <= 0 or options['chunk_size'] <= 0 or options['slot_minutes'] <= 0:
+            raise CommandError('--weeks, --chunk-size and --slot-minutes must be positive')
+
+        run_id = options['run_id'] or uuid.uuid4().hex
+        start_after_id = 0
+        if options['resume']:
+            if not options['run_id']:
+                raise CommandError('--resume requires --run-id')
+            progress = ScheduleMaterializationService.get_progress(run_id)
+            if not progress:
+                raise CommandError(f'No progress recorded for run {run_id}')
+            if progress.get('finished'):
+                self.stdout.write(self.style.SUCCESS(f'Run {run_id} already finished'))
+                return
+            start_after_id = progress['cursor']
+
+        if options['run_async']:
+            materialize_schedule_slots.delay(
+                run_id=run_id,
+                weeks=options['weeks'],
+                start_after_id=start_after_id,
+                chunk_size=options['chunk_size'],
+                slot_minutes=options['slot_minutes']
+            )
+            self.stdout.write(self.style.SUCCESS(f'Enqueued schedule materialization run {run_id}'))
+            return
+
+        self.stdout.write(f'Materializing {options["weeks"]} weeks of slots (run {run_id})')
+        cursor = start_after_id
+        while cursor is not None:
+            started_at = time.monotonic()
+            chunk = ScheduleMaterializationService.materialize_chunk(
+                weeks=options['weeks'],
+                start_after_id=cursor,
+                chunk_size=options['chunk_size'],
+                slot_minutes=options['slot_minutes']
+            )
+            progress = ScheduleMaterializationService.record_progress(
+                run_id, chunk, time.monotonic() - started_at
+            )
+            cursor = chunk['next_cursor']
+            if chunk['doctors']:
+                self.stdout.write(
+                    f"  {progress['doctors_processed']} doctors, {progress['slots_created']} slots created "
+                    f"of {progress['slots_attempted']} attempted ({progress['slots_per_second']} slots/s), "
+                    f"cursor={progress['cursor']}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {progress['doctors_processed']} doctors, {progress['slots_created']} slots created "
+            f"of {progress['slots_attempted']} attempted in {progress['elapsed_seconds']}s"
+        ))
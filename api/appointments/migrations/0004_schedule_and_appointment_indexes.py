@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(fields=['doctor', 'status', 'start_time'], name='slot_doctor_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['doctor', 'start_time'], name='slot_open_doctor_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['start_time'], name='slot_open_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'status', 'scheduled_at'], name='appt_patient_status_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'status', 'scheduled_at'], name='appt_doctor_status_sched_idx'),
+        ),
+    ]
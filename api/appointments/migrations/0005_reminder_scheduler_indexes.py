@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_schedule_and_appointment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'scheduled_at'], name='appt_status_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentreminder',
+            index=models.Index(fields=['delivery_status', 'created_at'], name='appt_reminder_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentreminder',
+            constraint=models.UniqueConstraint(fields=('appointment', 'reminder_type', 'channel'), name='appt_reminder_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_reminder_scheduler_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
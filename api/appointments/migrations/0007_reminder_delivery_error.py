@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_reminder_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='delivery_error',
+            field=models.TextField(blank=True),
+        ),
+    ]
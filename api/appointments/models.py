@@ -31,6 +31,20 @@ class ScheduleSlot(models.Model):
     class Meta:
         db_table = 'schedule_slot'
         unique_together = ['doctor', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'status', 'start_time'], name='slot_doctor_status_start_idx'),
+            # Partial indexes covering only bookable slots for the public slot listing
+            models.Index(
+                fields=['doctor', 'start_time'],
+                name='slot_open_doctor_start_idx',
+                condition=models.Q(status='open'),
+            ),
+            models.Index(
+                fields=['start_time'],
+                name='slot_open_start_idx',
+                condition=models.Q(status='open'),
+            ),
+        ]
         verbose_name = 'Schedule Slot'
         verbose_name_plural = 'Schedule Slots'
     
@@ -105,6 +119,12 @@ class Appointment(models.Model):
         verbose_name = 'Appointment'
         verbose_name_plural = 'Appointments'
         ordering = ['-scheduled_at']
+        indexes = [
+            models.Index(fields=['patient', 'status', 'scheduled_at'], name='appt_patient_status_sched_idx'),
+            models.Index(fields=['doctor', 'status', 'scheduled_at'], name='appt_doctor_status_sched_idx'),
+            # Reminder scheduler window scans
+            models.Index(fields=['status', 'scheduled_at'], name='appt_status_sched_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_full_name()} with Dr. {self.doctor.full_name} - {self.scheduled_at.strftime('%Y-%m-%d %H:%M')}"
@@ -162,6 +182,8 @@ class AppointmentReminder(models.Model):
     sent_at = models.DateTimeField(null=True, blank=True)
     delivery_status = models.CharField(max_length=20, default='pending')
     delivery_id = models.CharField(max_length=255, blank=True)  # External service ID
+    claimed_at = models.DateTimeField(null=True, blank=True)  # When a tick or worker last took the row
+    delivery_error = models.TextField(blank=True)
     
     # Content
     message_content = models.TextField()
@@ -172,6 +194,15 @@ class AppointmentReminder(models.Model):
         db_table = 'appointments_reminder'
         verbose_name = 'Appointment Reminder'
         verbose_name_plural = 'Appointment Reminders'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['appointment', 'reminder_type', 'channel'],
+                name='appt_reminder_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['delivery_status', 'created_at'], name='appt_reminder_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.appointment} - {self.get_reminder_type_display()} via {self.get_channel_display()}"
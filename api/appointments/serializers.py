@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from django.db import transaction
 from .models import Appointment, ScheduleSlot, AppointmentReminder, AppointmentReschedule
 from users.serializers import UserSerializer
-from doctors.serializers import DoctorSerializer
+from doctors.serializers import DoctorSummarySerializer
+from .services import BookingService
 
 
 class ScheduleSlotSerializer(serializers.ModelSerializer):
@@ -18,7 +20,7 @@ class ScheduleSlotSerializer(serializers.ModelSerializer):
 
 class AppointmentSerializer(serializers.ModelSerializer):
     patient = UserSerializer(read_only=True)
-    doctor = DoctorSerializer(read_only=True)
+    doctor = DoctorSummarySerializer(read_only=True)
     slot = ScheduleSlotSerializer(read_only=True)
     duration_minutes = serializers.ReadOnlyField()
     is_upcoming = serializers.ReadOnlyField()
@@ -55,26 +57,8 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         slot_id = validated_data.pop('slot_id')
         patient = self.context['request'].user
         
-        try:
-            slot = ScheduleSlot.objects.get(id=slot_id, status='open')
-        except ScheduleSlot.DoesNotExist:
-            raise serializers.ValidationError("Selected slot is not available")
-        
-        # Create appointment
-        appointment = Appointment.objects.create(
-            patient=patient,
-            doctor=slot.doctor,
-            slot=slot,
-            consultation_fee=slot.doctor.consultation_fee,
-            scheduled_at=slot.start_time,
-            **validated_data
-        )
-        
-        # Mark slot as booked
-        slot.status = 'booked'
-        slot.save()
-        
-        return appointment
+        # Claims the slot atomically; raises SlotUnavailable (409) if someone else got it
+        return BookingService.book(patient, slot_id, **validated_data)
 
 
 class AppointmentUpdateSerializer(serializers.ModelSerializer):
@@ -115,31 +99,18 @@ class AppointmentRescheduleSerializer(serializers.ModelSerializer):
         new_slot_id = validated_data.pop('new_slot_id')
         requested_by = self.context['request'].user
         
-        try:
-            new_slot = ScheduleSlot.objects.get(id=new_slot_id, status='open')
-        except ScheduleSlot.DoesNotExist:
-            raise serializers.ValidationError("Selected slot is not available")
-        
-        # Create reschedule record
-        reschedule = AppointmentReschedule.objects.create(
-            appointment=appointment,
-            old_slot=appointment.slot,
-            new_slot=new_slot,
-            requested_by=requested_by,
-            **validated_data
-        )
-        
-        # Update appointment
-        old_slot = appointment.slot
-        appointment.slot = new_slot
-        appointment.scheduled_at = new_slot.start_time
-        appointment.save()
-        
-        # Update slot statuses
-        old_slot.status = 'open'
-        old_slot.save()
-        new_slot.status = 'booked'
-        new_slot.save()
+        with transaction.atomic():
+            old_slot = appointment.slot
+            new_slot = BookingService.reschedule(appointment, new_slot_id)
+            
+            # Create reschedule record
+            reschedule = AppointmentReschedule.objects.create(
+                appointment=appointment,
+                old_slot=old_slot,
+                new_slot=new_slot,
+                requested_by=requested_by,
+                **validated_data
+            )
         
         return reschedule
 
@@ -0,0 +1,522 @@
+"""
+Schedule services for appointments
+"""
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import date as date_cls, datetime, timedelta
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.constants import OnConflict
+from django.db.models.sql import InsertQuery
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from celery import group, shared_task
+
+from doctors.models import Doctor, DoctorAvailability
+from doctors.services import SlotService, DEFAULT_SLOT_MINUTES
+from notifications.services import EmailService, SMSService
+from .models import Appointment, AppointmentReminder, ScheduleSlot
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZE_DOCTOR_CHUNK_SIZE = 200
+MATERIALIZE_INSERT_BATCH_SIZE = 2000
+MATERIALIZE_PROGRESS_TIMEOUT = 60 * 60 * 24  # 1 day
+
+# Reminder type -> (lead time before the appointment, how late a missed tick may still send it)
+REMINDER_SCHEDULE = {
+    '24_hour': (timedelta(hours=24), timedelta(hours=1)),
+    '1_hour': (timedelta(hours=1), timedelta(minutes=15)),
+    '15_minute': (timedelta(minutes=15), timedelta(minutes=5)),
+}
+REMINDER_LEAD_TEXT = {
+    '24_hour': 'in 24 hours',
+    '1_hour': 'in 1 hour',
+    '15_minute': 'in 15 minutes',
+}
+REMINDER_CHANNELS = ['email', 'sms']
+REMINDABLE_STATUSES = ['pending', 'confirmed']
+REMINDER_SCAN_CHUNK_SIZE = 1000
+REMINDER_SEND_BATCH_SIZE = 200
+# Upper bound on reminders queued per tick so one tick never outlives its lock
+REMINDER_MAX_PER_TICK = 20000
+REMINDER_TICK_LOCK_KEY = 'appointment_reminders:tick'
+REMINDER_TICK_LOCK_TIMEOUT = 60 * 5  # 5 minutes
+# Queued or sending reminders claimed longer ago than this are assumed lost and reclaimed
+REMINDER_CLAIM_TIMEOUT = timedelta(minutes=15)
+REMINDER_IN_FLIGHT_STATUSES = ['queued', 'sending']
+
+
+class SlotUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Selected slot is not available'
+    default_code = 'slot_unavailable'
+
+
+class BookingService:
+    """Atomic slot booking using a compare-and-set on the slot status"""
+
+    @staticmethod
+    def claim_slot(slot_id: int) -> ScheduleSlot:
+        """
+        Flip an open slot to booked with a single conditional UPDATE.
+
+        Exactly one concurrent caller sees a row count of 1; everyone else fails
+        fast with ``SlotUnavailable`` instead of waiting on a row lock. Must be
+        called inside a transaction so the claim rolls back with the booking.
+        """
+        claimed = ScheduleSlot.objects.filter(id=slot_id, status='open').update(
+            status='booked',
+            updated_at=timezone.now()
+        )
+        if not claimed:
+            raise SlotUnavailable()
+        return ScheduleSlot.objects.select_related('doctor').get(id=slot_id)
+
+    @staticmethod
+    def release_slot(slot_id: int) -> None:
+        """Return a booked slot to the open pool"""
+        ScheduleSlot.objects.filter(id=slot_id, status='booked').update(
+            status='open',
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def book(patient, slot_id: int, **details) -> Appointment:
+        """Claim the slot and create the appointment in one transaction"""
+        with transaction.atomic():
+            slot = BookingService.claim_slot(slot_id)
+            return Appointment.objects.create(
+                patient=patient,
+                doctor=slot.doctor,
+                slot=slot,
+                consultation_fee=slot.doctor.consultation_fee,
+                scheduled_at=slot.start_time,
+                **details
+            )
+
+    @staticmethod
+    def reschedule(appointment: Appointment, new_slot_id: int) -> ScheduleSlot:
+        """Move an appointment to a new slot, claiming it before releasing the old one"""
+        with transaction.atomic():
+            new_slot = BookingService.claim_slot(new_slot_id)
+            BookingService.release_slot(appointment.slot_id)
+            appointment.slot = new_slot
+            appointment.scheduled_at = new_slot.start_time
+            appointment.save(update_fields=['slot', 'scheduled_at', 'updated_at'])
+            return new_slot
+
+    @staticmethod
+    def cancel(appointment: Appointment) -> None:
+        """Cancel an appointment and free its slot"""
+        with transaction.atomic():
+            appointment.status = 'cancelled'
+            appointment.save(update_fields=['status', 'updated_at'])
+            BookingService.release_slot(appointment.slot_id)
+
+
+class ScheduleMaterializationService:
+    """Roll doctor availability forward into ScheduleSlot rows in bulk"""
+
+    @staticmethod
+    def progress_key(run_id: str) -> str:
+        return f'schedule_materialization:{run_id}'
+
+    @staticmethod
+    def get_progress(run_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored progress metrics for a run, if any"""
+        return cache.get(ScheduleMaterializationService.progress_key(run_id))
+
+    @staticmethod
+    def materialize_chunk(
+        weeks: int,
+        start_after_id: int = 0,
+        chunk_size: int = MATERIALIZE_DOCTOR_CHUNK_SIZE,
+        slot_minutes: int = DEFAULT_SLOT_MINUTES,
+        start_date: Optional[date_cls] = None
+    ) -> Dict[str, Any]:
+        """
+        Materialize slots for the next chunk of verified doctors after ``start_after_id``.
+
+        Existing slots are left untouched: rows are inserted with
+        ``ignore_conflicts`` against the (doctor, start_time) unique constraint,
+        so re-running a chunk after a crash is safe. Returns the cursor for the
+        next chunk (``None`` when finished) plus counters for progress reporting:
+        ``slots_attempted`` rows were offered to the insert and ``slots_created``
+        of them were actually inserted.
+        """
+        doctor_ids = list(
+            Doctor.objects.filter(kyc_status='verified', id__gt=start_after_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not doctor_ids:
+            return {'next_cursor': None, 'doctors': 0, 'slots_attempted': 0, 'slots_created': 0}
+
+        availability_by_doctor = defaultdict(dict)
+        for availability in DoctorAvailability.objects.filter(doctor_id__in=doctor_ids, is_available=True):
+            availability_by_doctor[availability.doctor_id][availability.day_of_week] = availability
+
+        tz = timezone.get_current_timezone()
+        now = timezone.now()
+        start_date = start_date or timezone.localdate()
+        days = [start_date + timedelta(days=offset) for offset in range(weeks * 7)]
+        step = timedelta(minutes=slot_minutes)
+
+        slots = []
+        for doctor_id in doctor_ids:
+            schedule = availability_by_doctor.get(doctor_id)
+            if not schedule:
+                continue
+            for day in days:
+                availability = schedule.get(day.weekday())
+                if availability is None:
+                    continue
+                for free_start, free_end in SlotService.working_intervals(availability, day, tz):
+                    cursor = free_start
+                    while cursor + step <= free_end:
+                        if cursor > now:
+                            slots.append(ScheduleSlot(
+                                doctor_id=doctor_id,
+                                start_time=cursor,
+                                end_time=cursor + step,
+                                duration_minutes=slot_minutes,
+                            ))
+                        cursor += step
+
+        created = ScheduleMaterializationService.insert_slots(slots)
+
+        # bulk_create bypasses post_save, so drop cached availability explicitly
+        for doctor_id in availability_by_doctor:
+            SlotService.invalidate(doctor_id)
+
+        return {
+            'next_cursor': doctor_ids[-1],
+            'doctors': len(doctor_ids),
+            'slots_attempted': len(slots),
+            'slots_created': created,
+        }
+
+    @staticmethod
+    def insert_slots(slots: List[ScheduleSlot]) -> int:
+        """
+        Insert slots, skipping ones that already exist, and return how many were inserted.
+
+        This is bulk_create(ignore_conflicts=True) with the statement's row count
+        kept: bulk_create discards it, and counting rows before and after would
+        also count slots a concurrent run inserted.
+        """
+        if not slots:
+            return 0
+        fields = [field for field in ScheduleSlot._meta.concrete_fields if not field.primary_key]
+        batch_size = min(MATERIALIZE_INSERT_BATCH_SIZE, connection.ops.bulk_batch_size(fields, slots))
+        inserted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(slots), batch_size):
+                query = InsertQuery(ScheduleSlot, on_conflict=OnConflict.IGNORE)
+                query.insert_values(fields, slots[start:start + batch_size])
+                for sql, params in query.get_compiler(connection=connection).as_sql():
+                    cursor.execute(sql, params)
+                    inserted += cursor.rowcount
+        return inserted
+
+    @staticmethod
+    def record_progress(run_id: str, chunk: Dict[str, Any], elapsed_seconds: float) -> Dict[str, Any]:
+        """Accumulate chunk counters into the run's progress metrics"""
+        progress = ScheduleMaterializationService.get_progress(run_id) or {
+            'run_id': run_id,
+            'doctors_processed': 0,
+            'slots_attempted': 0,
+            'slots_created': 0,
+            'chunks': 0,
+            'cursor': 0,
+            'elapsed_seconds': 0.0,
+        }
+        progress['doctors_processed'] += chunk['doctors']
+        progress['slots_attempted'] += chunk['slots_attempted']
+        progress['slots_created'] += chunk['slots_created']
+        if chunk['doctors']:
+            progress['chunks'] += 1
+        if chunk['next_cursor'] is not None:
+            progress['cursor'] = chunk['next_cursor']
+        progress['finished'] = chunk['next_cursor'] is None
+        progress['elapsed_seconds'] = round(progress['elapsed_seconds'] + elapsed_seconds, 2)
+        progress['slots_per_second'] = (
+            round(progress['slots_created'] / progress['elapsed_seconds'], 1)
+            if progress['elapsed_seconds'] else None
+        )
+        cache.set(ScheduleMaterializationService.progress_key(run_id), progress, MATERIALIZE_PROGRESS_TIMEOUT)
+        return progress
+
+
+class ReminderService:
+    """
+    Beat-driven appointment reminders.
+
+    Each tick inserts reminder rows for appointments entering a reminder
+    window, claims the pending rows and hands them to delivery tasks in
+    batches. Rows are unique per (appointment, type, channel), so
+    overlapping ticks cannot create duplicates, and every state change is a
+    conditional UPDATE, so no batch is claimed or sent twice.
+    """
+
+    @staticmethod
+    def window(reminder_type: str, now: datetime) -> Tuple[datetime, datetime]:
+        """Appointments scheduled in (start, end] are due for ``reminder_type`` at ``now``"""
+        lead, grace = REMINDER_SCHEDULE[reminder_type]
+        return now + lead - grace, now + lead
+
+    @staticmethod
+    def message(reminder_type: str, appointment: Appointment) -> str:
+        scheduled_at = timezone.localtime(appointment.scheduled_at)
+        return (
+            f"Hi {appointment.patient.first_name}, your appointment with Dr. "
+            f"{appointment.doctor.user.get_full_name()} starts {REMINDER_LEAD_TEXT[reminder_type]}, "
+            f"on {scheduled_at.strftime('%B %d, %Y at %I:%M %p')}."
+        )
+
+    @staticmethod
+    def create_due(now: Optional[datetime] = None) -> int:
+        """Insert reminder rows for appointments inside each reminder window; returns rows attempted"""
+        now = now or timezone.now()
+        attempted = 0
+        for reminder_type in REMINDER_SCHEDULE:
+            start, end = ReminderService.window(reminder_type, now)
+            appointments = (
+                Appointment.objects.filter(
+                    status__in=REMINDABLE_STATUSES,
+                    scheduled_at__gt=start,
+                    scheduled_at__lte=end
+                )
+                # Skip appointments an earlier tick already covered
+                .filter(~Exists(AppointmentReminder.objects.filter(
+                    appointment=OuterRef('pk'), reminder_type=reminder_type
+                )))
+                .select_related('patient', 'doctor__user')
+                .only(
+                    'id', 'scheduled_at', 'patient__first_name', 'patient__email', 'patient__phone',
+                    'doctor__user__first_name', 'doctor__user__last_name'
+                )
+                .order_by('scheduled_at', 'id')
+            )
+            reminders = []
+            for appointment in appointments.iterator(chunk_size=REMINDER_SCAN_CHUNK_SIZE):
+                content = ReminderService.message(reminder_type, appointment)
+                contacts = {'email': appointment.patient.email, 'sms': appointment.patient.phone}
+                reminders.extend(
+                    AppointmentReminder(
+                        appointment_id=appointment.id,
+                        reminder_type=reminder_type,
+                        channel=channel,
+                        message_content=content
+                    )
+                    for channel in REMINDER_CHANNELS if contacts[channel]
+                )
+            AppointmentReminder.objects.bulk_create(
+                reminders, batch_size=REMINDER_SCAN_CHUNK_SIZE, ignore_conflicts=True
+            )
+            attempted += len(reminders)
+        return attempted
+
+    @staticmethod
+    def claimable(now: datetime) -> Q:
+        """Pending reminders, plus queued or sending ones whose claim has gone stale"""
+        return Q(delivery_status='pending') | Q(
+            delivery_status__in=REMINDER_IN_FLIGHT_STATUSES,
+            claimed_at__lt=now - REMINDER_CLAIM_TIMEOUT
+        )
+
+    @staticmethod
+    def claim_pending(
+        batch_size: int = REMINDER_SEND_BATCH_SIZE,
+        limit: int = REMINDER_MAX_PER_TICK,
+        now: Optional[datetime] = None
+    ) -> List[List[int]]:
+        """
+        Move claimable reminders to ``queued`` and return them in send batches.
+
+        Each batch is claimed with a conditional UPDATE that stamps a claim
+        token into ``delivery_id`` (overwritten by the provider id on send)
+        and the claim time into ``claimed_at``, and only rows carrying this
+        tick's token are returned. A concurrent tick that read the same ids
+        gets none of them. Rows left ``queued`` by a tick that died before
+        enqueueing, or a task the broker lost, and rows left ``sending`` by a
+        worker that died, are claimed again once REMINDER_CLAIM_TIMEOUT passes.
+        """
+        now = now or timezone.now()
+        claimable = ReminderService.claimable(now)
+        claimable_ids = list(
+            AppointmentReminder.objects.filter(claimable)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        batches = []
+        for start in range(0, len(claimable_ids), batch_size):
+            token = f'claim:{uuid.uuid4().hex}'
+            AppointmentReminder.objects.filter(
+                claimable, id__in=claimable_ids[start:start + batch_size]
+            ).update(delivery_status='queued', delivery_id=token, claimed_at=now)
+            claimed = list(
+                AppointmentReminder.objects.filter(delivery_id=token).values_list('id', flat=True)
+            )
+            if claimed:
+                batches.append(claimed)
+        return batches
+
+    @staticmethod
+    def _deliver_email(reminders: List[AppointmentReminder]) -> Dict[int, Tuple[bool, str]]:
+        recipients = []
+        for reminder in reminders:
+            appointment = reminder.appointment
+            scheduled_at = timezone.localtime(appointment.scheduled_at)
+            recipients.append((appointment.patient.email, {
+                'patient_name': appointment.patient.get_full_name(),
+                'doctor_name': appointment.doctor.user.get_full_name(),
+                'appointment_date': scheduled_at.strftime('%B %d, %Y'),
+                'appointment_time': scheduled_at.strftime('%I:%M %p'),
+                'appointment_type': appointment.get_appointment_type_display(),
+                'meeting_link': 'N/A',
+            }))
+        # Rendered in one pass and sent over one SMTP connection
+        sent = EmailService.send_template_emails(
+            recipients,
+            subject='Appointment Reminder - Healthcare Platform',
+            template_name='appointment_reminder'
+        )
+        return {
+            reminder.id: (True, '') if success else (False, 'Email delivery failed')
+            for reminder, success in zip(reminders, sent)
+        }
+
+    @staticmethod
+    def _deliver_sms(reminders: List[AppointmentReminder]) -> Dict[int, Tuple[bool, str]]:
+        sent = SMSService.send_many([
+            (reminder.appointment.patient.phone, reminder.message_content) for reminder in reminders
+        ])
+        return {
+            reminder.id: (True, sid) if sid else (False, error)
+            for reminder, (sid, error) in zip(reminders, sent)
+        }
+
+    @staticmethod
+    def send(reminder_ids: Sequence[int]) -> Dict[str, int]:
+        """Deliver one claimed batch and record each reminder's outcome"""
+        counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+        # A redelivered task finds its batch already moved past 'queued'; the
+        # sending token keeps a reclaimed batch from being written back twice
+        token = f'send:{uuid.uuid4().hex}'
+        now = timezone.now()
+        if not AppointmentReminder.objects.filter(
+            id__in=reminder_ids, delivery_status='queued'
+        ).update(delivery_status='sending', delivery_id=token, claimed_at=now):
+            return counts
+
+        reminders = list(
+            AppointmentReminder.objects.filter(delivery_id=token)
+            .select_related('appointment__patient', 'appointment__doctor__user')
+        )
+        # Appointments cancelled (or already started, for a reclaimed reminder) are not reminded
+        def remindable(reminder: AppointmentReminder) -> bool:
+            appointment = reminder.appointment
+            return appointment.status in REMINDABLE_STATUSES and appointment.scheduled_at > now
+
+        active = [reminder for reminder in reminders if remindable(reminder)]
+        skipped_ids = [reminder.id for reminder in reminders if not remindable(reminder)]
+
+        results = {}
+        for channel, deliver in [('email', ReminderService._deliver_email), ('sms', ReminderService._deliver_sms)]:
+            batch = [reminder for reminder in active if reminder.channel == channel]
+            if not batch:
+                continue
+            try:
+                results.update(deliver(batch))
+            except Exception as e:
+                # Fail the channel's rows now rather than leave them in 'sending' until reclaimed
+                logger.error(f"Reminder {channel} delivery failed for {len(batch)} reminders: {str(e)}")
+                results.update({reminder.id: (False, str(e)) for reminder in batch})
+
+        sent_ids = [reminder_id for reminder_id, (success, _) in results.items() if success]
+        failed_ids = [reminder_id for reminder_id, (success, _) in results.items() if not success]
+        claimed = AppointmentReminder.objects.filter(delivery_id=token)
+        claimed.filter(id__in=sent_ids).update(delivery_status='sent', sent_at=timezone.now(), delivery_id='')
+        claimed.filter(id__in=failed_ids).update(delivery_status='failed', delivery_id='')
+        claimed.filter(id__in=skipped_ids).update(delivery_status='skipped', delivery_id='')
+
+        # Per-recipient detail: the provider id of sent SMS rows, the error of failed rows
+        detailed = [reminder for reminder in active if results.get(reminder.id, (False, ''))[1]]
+        for reminder in detailed:
+            success, detail = results[reminder.id]
+            reminder.delivery_id, reminder.delivery_error = (detail, '') if success else ('', detail)
+        AppointmentReminder.objects.bulk_update(detailed, ['delivery_id', 'delivery_error'])
+
+        counts.update(sent=len(sent_ids), failed=len(failed_ids), skipped=len(skipped_ids))
+        return counts
+
+
+# Celery Tasks
+@shared_task
+def materialize_schedule_slots(
+    run_id: str,
+    weeks: int = 8,
+    start_after_id: int = 0,
+    chunk_size: int = MATERIALIZE_DOCTOR_CHUNK_SIZE,
+    slot_minutes: int = DEFAULT_SLOT_MINUTES
+):
+    """Materialize one chunk of doctors, then re-enqueue itself for the next chunk"""
+    started_at = time.monotonic()
+    chunk = ScheduleMaterializationService.materialize_chunk(
+        weeks=weeks,
+        start_after_id=start_after_id,
+        chunk_size=chunk_size,
+        slot_minutes=slot_minutes
+    )
+
+    progress = ScheduleMaterializationService.record_progress(
+        run_id, chunk, time.monotonic() - started_at
+    )
+    logger.info(
+        f"Schedule materialization {run_id}: {progress['doctors_processed']} doctors, "
+        f"{progress['slots_created']} slots created of {progress['slots_attempted']} attempted, "
+        f"cursor={progress['cursor']}"
+    )
+
+    if chunk['next_cursor'] is not None:
+        materialize_schedule_slots.delay(
+            run_id=run_id,
+            weeks=weeks,
+            start_after_id=chunk['next_cursor'],
+            chunk_size=chunk_size,
+            slot_minutes=slot_minutes
+        )
+    return progress
+
+
+@shared_task
+def schedule_appointment_reminders():
+    """Beat entry point: create due reminders and fan their delivery out in batches"""
+    # Overlapping ticks would only re-scan; the lock keeps them from running at all
+    if not cache.add(REMINDER_TICK_LOCK_KEY, True, REMINDER_TICK_LOCK_TIMEOUT):
+        logger.info("Appointment reminder tick skipped: previous tick still running")
+        return None
+    try:
+        created = ReminderService.create_due()
+        batches = ReminderService.claim_pending()
+        if batches:
+            group(send_appointment_reminder_batch.s(batch) for batch in batches).apply_async()
+    finally:
+        cache.delete(REMINDER_TICK_LOCK_KEY)
+
+    queued = sum(len(batch) for batch in batches)
+    logger.info(f"Appointment reminder tick: {created} reminders created, {queued} queued in {len(batches)} batches")
+    return {'created': created, 'queued': queued, 'batches': len(batches)}
+
+
+@shared_task
+def send_appointment_reminder_batch(reminder_ids: List[int]):
+    """Deliver one batch of claimed appointment reminders"""
+    return ReminderService.send(reminder_ids)
@@ -0,0 +1,335 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as time_cls, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doctors.models import Doctor, DoctorAvailability
+from users.models import User
+from .models import Appointment, AppointmentReminder, ScheduleSlot
+from .services import (
+    REMINDER_CLAIM_TIMEOUT, BookingService, ReminderService, ScheduleMaterializationService, SlotUnavailable
+)
+
+CONCURRENT_BOOKINGS = 200
+BOOKING_WORKERS = 32
+
+
+def create_doctor(username='doctor'):
+    user = User.objects.create(username=username, first_name='Greg', last_name='House', role='doctor')
+    return Doctor.objects.create(
+        user=user,
+        registration_number=f'REG-{username}',
+        years_of_experience=5,
+        consultation_fee=50,
+        kyc_status='verified'
+    )
+
+
+def create_slot(doctor, start_time, status='open'):
+    return ScheduleSlot.objects.create(
+        doctor=doctor,
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=30),
+        status=status
+    )
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.doctor = create_doctor()
+        self.start = timezone.now() + timedelta(days=3)
+        self.slot = create_slot(self.doctor, self.start)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_second_booking_of_a_slot_conflicts(self):
+        first = User.objects.create(username='first', role='patient')
+        second = User.objects.create(username='second', role='patient')
+
+        response = self.client_for(first).post(
+            '/api/appointments/', {'slot_id': self.slot.id, 'reason': 'Checkup'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client_for(second).post(
+            '/api/appointments/', {'slot_id': self.slot.id, 'reason': 'Checkup'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Appointment.objects.filter(slot=self.slot).count(), 1)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'booked')
+
+    def test_reschedule_and_cancel_move_slot_status(self):
+        patient = User.objects.create(username='patient', role='patient')
+        new_slot = create_slot(self.doctor, self.start + timedelta(hours=1))
+        appointment = BookingService.book(patient, self.slot.id, reason='Checkup')
+
+        BookingService.reschedule(appointment, new_slot.id)
+        self.slot.refresh_from_db()
+        new_slot.refresh_from_db()
+        self.assertEqual((self.slot.status, new_slot.status), ('open', 'booked'))
+
+        BookingService.cancel(appointment)
+        new_slot.refresh_from_db()
+        self.assertEqual(new_slot.status, 'open')
+        self.assertEqual(Appointment.objects.get(id=appointment.id).status, 'cancelled')
+
+    def test_reschedule_to_taken_slot_keeps_original(self):
+        patient = User.objects.create(username='patient', role='patient')
+        taken = create_slot(self.doctor, self.start + timedelta(hours=1), status='booked')
+        appointment = BookingService.book(patient, self.slot.id, reason='Checkup')
+
+        with self.assertRaises(SlotUnavailable):
+            BookingService.reschedule(appointment, taken.id)
+        appointment.refresh_from_db()
+        self.slot.refresh_from_db()
+        self.assertEqual(appointment.slot_id, self.slot.id)
+        self.assertEqual(self.slot.status, 'booked')
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Hundreds of parallel bookings at one slot: exactly one wins, the rest get a 409"""
+
+    def test_parallel_bookings_have_one_winner(self):
+        doctor = create_doctor()
+        slot = create_slot(doctor, timezone.now() + timedelta(days=3))
+        patients = User.objects.bulk_create([
+            User(username=f'patient{i}', role='patient') for i in range(CONCURRENT_BOOKINGS)
+        ])
+        start = threading.Barrier(BOOKING_WORKERS)
+
+        def book(index):
+            if index < BOOKING_WORKERS:
+                start.wait()
+            try:
+                BookingService.book(patients[index], slot.id, reason='Checkup')
+                return 'booked'
+            except SlotUnavailable as e:
+                return e.status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=BOOKING_WORKERS) as executor:
+            results = list(executor.map(book, range(CONCURRENT_BOOKINGS)))
+
+        self.assertEqual(results.count('booked'), 1)
+        self.assertEqual(results.count(status.HTTP_409_CONFLICT), CONCURRENT_BOOKINGS - 1)
+        self.assertEqual(Appointment.objects.filter(slot=slot).count(), 1)
+        slot.refresh_from_db()
+        self.assertEqual(slot.status, 'booked')
+
+
+class AppointmentQueryCountTests(TestCase):
+    """List and detail endpoints cost the same number of queries for any page size"""
+
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', first_name='Pat', last_name='Smith', role='patient')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        self.booked = 0
+
+    def book(self, count):
+        for _ in range(count):
+            self.booked += 1
+            doctor = create_doctor(f'doctor{self.booked}')
+            slot = create_slot(doctor, timezone.now() + timedelta(days=3, hours=self.booked))
+            BookingService.book(self.patient, slot.id, reason='Checkup')
+            create_slot(doctor, timezone.now() + timedelta(days=4, hours=self.booked))
+
+    def assert_fixed_queries(self, url, expected):
+        for count in (3, 12):
+            self.book(count)
+            path = url() if callable(url) else url
+            with self.assertNumQueries(expected):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_appointment_list(self):
+        self.assert_fixed_queries('/api/appointments/', 2)
+
+    def test_upcoming_appointments(self):
+        self.assert_fixed_queries('/api/appointments/upcoming/', 1)
+
+    def test_appointment_detail(self):
+        self.assert_fixed_queries(lambda: f'/api/appointments/{Appointment.objects.latest("id").id}/', 1)
+
+    def test_slot_list(self):
+        self.assert_fixed_queries('/api/appointments/slots/', 2)
+
+
+class IndexUsageTests(TestCase):
+    """The hot slot and appointment filters are answered from the composite indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = create_doctor()
+        cls.patient = User.objects.create(username='patient', role='patient')
+        now = timezone.now()
+        ScheduleSlot.objects.bulk_create([
+            ScheduleSlot(
+                doctor=cls.doctor,
+                start_time=now + timedelta(minutes=30 * i),
+                end_time=now + timedelta(minutes=30 * i + 30),
+                status='open' if i % 4 else 'booked'
+            )
+            for i in range(5000)
+        ])
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Small test tables would otherwise be seq-scanned regardless of indexes
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_open_slots_for_a_day_use_slot_index(self):
+        day_start = timezone.now() + timedelta(days=1)
+        plan = self.explain(
+            ScheduleSlot.objects.filter(
+                status='open',
+                doctor=self.doctor,
+                start_time__gte=day_start,
+                start_time__lt=day_start + timedelta(days=1)
+            ).order_by('start_time')
+        )
+        self.assertRegex(plan, r'slot_(open_doctor_start|doctor_status_start)_idx')
+
+    def test_upcoming_patient_appointments_use_appointment_index(self):
+        plan = self.explain(
+            Appointment.objects.filter(
+                patient=self.patient,
+                scheduled_at__gt=timezone.now(),
+                status__in=['pending', 'confirmed']
+            )
+        )
+        self.assertIn('appt_patient_status_sched_idx', plan)
+
+    def test_upcoming_doctor_appointments_use_appointment_index(self):
+        plan = self.explain(
+            Appointment.objects.filter(
+                doctor=self.doctor,
+                scheduled_at__gt=timezone.now(),
+                status__in=['pending', 'confirmed']
+            )
+        )
+        self.assertIn('appt_doctor_status_sched_idx', plan)
+
+
+class ReminderReclaimTests(TestCase):
+    """Reminders stranded in queued or sending are claimed and sent again after the timeout"""
+
+    def setUp(self):
+        doctor = create_doctor()
+        patient = User.objects.create(username='patient', first_name='Pat', email='pat@example.com', role='patient')
+        self.now = timezone.now()
+        self.appointment = BookingService.book(
+            patient, create_slot(doctor, self.now + timedelta(hours=1)).id, reason='Checkup'
+        )
+
+    def reminder(self, reminder_type, delivery_status, claimed_at=None):
+        return AppointmentReminder.objects.create(
+            appointment=self.appointment,
+            reminder_type=reminder_type,
+            channel='email',
+            delivery_status=delivery_status,
+            claimed_at=claimed_at,
+            message_content='Reminder'
+        )
+
+    def test_stale_claims_are_reclaimed(self):
+        stale = self.now - REMINDER_CLAIM_TIMEOUT - timedelta(minutes=1)
+        pending = self.reminder('24_hour', 'pending')
+        lost_task = self.reminder('1_hour', 'queued', stale)
+        dead_worker = self.reminder('15_minute', 'sending', stale)
+        self.reminder('booking_confirmation', 'queued', self.now)
+        self.reminder('post_visit', 'sending', self.now)
+
+        batches = ReminderService.claim_pending(now=self.now)
+        self.assertEqual(sorted(sum(batches, [])), sorted([pending.id, lost_task.id, dead_worker.id]))
+        self.assertEqual(ReminderService.claim_pending(now=self.now), [])
+
+        counts = ReminderService.send(batches[0])
+        self.assertEqual(counts['sent'], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(AppointmentReminder.objects.filter(id=lost_task.id, sent_at__isnull=True).exists())
+
+    def test_reclaimed_reminder_for_started_appointment_is_skipped(self):
+        reminder = self.reminder('1_hour', 'queued', self.now - REMINDER_CLAIM_TIMEOUT - timedelta(minutes=1))
+        Appointment.objects.filter(id=self.appointment.id).update(scheduled_at=self.now - timedelta(minutes=5))
+
+        batches = ReminderService.claim_pending(now=self.now)
+        self.assertEqual(ReminderService.send(batches[0])['skipped'], 1)
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.delivery_status, 'skipped')
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class ReminderFailureTests(TestCase):
+    """Failed reminders record the provider error and never stay in 'sending'"""
+
+    def setUp(self):
+        patient = User.objects.create(
+            username='patient', first_name='Pat', email='pat@example.com', phone='+15550100', role='patient'
+        )
+        self.appointment = BookingService.book(
+            patient, create_slot(create_doctor(), timezone.now() + timedelta(hours=1)).id, reason='Checkup'
+        )
+
+    def claim(self, channel):
+        reminder = AppointmentReminder.objects.create(
+            appointment=self.appointment, reminder_type='1_hour', channel=channel, message_content='Reminder'
+        )
+        return reminder, ReminderService.claim_pending()[0]
+
+    def test_sms_error_is_recorded(self):
+        reminder, batch = self.claim('sms')
+        with mock.patch('appointments.services.SMSService.send_many', return_value=[(None, 'Invalid number')]):
+            self.assertEqual(ReminderService.send(batch)['failed'], 1)
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.delivery_status, reminder.delivery_error), ('failed', 'Invalid number'))
+
+    def test_raising_delivery_marks_rows_failed(self):
+        reminder, batch = self.claim('email')
+        with mock.patch('appointments.services.EmailService.send_template_emails', side_effect=OSError('SMTP down')):
+            self.assertEqual(ReminderService.send(batch)['failed'], 1)
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.delivery_status, reminder.delivery_error), ('failed', 'SMTP down'))
+
+
+class ScheduleMaterializationTests(TestCase):
+    """Progress counts the slots actually inserted, not the ones offered to the insert"""
+
+    def test_rerun_counts_only_new_slots(self):
+        cache.clear()
+        doctor = create_doctor()
+        for day in range(7):
+            DoctorAvailability.objects.create(
+                doctor=doctor, day_of_week=day, start_time=time_cls(9), end_time=time_cls(12), break_times=[]
+            )
+        start_date = timezone.localdate() + timedelta(days=1)
+
+        first = ScheduleMaterializationService.materialize_chunk(weeks=1, start_date=start_date)
+        self.assertEqual(first['slots_created'], first['slots_attempted'])
+        self.assertEqual(first['slots_created'], ScheduleSlot.objects.filter(doctor=doctor).count())
+
+        ScheduleSlot.objects.filter(doctor=doctor).order_by('start_time').first().delete()
+        second = ScheduleMaterializationService.materialize_chunk(weeks=1, start_date=start_date)
+        self.assertEqual(second['slots_attempted'], first['slots_attempted'])
+        self.assertEqual(second['slots_created'], 1)
+        self.assertFalse(ScheduleSlot.objects.filter(doctor=doctor, created_at__isnull=True).exists())
+
+        progress = ScheduleMaterializationService.record_progress('run', first, 1.0)
+        progress = ScheduleMaterializationService.record_progress('run', second, 1.0)
+        self.assertEqual(progress['slots_created'], first['slots_created'] + 1)
+        self.assertEqual(progress['slots_attempted'], first['slots_attempted'] * 2)
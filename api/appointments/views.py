@@ -9,8 +9,14 @@ from .serializers import (
     AppointmentSerializer, AppointmentCreateSerializer, AppointmentUpdateSerializer,
     AppointmentListSerializer, AppointmentRescheduleSerializer, ScheduleSlotSerializer
 )
+from .services import BookingService
 from users.permissions import IsPatient, IsDoctor, IsDoctorOrPatient
 
+# Relations read by AppointmentListSerializer / AppointmentSerializer, joined up front
+# so serialization costs a fixed number of queries regardless of page size
+APPOINTMENT_LIST_RELATED = ['doctor__user', 'patient']
+APPOINTMENT_DETAIL_RELATED = ['doctor__user', 'patient__profile', 'slot__doctor__user']
+
 
 class AppointmentListView(generics.ListCreateAPIView):
     """
@@ -29,10 +35,11 @@ class AppointmentListView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         user = self.request.user
+        queryset = Appointment.objects.select_related(*APPOINTMENT_LIST_RELATED)
         if user.is_doctor:
-            return Appointment.objects.filter(doctor=user.doctor_profile)
+            return queryset.filter(doctor=user.doctor_profile)
         elif user.is_patient:
-            return Appointment.objects.filter(patient=user)
+            return queryset.filter(patient=user)
         return Appointment.objects.none()
     
     def perform_create(self, serializer):
@@ -48,10 +55,11 @@ class AppointmentDetailView(generics.RetrieveUpdateAPIView):
     
     def get_queryset(self):
         user = self.request.user
+        queryset = Appointment.objects.select_related(*APPOINTMENT_DETAIL_RELATED)
         if user.is_doctor:
-            return Appointment.objects.filter(doctor=user.doctor_profile)
+            return queryset.filter(doctor=user.doctor_profile)
         elif user.is_patient:
-            return Appointment.objects.filter(patient=user)
+            return queryset.filter(patient=user)
         return Appointment.objects.none()
 
 
@@ -68,7 +76,7 @@ class ScheduleSlotListView(generics.ListAPIView):
         doctor_id = self.request.query_params.get('doctor_id')
         date = self.request.query_params.get('date')
         
-        queryset = ScheduleSlot.objects.filter(status='open')
+        queryset = ScheduleSlot.objects.select_related('doctor__user').filter(status='open')
         
         if doctor_id:
             queryset = queryset.filter(doctor_id=doctor_id)
@@ -76,7 +84,12 @@ class ScheduleSlotListView(generics.ListAPIView):
         if date:
             try:
                 date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-                queryset = queryset.filter(start_time__date=date_obj)
+                # Range filter instead of start_time__date so the (doctor, start_time) indexes apply
+                day_start = timezone.make_aware(datetime.combine(date_obj, datetime.min.time()))
+                queryset = queryset.filter(
+                    start_time__gte=day_start,
+                    start_time__lt=day_start + timedelta(days=1)
+                )
             except ValueError:
                 pass
         
@@ -157,13 +170,8 @@ def cancel_appointment(request, appointment_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update appointment status
-        appointment.status = 'cancelled'
-        appointment.save()
-        
-        # Free up the slot
-        appointment.slot.status = 'open'
-        appointment.slot.save()
+        # Update appointment status and free up the slot
+        BookingService.cancel(appointment)
         
         return Response({
             'message': 'Appointment cancelled successfully'
@@ -265,14 +273,16 @@ def upcoming_appointments(request):
     user = request.user
     now = timezone.now()
     
+    queryset = Appointment.objects.select_related(*APPOINTMENT_LIST_RELATED)
+    
     if user.is_doctor:
-        appointments = Appointment.objects.filter(
+        appointments = queryset.filter(
             doctor=user.doctor_profile,
             scheduled_at__gt=now,
             status__in=['pending', 'confirmed']
         )
     elif user.is_patient:
-        appointments = Appointment.objects.filter(
+        appointments = queryset.filter(
             patient=user,
             scheduled_at__gt=now,
             status__in=['pending', 'confirmed']
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from doctors.services import DoctorSearchService, SEARCH_REBUILD_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized doctor directory search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=SEARCH_REBUILD_CHUNK_SIZE,
+                            help='Doctors indexed per batch')
+
+    def handle(self, *args, **options):
+        indexed = DoctorSearchService.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} doctors'))
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:00
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+SEARCH_TERM_MAX_LENGTH = 100
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def tokenize(text):
+    return [token[:SEARCH_TERM_MAX_LENGTH] for token in SEARCH_TOKEN_RE.findall((text or '').lower())]
+
+
+def backfill_search_index(apps, schema_editor):
+    """Index existing doctors, mirroring DoctorSearchService._build"""
+    Doctor = apps.get_model('doctors', 'Doctor')
+    DoctorSearchIndex = apps.get_model('doctors', 'DoctorSearchIndex')
+    DoctorSearchTerm = apps.get_model('doctors', 'DoctorSearchTerm')
+    DoctorSpecialty = apps.get_model('doctors', 'DoctorSpecialty')
+
+    last_id = 0
+    while True:
+        doctors = list(Doctor.objects.select_related('user').filter(id__gt=last_id).order_by('id')[:BACKFILL_CHUNK_SIZE])
+        if not doctors:
+            return
+        entries, terms, specialty_rows = [], [], []
+        for doctor in doctors:
+            user = doctor.user
+            specialties = sorted({
+                str(specialty).strip()[:SEARCH_TERM_MAX_LENGTH]
+                for specialty in (doctor.specialties or [])
+                if str(specialty).strip()
+            })
+            entries.append(DoctorSearchIndex(
+                doctor=doctor,
+                is_listed=doctor.kyc_status == 'verified' and doctor.is_available_for_consultation,
+                full_name=f'{user.first_name} {user.last_name}'.strip(),
+                clinic_name=doctor.clinic_name,
+                specialties=specialties,
+                years_of_experience=doctor.years_of_experience,
+                consultation_fee=doctor.consultation_fee,
+                average_rating=doctor.average_rating,
+                total_reviews=doctor.total_reviews,
+            ))
+            doctor_terms = set()
+            for text in [user.first_name, user.last_name, doctor.clinic_name, *specialties]:
+                doctor_terms.update(tokenize(text))
+            terms.extend(DoctorSearchTerm(entry_id=doctor.pk, term=term) for term in sorted(doctor_terms))
+            specialty_rows.extend(DoctorSpecialty(entry_id=doctor.pk, name=name) for name in specialties)
+        DoctorSearchIndex.objects.bulk_create(entries)
+        DoctorSearchTerm.objects.bulk_create(terms, batch_size=BACKFILL_CHUNK_SIZE)
+        DoctorSpecialty.objects.bulk_create(specialty_rows, batch_size=BACKFILL_CHUNK_SIZE)
+        last_id = doctors[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorSearchIndex',
+            fields=[
+                ('doctor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='doctors.doctor')),
+                ('is_listed', models.BooleanField(default=False)),
+                ('full_name', models.CharField(max_length=301)),
+                ('clinic_name', models.CharField(blank=True, max_length=255)),
+                ('specialties', models.JSONField(default=list)),
+                ('years_of_experience', models.PositiveIntegerField(default=0)),
+                ('consultation_fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('average_rating', models.DecimalField(decimal_places=2, default=0.0, max_digits=3)),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Doctor Search Entry',
+                'verbose_name_plural': 'Doctor Search Entries',
+                'db_table': 'doctors_search_index',
+                'indexes': [models.Index(fields=['is_listed', 'average_rating'], name='doc_search_listed_rating_idx'), models.Index(fields=['is_listed', 'consultation_fee'], name='doc_search_listed_fee_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorSpecialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=100)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialty_rows', to='doctors.doctorsearchindex')),
+            ],
+            options={
+                'db_table': 'doctors_specialty',
+                'unique_together': {('entry', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=100)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='doctors.doctorsearchindex')),
+            ],
+            options={
+                'db_table': 'doctors_search_term',
+                'unique_together': {('entry', 'term')},
+            },
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:00
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+RATING_CATEGORIES = ['communication', 'treatment', 'punctuality']
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def average(total, count):
+    if not count:
+        return Decimal('0.00')
+    return (Decimal(total) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """Fill the new counters (and refresh the averages) from existing reviews, mirroring DoctorRatingService.reconcile"""
+    Doctor = apps.get_model('doctors', 'Doctor')
+    DoctorReview = apps.get_model('doctors', 'DoctorReview')
+    DoctorSearchIndex = apps.get_model('doctors', 'DoctorSearchIndex')
+
+    fields = ['total_reviews', 'rating_sum', 'average_rating']
+    aggregates = {'total_reviews': Count('id'), 'rating_sum': Sum('rating')}
+    for category in RATING_CATEGORIES:
+        fields += [f'{category}_rating_sum', f'{category}_rating_count', f'average_{category}_rating']
+        aggregates[f'{category}_rating_sum'] = Sum(f'{category}_rating')
+        aggregates[f'{category}_rating_count'] = Count(f'{category}_rating')
+
+    last_id = 0
+    while True:
+        doctors = list(Doctor.objects.filter(id__gt=last_id).order_by('id')[:BACKFILL_CHUNK_SIZE])
+        if not doctors:
+            return
+        last_id = doctors[-1].id
+        rows = {
+            row['doctor_id']: row
+            for row in DoctorReview.objects.filter(doctor_id__in=[doctor.id for doctor in doctors])
+            .values('doctor_id').annotate(**aggregates)
+        }
+        for doctor in doctors:
+            row = rows.get(doctor.id, {})
+            doctor.total_reviews = row.get('total_reviews', 0)
+            doctor.rating_sum = row.get('rating_sum') or 0
+            doctor.average_rating = average(doctor.rating_sum, doctor.total_reviews)
+            for category in RATING_CATEGORIES:
+                total = row.get(f'{category}_rating_sum') or 0
+                count = row.get(f'{category}_rating_count', 0)
+                setattr(doctor, f'{category}_rating_sum', total)
+                setattr(doctor, f'{category}_rating_count', count)
+                setattr(doctor, f'average_{category}_rating', average(total, count))
+        Doctor.objects.bulk_update(doctors, fields)
+        DoctorSearchIndex.objects.bulk_update(
+            [
+                DoctorSearchIndex(doctor_id=doctor.id, average_rating=doctor.average_rating, total_reviews=doctor.total_reviews)
+                for doctor in doctors
+            ],
+            ['average_rating', 'total_reviews']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0003_doctor_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='average_communication_rating',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='average_punctuality_rating',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='average_treatment_rating',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='communication_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='communication_rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='punctuality_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='punctuality_rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='treatment_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='treatment_rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
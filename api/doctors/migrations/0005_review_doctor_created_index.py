@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0004_doctor_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctorreview',
+            index=models.Index(fields=['doctor', '-created_at'], name='review_doctor_created_idx'),
+        ),
+    ]
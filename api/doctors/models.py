@@ -1,7 +1,12 @@
 from django.db import models
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Round
 from django.core.validators import MinValueValidator, MaxValueValidator
 from users.models import User
 
+# Optional per-category ratings on DoctorReview, aggregated onto Doctor
+REVIEW_RATING_CATEGORIES = ['communication', 'treatment', 'punctuality']
+
 
 class Doctor(models.Model):
     """
@@ -45,6 +50,18 @@ class Doctor(models.Model):
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_reviews = models.PositiveIntegerField(default=0)
     
+    # Running totals maintained incrementally by update_rating()
+    rating_sum = models.PositiveIntegerField(default=0)
+    communication_rating_sum = models.PositiveIntegerField(default=0)
+    communication_rating_count = models.PositiveIntegerField(default=0)
+    average_communication_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    treatment_rating_sum = models.PositiveIntegerField(default=0)
+    treatment_rating_count = models.PositiveIntegerField(default=0)
+    average_treatment_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    punctuality_rating_sum = models.PositiveIntegerField(default=0)
+    punctuality_rating_count = models.PositiveIntegerField(default=0)
+    average_punctuality_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -64,6 +81,39 @@ class Doctor(models.Model):
     @property
     def full_name(self):
         return self.user.get_full_name()
+    
+    def update_rating(self, review):
+        """
+        Fold a new review into the rating aggregates with a single atomic UPDATE.
+        
+        Sums and counts are incremented with F() expressions and the averages are
+        derived from the incremented values in the same statement, so concurrent
+        reviews never lose updates and the cost does not depend on review count.
+        """
+        def average(sum_field, count_field, value):
+            return Round(Cast(F(sum_field) + value, FloatField()) / (F(count_field) + 1), 2)
+        
+        updates = {
+            'rating_sum': F('rating_sum') + review.rating,
+            'total_reviews': F('total_reviews') + 1,
+            'average_rating': average('rating_sum', 'total_reviews', review.rating),
+        }
+        for category in REVIEW_RATING_CATEGORIES:
+            value = getattr(review, f'{category}_rating')
+            if value is None:
+                continue
+            updates[f'{category}_rating_sum'] = F(f'{category}_rating_sum') + value
+            updates[f'{category}_rating_count'] = F(f'{category}_rating_count') + 1
+            updates[f'average_{category}_rating'] = average(
+                f'{category}_rating_sum', f'{category}_rating_count', value
+            )
+        
+        Doctor.objects.filter(pk=self.pk).update(**updates)
+        self.refresh_from_db(fields=list(updates))
+        DoctorSearchIndex.objects.filter(doctor_id=self.pk).update(
+            average_rating=self.average_rating,
+            total_reviews=self.total_reviews
+        )
 
 
 class DoctorAvailability(models.Model):
@@ -139,6 +189,66 @@ class DoctorReview(models.Model):
         unique_together = ['doctor', 'patient', 'appointment']
         verbose_name = 'Doctor Review'
         verbose_name_plural = 'Doctor Reviews'
+        indexes = [
+            models.Index(fields=['doctor', '-created_at'], name='review_doctor_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_full_name()} - {self.rating} stars for Dr. {self.doctor.full_name}"
+
+
+class DoctorSearchIndex(models.Model):
+    """
+    Denormalized, listing-ready copy of a doctor used by directory search.
+    Kept in sync by signals; rebuild with ``manage.py rebuild_doctor_search_index``.
+    """
+    doctor = models.OneToOneField(Doctor, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    
+    # Listed doctors are verified and accepting consultations
+    is_listed = models.BooleanField(default=False)
+    
+    full_name = models.CharField(max_length=301)
+    clinic_name = models.CharField(max_length=255, blank=True)
+    specialties = models.JSONField(default=list)
+    years_of_experience = models.PositiveIntegerField(default=0)
+    consultation_fee = models.DecimalField(max_digits=10, decimal_places=2)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    total_reviews = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'doctors_search_index'
+        verbose_name = 'Doctor Search Entry'
+        verbose_name_plural = 'Doctor Search Entries'
+        indexes = [
+            models.Index(fields=['is_listed', 'average_rating'], name='doc_search_listed_rating_idx'),
+            models.Index(fields=['is_listed', 'consultation_fee'], name='doc_search_listed_fee_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Search entry for Dr. {self.full_name}"
+
+
+class DoctorSearchTerm(models.Model):
+    """
+    Lower-cased word tokens (names, clinic, specialties) for prefix search
+    """
+    entry = models.ForeignKey(DoctorSearchIndex, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=100, db_index=True)
+    
+    class Meta:
+        db_table = 'doctors_search_term'
+        unique_together = ['entry', 'term']
+
+
+class DoctorSpecialty(models.Model):
+    """
+    One row per doctor specialty, used for specialty filters and facet counts
+    """
+    entry = models.ForeignKey(DoctorSearchIndex, on_delete=models.CASCADE, related_name='specialty_rows')
+    name = models.CharField(max_length=100, db_index=True)
+    
+    class Meta:
+        db_table = 'doctors_specialty'
+        unique_together = ['entry', 'name']
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Doctor, DoctorAvailability, DoctorReview
+from django.db import transaction
+from .models import Doctor, DoctorAvailability, DoctorReview, DoctorSearchIndex, REVIEW_RATING_CATEGORIES
+from .services import DoctorRatingService
 from users.serializers import UserSerializer
 
 
@@ -24,7 +26,7 @@ class DoctorReviewSerializer(serializers.ModelSerializer):
 class DoctorSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     availability = DoctorAvailabilitySerializer(many=True, read_only=True)
-    reviews = DoctorReviewSerializer(many=True, read_only=True)
+    review_summary = serializers.SerializerMethodField()
     
     class Meta:
         model = Doctor
@@ -32,9 +34,25 @@ class DoctorSerializer(serializers.ModelSerializer):
             'id', 'user', 'registration_number', 'years_of_experience', 'specialties',
             'clinic_name', 'clinic_address', 'consultation_fee', 'kyc_status',
             'is_available_for_consultation', 'max_patients_per_day', 'average_rating',
-            'total_reviews', 'availability', 'reviews', 'created_at'
+            'total_reviews', 'availability', 'review_summary', 'created_at'
         ]
         read_only_fields = ['id', 'average_rating', 'total_reviews', 'created_at']
+    
+    def get_review_summary(self, obj):
+        """
+        Bounded review summary: rating histogram, category averages and the
+        latest few reviews. Full reviews are paginated at /doctors/<id>/reviews/.
+        """
+        return {
+            'total_reviews': obj.total_reviews,
+            'average_rating': str(obj.average_rating),
+            'category_averages': {
+                category: str(getattr(obj, f'average_{category}_rating'))
+                for category in REVIEW_RATING_CATEGORIES
+            },
+            'histogram': DoctorRatingService.histogram(obj.id),
+            'recent': DoctorReviewSerializer(DoctorRatingService.recent_reviews(obj.id), many=True).data,
+        }
 
 
 class DoctorListSerializer(serializers.ModelSerializer):
@@ -56,6 +74,50 @@ class DoctorListSerializer(serializers.ModelSerializer):
         return ', '.join(obj.specialties)
 
 
+class DoctorSummarySerializer(serializers.ModelSerializer):
+    """
+    Slim doctor representation for embedding in other resources
+    """
+    full_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+    
+    class Meta:
+        model = Doctor
+        fields = [
+            'id', 'full_name', 'email', 'specialties', 'years_of_experience',
+            'clinic_name', 'clinic_address', 'consultation_fee', 'average_rating',
+            'total_reviews'
+        ]
+        read_only_fields = fields
+
+
+class DoctorSearchResultSerializer(serializers.ModelSerializer):
+    """
+    Directory search result, served entirely from the search index
+    """
+    id = serializers.IntegerField(source='doctor_id', read_only=True)
+    
+    class Meta:
+        model = DoctorSearchIndex
+        fields = [
+            'id', 'full_name', 'specialties', 'years_of_experience', 'clinic_name',
+            'consultation_fee', 'average_rating', 'total_reviews'
+        ]
+        read_only_fields = fields
+
+
+class DoctorSearchParamsSerializer(serializers.Serializer):
+    """
+    Validates directory search query parameters
+    """
+    q = serializers.CharField(required=False, allow_blank=True)
+    specialty = serializers.ListField(child=serializers.CharField(), required=False)
+    min_fee = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_fee = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    min_rating = serializers.DecimalField(max_digits=3, decimal_places=2, required=False)
+    min_experience = serializers.IntegerField(min_value=0, required=False)
+
+
 class DoctorRegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer for doctor registration
@@ -96,14 +158,15 @@ class DoctorReviewCreateSerializer(serializers.ModelSerializer):
         patient = self.context['patient']
         appointment = self.context['appointment']
         
-        review = DoctorReview.objects.create(
-            doctor=doctor,
-            patient=patient,
-            appointment=appointment,
-            **validated_data
-        )
-        
-        # Update doctor's average rating
-        doctor.update_rating()
+        with transaction.atomic():
+            review = DoctorReview.objects.create(
+                doctor=doctor,
+                patient=patient,
+                appointment=appointment,
+                **validated_data
+            )
+            
+            # Update doctor's average rating
+            doctor.update_rating(review)
         
         return review
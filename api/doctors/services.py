@@ -0,0 +1,551 @@
+"""
+Services for doctor availability slots and directory search
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta, date as date_cls
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, QuerySet, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+from celery import shared_task
+
+from .models import (
+    Doctor, DoctorAvailability, DoctorReview, DoctorSearchIndex, DoctorSearchTerm, DoctorSpecialty,
+    REVIEW_RATING_CATEGORIES
+)
+
+logger = logging.getLogger(__name__)
+
+SLOT_CACHE_TIMEOUT = 60 * 60  # 1 hour
+SLOT_CACHE_PREFIX = 'doctor_slots'
+DEFAULT_SLOT_MINUTES = 30
+
+# Appointment statuses that no longer occupy their slot
+INACTIVE_APPOINTMENT_STATUSES = ['cancelled', 'refunded', 'no_show']
+
+Interval = Tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """Merge overlapping or touching intervals into a sorted, disjoint list"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(free: List[Interval], busy: List[Interval]) -> List[Interval]:
+    """Remove merged busy intervals from merged free intervals in a single sweep"""
+    result: List[Interval] = []
+    busy_index = 0
+    for start, end in free:
+        cursor = start
+        # Skip busy intervals that end before this free interval starts
+        while busy_index < len(busy) and busy[busy_index][1] <= cursor:
+            busy_index += 1
+        index = busy_index
+        while index < len(busy) and busy[index][0] < end:
+            busy_start, busy_end = busy[index]
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            if cursor >= end:
+                break
+            index += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+class SlotService:
+    """Expand doctor availability into bookable time slots"""
+
+    @staticmethod
+    def _version_key(doctor_id: int) -> str:
+        return f'{SLOT_CACHE_PREFIX}:version:{doctor_id}'
+
+    @staticmethod
+    def get_cache_version(doctor_id: int) -> int:
+        """Return the current slot cache version for a doctor"""
+        key = SlotService._version_key(doctor_id)
+        version = cache.get(key)
+        if version is None:
+            version = 1
+            cache.add(key, version, None)
+        return version
+
+    @staticmethod
+    def invalidate(doctor_id: int) -> None:
+        """Invalidate all cached slot days for a doctor by bumping its version"""
+        key = SlotService._version_key(doctor_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+    @staticmethod
+    def _day_key(doctor_id: int, version: int, day: date_cls, slot_minutes: int) -> str:
+        return f'{SLOT_CACHE_PREFIX}:{doctor_id}:v{version}:{slot_minutes}:{day.isoformat()}'
+
+    @staticmethod
+    def working_intervals(availability: DoctorAvailability, day: date_cls, tz) -> List[Interval]:
+        """Build the free intervals for one availability row on a given day, minus breaks"""
+        day_start = timezone.make_aware(datetime.combine(day, availability.start_time), tz)
+        day_end = timezone.make_aware(datetime.combine(day, availability.end_time), tz)
+        if day_end <= day_start:
+            return []
+
+        breaks: List[Interval] = []
+        for break_time in availability.break_times or []:
+            try:
+                break_start = parse_time(break_time['start'])
+                break_end = parse_time(break_time['end'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not break_start or not break_end:
+                continue
+            breaks.append((
+                timezone.make_aware(datetime.combine(day, break_start), tz),
+                timezone.make_aware(datetime.combine(day, break_end), tz),
+            ))
+
+        return subtract_intervals([(day_start, day_end)], merge_intervals(breaks))
+
+    @staticmethod
+    def _compute_days(
+        doctor_id: int,
+        days: List[date_cls],
+        slot_minutes: int
+    ) -> Dict[date_cls, List[Dict]]:
+        """Compute slots for the given days with a fixed number of queries"""
+        from appointments.models import Appointment, ScheduleSlot
+
+        tz = timezone.get_current_timezone()
+        range_start = timezone.make_aware(datetime.combine(min(days), datetime.min.time()), tz)
+        range_end = timezone.make_aware(
+            datetime.combine(max(days) + timedelta(days=1), datetime.min.time()), tz
+        )
+
+        availability_by_day = {
+            availability.day_of_week: availability
+            for availability in DoctorAvailability.objects.filter(doctor_id=doctor_id, is_available=True)
+        }
+
+        # Open slots keep their id so clients can book them directly; everything else is busy
+        open_slots: Dict[datetime, int] = {}
+        busy: List[Interval] = []
+        slot_rows = ScheduleSlot.objects.filter(
+            doctor_id=doctor_id,
+            start_time__lt=range_end,
+            end_time__gt=range_start,
+        ).values_list('id', 'start_time', 'end_time', 'status')
+        for slot_id, start_time, end_time, slot_status in slot_rows:
+            if slot_status == 'open':
+                open_slots[start_time] = slot_id
+            else:
+                busy.append((start_time, end_time))
+
+        appointment_rows = Appointment.objects.filter(
+            doctor_id=doctor_id,
+            scheduled_at__gte=range_start - timedelta(days=1),
+            scheduled_at__lt=range_end,
+        ).exclude(
+            status__in=INACTIVE_APPOINTMENT_STATUSES
+        ).values_list('scheduled_at', 'slot__end_time')
+        for scheduled_at, end_time in appointment_rows:
+            busy.append((scheduled_at, end_time or scheduled_at + timedelta(minutes=slot_minutes)))
+
+        busy = merge_intervals(busy)
+        step = timedelta(minutes=slot_minutes)
+        results: Dict[date_cls, List[Dict]] = {}
+
+        for day in days:
+            availability = availability_by_day.get(day.weekday())
+            if availability is None:
+                results[day] = []
+                continue
+
+            slots = []
+            for free_start, free_end in subtract_intervals(
+                SlotService.working_intervals(availability, day, tz), busy
+            ):
+                cursor = free_start
+                while cursor + step <= free_end:
+                    slots.append({
+                        'start_time': cursor,
+                        'end_time': cursor + step,
+                        'slot_id': open_slots.get(cursor),
+                    })
+                    cursor += step
+            results[day] = slots
+
+        return results
+
+    @staticmethod
+    def get_available_slots(
+        doctor_id: int,
+        start_date: date_cls,
+        end_date: Optional[date_cls] = None,
+        slot_minutes: int = DEFAULT_SLOT_MINUTES
+    ) -> Dict[date_cls, List[Dict]]:
+        """
+        Return bookable slots per day for a date range (inclusive).
+
+        Each day is cached per doctor; cache misses are computed together in a
+        single pass. Slots that have already started are filtered out on read so
+        cached days never go stale as time passes.
+        """
+        end_date = end_date or start_date
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+        version = SlotService.get_cache_version(doctor_id)
+        keys = {day: SlotService._day_key(doctor_id, version, day, slot_minutes) for day in days}
+        cached = cache.get_many(list(keys.values()))
+
+        results: Dict[date_cls, List[Dict]] = {}
+        missing = []
+        for day in days:
+            if keys[day] in cached:
+                results[day] = cached[keys[day]]
+            else:
+                missing.append(day)
+
+        if missing:
+            computed = SlotService._compute_days(doctor_id, missing, slot_minutes)
+            cache.set_many(
+                {keys[day]: slots for day, slots in computed.items()},
+                SLOT_CACHE_TIMEOUT
+            )
+            results.update(computed)
+
+        now = timezone.now()
+        return {
+            day: [slot for slot in results[day] if slot['start_time'] > now]
+            for day in days
+        }
+
+
+PUBLIC_CACHE_TIMEOUT = 60 * 15  # 15 minutes
+PUBLIC_CACHE_PREFIX = 'doctor_public'
+DIRECTORY_SCOPE = 'directory'
+
+
+class DoctorCacheService:
+    """Versioned cache keys for the public doctor endpoints"""
+
+    @staticmethod
+    def _version_key(scope: str) -> str:
+        return f'{PUBLIC_CACHE_PREFIX}:version:{scope}'
+
+    @staticmethod
+    def get_version(scope: str) -> int:
+        """Current version for a doctor id or the directory listing"""
+        key = DoctorCacheService._version_key(scope)
+        version = cache.get(key)
+        if version is None:
+            version = 1
+            cache.add(key, version, None)
+        return version
+
+    @staticmethod
+    def bump(scope: str) -> None:
+        key = DoctorCacheService._version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+    @staticmethod
+    def invalidate(doctor_id: int, directory: bool = True) -> None:
+        """Invalidate a doctor's cached responses (and the directory listing) after commit"""
+        def bump():
+            DoctorCacheService.bump(str(doctor_id))
+            if directory:
+                DoctorCacheService.bump(DIRECTORY_SCOPE)
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def response_key(scope: str, path: str) -> str:
+        version = DoctorCacheService.get_version(scope)
+        digest = hashlib.md5(path.encode('utf-8')).hexdigest()
+        return f'{PUBLIC_CACHE_PREFIX}:{scope}:v{version}:{digest}'
+
+
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+SEARCH_TERM_MAX_LENGTH = 100
+SEARCH_REBUILD_CHUNK_SIZE = 1000
+RATING_FACET_THRESHOLDS = [4, 3, 2, 1]
+
+
+class DoctorSearchService:
+    """Maintain and query the denormalized doctor directory index"""
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [token[:SEARCH_TERM_MAX_LENGTH] for token in SEARCH_TOKEN_RE.findall(text.lower())]
+
+    @staticmethod
+    def _build(doctor: Doctor) -> Tuple[DoctorSearchIndex, List[str], List[str]]:
+        """Return the index row, search terms and specialty names for a doctor"""
+        user = doctor.user
+        specialties = sorted({
+            str(specialty).strip()[:SEARCH_TERM_MAX_LENGTH]
+            for specialty in (doctor.specialties or [])
+            if str(specialty).strip()
+        })
+        entry = DoctorSearchIndex(
+            doctor=doctor,
+            is_listed=doctor.kyc_status == 'verified' and doctor.is_available_for_consultation,
+            full_name=user.get_full_name(),
+            clinic_name=doctor.clinic_name,
+            specialties=specialties,
+            years_of_experience=doctor.years_of_experience,
+            consultation_fee=doctor.consultation_fee,
+            average_rating=doctor.average_rating,
+            total_reviews=doctor.total_reviews,
+        )
+        terms = set()
+        for text in [user.first_name, user.last_name, doctor.clinic_name, *specialties]:
+            terms.update(DoctorSearchService.tokenize(text or ''))
+        return entry, sorted(terms), specialties
+
+    @staticmethod
+    def index_doctors(doctors: Iterable[Doctor]) -> int:
+        """Upsert index rows (and their terms/specialties) for the given doctors"""
+        entries, terms, specialties = [], [], []
+        for doctor in doctors:
+            entry, doctor_terms, doctor_specialties = DoctorSearchService._build(doctor)
+            entries.append(entry)
+            terms.extend(DoctorSearchTerm(entry_id=doctor.pk, term=term) for term in doctor_terms)
+            specialties.extend(DoctorSpecialty(entry_id=doctor.pk, name=name) for name in doctor_specialties)
+        if not entries:
+            return 0
+
+        doctor_ids = [entry.doctor_id for entry in entries]
+        with transaction.atomic():
+            DoctorSearchIndex.objects.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=['doctor'],
+                update_fields=[
+                    'is_listed', 'full_name', 'clinic_name', 'specialties', 'years_of_experience',
+                    'consultation_fee', 'average_rating', 'total_reviews', 'updated_at',
+                ],
+            )
+            DoctorSearchTerm.objects.filter(entry_id__in=doctor_ids).delete()
+            DoctorSpecialty.objects.filter(entry_id__in=doctor_ids).delete()
+            DoctorSearchTerm.objects.bulk_create(terms, batch_size=SEARCH_REBUILD_CHUNK_SIZE)
+            DoctorSpecialty.objects.bulk_create(specialties, batch_size=SEARCH_REBUILD_CHUNK_SIZE)
+        return len(entries)
+
+    @staticmethod
+    def index_doctor(doctor: Doctor) -> None:
+        DoctorSearchService.index_doctors([doctor])
+
+    @staticmethod
+    def rebuild(chunk_size: int = SEARCH_REBUILD_CHUNK_SIZE) -> int:
+        """Re-index every doctor in id-ordered chunks"""
+        indexed = 0
+        last_id = 0
+        while True:
+            doctors = list(
+                Doctor.objects.select_related('user').filter(id__gt=last_id).order_by('id')[:chunk_size]
+            )
+            if not doctors:
+                break
+            indexed += DoctorSearchService.index_doctors(doctors)
+            last_id = doctors[-1].id
+        DoctorSearchIndex.objects.exclude(doctor__in=Doctor.objects.all()).delete()
+        return indexed
+
+    @staticmethod
+    def matching_ids(query: str) -> QuerySet:
+        """Doctor ids whose index terms prefix-match every word of the query"""
+        queryset = DoctorSearchIndex.objects.all()
+        for token in DoctorSearchService.tokenize(query):
+            queryset = queryset.filter(
+                doctor_id__in=DoctorSearchTerm.objects.filter(term__startswith=token).values('entry_id')
+            )
+        return queryset.values('doctor_id')
+
+    @staticmethod
+    def specialty_ids(specialty: str) -> QuerySet:
+        """Doctor ids listing the given specialty"""
+        return DoctorSpecialty.objects.filter(name=specialty).values('entry_id')
+
+    @staticmethod
+    def search(
+        query: Optional[str] = None,
+        specialties: Optional[List[str]] = None,
+        min_fee: Optional[Any] = None,
+        max_fee: Optional[Any] = None,
+        min_rating: Optional[Any] = None,
+        min_experience: Optional[int] = None
+    ) -> QuerySet:
+        """Filter listed doctors using only the index tables"""
+        queryset = DoctorSearchIndex.objects.filter(is_listed=True)
+        if query:
+            queryset = queryset.filter(doctor_id__in=DoctorSearchService.matching_ids(query))
+        for specialty in specialties or []:
+            queryset = queryset.filter(doctor_id__in=DoctorSearchService.specialty_ids(specialty))
+        if min_fee is not None:
+            queryset = queryset.filter(consultation_fee__gte=min_fee)
+        if max_fee is not None:
+            queryset = queryset.filter(consultation_fee__lte=max_fee)
+        if min_rating is not None:
+            queryset = queryset.filter(average_rating__gte=min_rating)
+        if min_experience is not None:
+            queryset = queryset.filter(years_of_experience__gte=min_experience)
+        return queryset
+
+    @staticmethod
+    def facets(queryset: QuerySet) -> Dict[str, Any]:
+        """Specialty counts, fee range and rating buckets for a filtered result set"""
+        specialty_counts = (
+            DoctorSpecialty.objects.filter(entry_id__in=queryset.values('doctor_id'))
+            .values('name')
+            .annotate(count=Count('entry_id'))
+            .order_by('-count', 'name')
+        )
+        summary = queryset.aggregate(
+            min_fee=Min('consultation_fee'),
+            max_fee=Max('consultation_fee'),
+            **{
+                f'rating_{threshold}': Count('doctor_id', filter=Q(average_rating__gte=threshold))
+                for threshold in RATING_FACET_THRESHOLDS
+            }
+        )
+        return {
+            'specialties': [{'name': row['name'], 'count': row['count']} for row in specialty_counts],
+            'fee_range': {'min': summary['min_fee'], 'max': summary['max_fee']},
+            'ratings': [
+                {'min_rating': threshold, 'count': summary[f'rating_{threshold}']}
+                for threshold in RATING_FACET_THRESHOLDS
+            ],
+        }
+
+
+RATING_RECONCILE_CHUNK_SIZE = 1000
+RECENT_REVIEWS_LIMIT = 5
+
+
+class DoctorRatingService:
+    """Recompute rating aggregates from DoctorReview rows in bulk"""
+
+    @staticmethod
+    def _aggregates(doctor_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        aggregates = {
+            'total_reviews': Count('id'),
+            'rating_sum': Sum('rating'),
+        }
+        for category in REVIEW_RATING_CATEGORIES:
+            aggregates[f'{category}_rating_sum'] = Sum(f'{category}_rating')
+            aggregates[f'{category}_rating_count'] = Count(f'{category}_rating')
+        rows = (
+            DoctorReview.objects.filter(doctor_id__in=doctor_ids)
+            .values('doctor_id')
+            .annotate(**aggregates)
+        )
+        return {row['doctor_id']: row for row in rows}
+
+    @staticmethod
+    def _average(total: Optional[int], count: int) -> Decimal:
+        if not count:
+            return Decimal('0.00')
+        return (Decimal(total) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def histogram(doctor_id: int) -> Dict[str, int]:
+        """Review count per star rating, computed in a single aggregate query"""
+        ratings = [value for value, _ in DoctorReview.RATING_CHOICES]
+        counts = DoctorReview.objects.filter(doctor_id=doctor_id).aggregate(
+            **{str(rating): Count('id', filter=Q(rating=rating)) for rating in ratings}
+        )
+        return {str(rating): counts[str(rating)] for rating in ratings}
+
+    @staticmethod
+    def recent_reviews(doctor_id: int, limit: int = RECENT_REVIEWS_LIMIT) -> QuerySet:
+        """Latest reviews for embedding; the full list lives behind the paginated reviews endpoint"""
+        return (
+            DoctorReview.objects.filter(doctor_id=doctor_id)
+            .select_related('patient')
+            .order_by('-created_at', '-id')[:limit]
+        )
+
+    @staticmethod
+    def reconcile(chunk_size: int = RATING_RECONCILE_CHUNK_SIZE) -> int:
+        """
+        Rebuild every doctor's rating counters from scratch, one aggregate query
+        and one bulk_update per chunk. Returns the number of doctors corrected.
+        """
+        fields = ['total_reviews', 'rating_sum', 'average_rating']
+        for category in REVIEW_RATING_CATEGORIES:
+            fields += [f'{category}_rating_sum', f'{category}_rating_count', f'average_{category}_rating']
+
+        corrected = 0
+        last_id = 0
+        while True:
+            doctors = list(
+                Doctor.objects.filter(id__gt=last_id).order_by('id').only('id', *fields)[:chunk_size]
+            )
+            if not doctors:
+                break
+            last_id = doctors[-1].id
+            aggregates = DoctorRatingService._aggregates([doctor.id for doctor in doctors])
+
+            changed = []
+            for doctor in doctors:
+                row = aggregates.get(doctor.id, {})
+                values = {
+                    'total_reviews': row.get('total_reviews', 0),
+                    'rating_sum': row.get('rating_sum') or 0,
+                }
+                values['average_rating'] = DoctorRatingService._average(values['rating_sum'], values['total_reviews'])
+                for category in REVIEW_RATING_CATEGORIES:
+                    total = row.get(f'{category}_rating_sum') or 0
+                    count = row.get(f'{category}_rating_count', 0)
+                    values[f'{category}_rating_sum'] = total
+                    values[f'{category}_rating_count'] = count
+                    values[f'average_{category}_rating'] = DoctorRatingService._average(total, count)
+
+                if any(getattr(doctor, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(doctor, field, value)
+                    changed.append(doctor)
+
+            if changed:
+                with transaction.atomic():
+                    Doctor.objects.bulk_update(changed, fields)
+                    DoctorSearchIndex.objects.bulk_update(
+                        [
+                            DoctorSearchIndex(
+                                doctor_id=doctor.id,
+                                average_rating=doctor.average_rating,
+                                total_reviews=doctor.total_reviews,
+                            )
+                            for doctor in changed
+                        ],
+                        ['average_rating', 'total_reviews']
+                    )
+                for doctor in changed:
+                    DoctorCacheService.invalidate(doctor.id)
+                corrected += len(changed)
+        return corrected
+
+
+# Celery Tasks
+@shared_task
+def reconcile_doctor_ratings():
+    """Periodic safety net for the incremental rating counters"""
+    corrected = DoctorRatingService.reconcile()
+    logger.info(f"Reconciled doctor ratings, {corrected} doctors corrected")
+    return corrected
@@ -0,0 +1,88 @@
+"""
+Signal handlers keeping doctor caches and the search index in sync
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from appointments.models import Appointment, ScheduleSlot
+from users.models import User, UserProfile
+from users.serializers import UserSerializer
+from .models import Doctor, DoctorAvailability, DoctorReview
+from .services import SlotService, DoctorSearchService, DoctorCacheService
+
+# User fields rendered in the public doctor payloads, and the ones the search index uses
+DOCTOR_USER_FIELDS = frozenset(UserSerializer.Meta.fields) - {'profile'}
+DOCTOR_NAME_FIELDS = frozenset(['first_name', 'last_name'])
+
+
+@receiver([post_save, post_delete], sender=DoctorAvailability)
+@receiver([post_save, post_delete], sender=ScheduleSlot)
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_doctor_slots(sender, instance, **kwargs):
+    """Drop cached slot days whenever availability or bookings change"""
+    doctor_id = instance.doctor_id
+    transaction.on_commit(lambda: SlotService.invalidate(doctor_id))
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_doctor_responses(sender, instance, **kwargs):
+    DoctorCacheService.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=DoctorAvailability)
+def invalidate_doctor_availability_responses(sender, instance, **kwargs):
+    # Availability only appears on the detail payload, not in the directory listing
+    DoctorCacheService.invalidate(instance.doctor_id, directory=False)
+
+
+@receiver([post_save, post_delete], sender=DoctorReview)
+def invalidate_doctor_review_responses(sender, instance, **kwargs):
+    DoctorCacheService.invalidate(instance.doctor_id)
+
+
+@receiver(post_save, sender=Doctor)
+def index_doctor(sender, instance, raw=False, **kwargs):
+    """Refresh the doctor's directory search entry"""
+    if raw:
+        return
+    DoctorSearchService.index_doctor(instance)
+
+
+@receiver(pre_save, sender=User)
+def detect_doctor_user_changes(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Record which public fields this save changes, so routine saves (e.g. last_login) skip re-indexing"""
+    instance._doctor_changed_fields = frozenset()
+    if raw or instance.pk is None or not instance.is_doctor:
+        return
+    fields = DOCTOR_USER_FIELDS if update_fields is None else DOCTOR_USER_FIELDS & set(update_fields)
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    if stored is not None:
+        instance._doctor_changed_fields = frozenset(
+            field for field in fields if stored[field] != getattr(instance, field)
+        )
+
+
+@receiver(post_save, sender=User)
+def index_doctor_user(sender, instance, raw=False, **kwargs):
+    """Doctor names and public details live on the user, so refresh when those change"""
+    changed = getattr(instance, '_doctor_changed_fields', frozenset())
+    if raw or not changed:
+        return
+    doctor = Doctor.objects.filter(user=instance).select_related('user').first()
+    if doctor:
+        if changed & DOCTOR_NAME_FIELDS:
+            DoctorSearchService.index_doctor(doctor)
+        DoctorCacheService.invalidate(doctor.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_doctor_profile_responses(sender, instance, raw=False, **kwargs):
+    """The detail payload embeds the user's profile (photo and the rest); the listing does not"""
+    if raw:
+        return
+    doctor_id = Doctor.objects.filter(user_id=instance.user_id).values_list('pk', flat=True).first()
+    if doctor_id:
+        DoctorCacheService.invalidate(doctor_id, directory=False)
@@ -0,0 +1,269 @@
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from appointments.models import Appointment, ScheduleSlot
+from users.models import User, UserProfile
+from .models import Doctor, DoctorReview, DoctorSearchIndex
+from .services import RECENT_REVIEWS_LIMIT, merge_intervals, subtract_intervals
+
+REVIEW_COUNTS = (10, 100, 1000)
+# Allowed spread in payload size across review counts; only digits in the averages may differ
+PAYLOAD_TOLERANCE = 0.02
+
+
+class DoctorReviewSummaryTests(TestCase):
+    """The doctor detail payload stays flat however many reviews a doctor has"""
+
+    def setUp(self):
+        user = User.objects.create(username='doctor', first_name='Greg', last_name='House', role='doctor')
+        self.doctor = Doctor.objects.create(
+            user=user,
+            registration_number='REG-1',
+            years_of_experience=5,
+            consultation_fee=50,
+            kyc_status='verified'
+        )
+        slot = ScheduleSlot.objects.create(
+            doctor=self.doctor, start_time=timezone.now(), end_time=timezone.now() + timedelta(minutes=30)
+        )
+        patient = User.objects.create(username='patient', role='patient')
+        self.appointment = Appointment.objects.create(
+            patient=patient,
+            doctor=self.doctor,
+            slot=slot,
+            consultation_fee=50,
+            scheduled_at=slot.start_time,
+            reason='Checkup'
+        )
+        self.reviews = 0
+
+    def add_reviews(self, total):
+        patients = User.objects.bulk_create([
+            User(username=f'reviewer{i}', role='patient') for i in range(self.reviews, total)
+        ])
+        DoctorReview.objects.bulk_create([
+            DoctorReview(
+                doctor=self.doctor,
+                patient=patient,
+                appointment=self.appointment,
+                rating=(i % 5) + 1,
+                comment='Very thorough consultation. ' * 8
+            )
+            for i, patient in enumerate(patients, start=self.reviews)
+        ])
+        self.reviews = total
+
+    def fetch_detail(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(f'/api/doctors/{self.doctor.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_detail_payload_is_bounded(self):
+        measurements = []
+        for total in REVIEW_COUNTS:
+            self.add_reviews(total)
+            response, query_count = self.fetch_detail()
+            summary = response.json()['review_summary']
+            self.assertEqual(sum(summary['histogram'].values()), total)
+            self.assertEqual(len(summary['recent']), RECENT_REVIEWS_LIMIT)
+            self.assertNotIn('reviews', response.json())
+            measurements.append((total, len(response.content), query_count))
+
+        sizes = [size for _, size, _ in measurements]
+        self.assertLessEqual(max(sizes) - min(sizes), min(sizes) * PAYLOAD_TOLERANCE, measurements)
+        self.assertEqual(len({query_count for _, _, query_count in measurements}), 1, measurements)
+
+    def test_full_reviews_are_cursor_paginated(self):
+        self.add_reviews(30)
+        response = APIClient().get(f'/api/doctors/{self.doctor.id}/reviews/?pagination=cursor')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len(response.json()['results']), 30)
+        self.assertIsNotNone(response.json()['next'])
+
+
+class DoctorUserReindexTests(TestCase):
+    """Only saves that change a doctor's public user fields touch the index and caches"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='doctor', first_name='Greg', last_name='House', role='doctor')
+        self.doctor = Doctor.objects.create(
+            user=self.user,
+            registration_number='REG-1',
+            years_of_experience=5,
+            consultation_fee=50,
+            kyc_status='verified'
+        )
+
+    def test_last_login_update_skips_reindex(self):
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+    def test_unchanged_full_save_skips_reindex(self):
+        # The UPDATE plus one read of the stored public fields
+        with self.assertNumQueries(2):
+            self.user.save()
+
+    def test_name_change_reindexes(self):
+        self.user.last_name = 'Wilson'
+        self.user.save()
+        self.assertEqual(DoctorSearchIndex.objects.get(doctor=self.doctor).full_name, 'Greg Wilson')
+        response = APIClient().get('/api/doctors/search/?q=wilson')
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.doctor.id])
+
+
+class DoctorCursorPaginationTests(TestCase):
+    """Cursor pages follow the requested ordering and reject ones they cannot honour"""
+
+    def setUp(self):
+        cache.clear()
+        for i, (fee, rating) in enumerate([(80, '4.50'), (20, '3.25'), (50, '4.50'), (65, '2.75'), (35, '4.90')]):
+            user = User.objects.create(username=f'doctor{i}', first_name='Greg', last_name=f'House{i}', role='doctor')
+            Doctor.objects.create(
+                user=user,
+                registration_number=f'REG-{i}',
+                years_of_experience=5,
+                consultation_fee=fee,
+                average_rating=rating,
+                kyc_status='verified'
+            )
+
+    def walk(self, query):
+        url, seen = f'/api/doctors/?pagination=cursor&page_size=2&{query}', []
+        while url:
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(response.json()['results'])
+            url = response.json()['next']
+        return seen
+
+    def test_default_ordering_pages_on_decimal_rating(self):
+        doctors = self.walk('')
+        expected = list(Doctor.objects.order_by('-average_rating', '-pk').values_list('id', flat=True))
+        self.assertEqual([doctor['id'] for doctor in doctors], expected)
+
+    def test_requested_ordering_is_honoured(self):
+        doctors = self.walk('ordering=consultation_fee')
+        self.assertEqual([float(doctor['consultation_fee']) for doctor in doctors], [20, 35, 50, 65, 80])
+
+    def test_unsupported_ordering_is_rejected(self):
+        for ordering in ('user__last_name', 'consultation_fee,-average_rating'):
+            response = APIClient().get(f'/api/doctors/?pagination=cursor&ordering={ordering}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ordering', response.json())
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        response = APIClient().get('/api/doctors/?pagination=cursor&page_size=2')
+        cursor = response.json()['next'].split('cursor=')[1]
+        response = APIClient().get(f'/api/doctors/?cursor={cursor}&ordering=consultation_fee')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DoctorAvailabilitySlotsTests(TestCase):
+    """The public slot endpoint only splits days into the allowed durations"""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username='doctor', first_name='Greg', last_name='House', role='doctor')
+        self.doctor = Doctor.objects.create(
+            user=user, registration_number='REG-1', years_of_experience=5, consultation_fee=50, kyc_status='verified'
+        )
+        self.url = f'/api/doctors/{self.doctor.id}/availability/?date={timezone.now().date():%Y-%m-%d}'
+
+    def test_allowed_duration(self):
+        response = APIClient().get(f'{self.url}&duration=45')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unbounded_durations_are_rejected(self):
+        for duration in ('1', '0', '-30', '100000', 'abc'):
+            response = APIClient().get(f'{self.url}&duration={duration}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, duration)
+
+
+class DoctorProfileCacheTests(TestCase):
+    """Saving a doctor's user profile drops their cached detail response"""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username='doctor', first_name='Greg', last_name='House', role='doctor')
+        self.profile = UserProfile.objects.create(user=user, profile_image='https://example.com/old.png')
+        self.doctor = Doctor.objects.create(
+            user=user, registration_number='REG-1', years_of_experience=5, consultation_fee=50, kyc_status='verified'
+        )
+
+    def profile_image(self):
+        response = APIClient().get(f'/api/doctors/{self.doctor.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['user']['profile']['profile_image']
+
+    def test_profile_save_invalidates_detail(self):
+        self.assertEqual(self.profile_image(), 'https://example.com/old.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_image = 'https://example.com/new.png'
+            self.profile.save()
+        self.assertEqual(self.profile_image(), 'https://example.com/new.png')
+
+
+def at(hour, minute=0):
+    return datetime(2025, 3, 14, hour, minute)
+
+
+class IntervalTests(SimpleTestCase):
+    """The interval helpers behind slot generation"""
+
+    def test_merge_empty(self):
+        self.assertEqual(merge_intervals([]), [])
+
+    def test_merge_overlapping_adjacent_and_contained(self):
+        intervals = [
+            (at(13), at(14)),
+            (at(9), at(10, 30)),
+            (at(10), at(11)),     # overlaps the previous block
+            (at(11), at(12)),     # touches it
+            (at(9, 15), at(9, 45)),  # contained
+            (at(15), at(16)),
+        ]
+        self.assertEqual(merge_intervals(intervals), [
+            (at(9), at(12)), (at(13), at(14)), (at(15), at(16)),
+        ])
+
+    def test_subtract_empty_inputs(self):
+        free = [(at(9), at(12))]
+        self.assertEqual(subtract_intervals(free, []), free)
+        self.assertEqual(subtract_intervals([], [(at(9), at(10))]), [])
+
+    def test_subtract_overlapping_blocks(self):
+        free = [(at(9), at(12))]
+        busy = [(at(8), at(9, 30)), (at(11, 30), at(13))]
+        self.assertEqual(subtract_intervals(free, busy), [(at(9, 30), at(11, 30))])
+
+    def test_subtract_adjacent_blocks_leave_free_time_intact(self):
+        free = [(at(9), at(12))]
+        busy = [(at(8), at(9)), (at(12), at(13))]
+        self.assertEqual(subtract_intervals(free, busy), free)
+
+    def test_subtract_contained_blocks(self):
+        free = [(at(9), at(12)), (at(14), at(17))]
+        busy = merge_intervals([(at(10), at(10, 30)), (at(10, 30), at(11)), (at(15), at(16))])
+        self.assertEqual(subtract_intervals(free, busy), [
+            (at(9), at(10)), (at(11), at(12)), (at(14), at(15)), (at(16), at(17)),
+        ])
+
+    def test_subtract_block_covering_free_time(self):
+        free = [(at(9), at(10)), (at(11), at(12))]
+        busy = [(at(8), at(13))]
+        self.assertEqual(subtract_intervals(free, busy), [])
+
+    def test_subtract_block_spanning_two_free_intervals(self):
+        free = [(at(9), at(10)), (at(11), at(12))]
+        busy = [(at(9, 30), at(11, 30))]
+        self.assertEqual(subtract_intervals(free, busy), [(at(9), at(9, 30)), (at(11, 30), at(12))])
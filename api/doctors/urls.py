@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.DoctorListView.as_view(), name='doctor-list'),
+    path('search/', views.DoctorSearchView.as_view(), name='doctor-search'),
     path('register/', views.DoctorRegistrationView.as_view(), name='doctor-register'),
     path('profile/', views.DoctorProfileView.as_view(), name='doctor-profile'),
     path('<int:pk>/', views.DoctorDetailView.as_view(), name='doctor-detail'),
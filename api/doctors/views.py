@@ -2,36 +2,138 @@ from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.core.cache import cache
 from django.db.models import Q
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+from datetime import datetime
+import hashlib
 from .models import Doctor, DoctorAvailability, DoctorReview
 from .serializers import (
     DoctorSerializer, DoctorListSerializer, DoctorRegistrationSerializer,
-    DoctorAvailabilitySerializer, DoctorReviewSerializer, DoctorReviewCreateSerializer
+    DoctorAvailabilitySerializer, DoctorReviewSerializer, DoctorReviewCreateSerializer,
+    DoctorSearchResultSerializer, DoctorSearchParamsSerializer
+)
+from .services import (
+    SlotService, DoctorSearchService, DoctorCacheService, DEFAULT_SLOT_MINUTES,
+    DIRECTORY_SCOPE, PUBLIC_CACHE_TIMEOUT
 )
 from users.permissions import IsDoctor, IsPatient
 
+MAX_SLOT_RANGE_DAYS = 62
+# Durations the public availability endpoint will split a day into
+ALLOWED_SLOT_MINUTES = [15, 20, 30, 45, 60, 90, 120]
+
+
+class CachedPublicResponseMixin:
+    """
+    Serve GET responses from a versioned cache with ETag support.
+    
+    The rendered JSON body is cached under the view's cache scope (a doctor id
+    or the directory) and the full request path; signals bump the scope's
+    version on writes, so stale entries are simply never read again. Clients
+    sending a matching If-None-Match get a 304 without a body.
+    """
+    cache_timeout = PUBLIC_CACHE_TIMEOUT
+    
+    def get_cache_scope(self):
+        raise NotImplementedError
+    
+    def get(self, request, *args, **kwargs):
+        key = DoctorCacheService.response_key(self.get_cache_scope(), request.get_full_path())
+        cached = cache.get(key)
+        if cached is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = JSONRenderer().render(response.data)
+            cached = {'body': body, 'etag': f'"{hashlib.md5(body).hexdigest()}"'}
+            cache.set(key, cached, self.cache_timeout)
+        
+        if cached['etag'] in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(cached['body'], content_type='application/json')
+        response['ETag'] = cached['etag']
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
+
 
-class DoctorListView(generics.ListAPIView):
+class DoctorListView(CachedPublicResponseMixin, generics.ListAPIView):
     """
     List all doctors with filtering and search
     """
     queryset = Doctor.objects.filter(is_available_for_consultation=True, kyc_status='verified')
     serializer_class = DoctorListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['specialties', 'consultation_fee']
-    search_fields = ['user__first_name', 'user__last_name', 'clinic_name', 'specialties']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['consultation_fee']
     ordering_fields = ['average_rating', 'consultation_fee', 'years_of_experience']
     ordering = ['-average_rating']
+    
+    def get_cache_scope(self):
+        return DIRECTORY_SCOPE
+    
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('user')
+        search = self.request.query_params.get('search')
+        if search:
+            # Prefix-match against the search index instead of ILIKE over joined columns
+            queryset = queryset.filter(id__in=DoctorSearchService.matching_ids(search))
+        for specialty in self.request.query_params.getlist('specialties'):
+            queryset = queryset.filter(id__in=DoctorSearchService.specialty_ids(specialty))
+        return queryset
 
 
-class DoctorDetailView(generics.RetrieveAPIView):
+class DoctorSearchView(generics.ListAPIView):
+    """
+    Directory search over the denormalized index with facets
+    """
+    serializer_class = DoctorSearchResultSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['average_rating', 'consultation_fee', 'years_of_experience']
+    ordering = ['-average_rating']
+    
+    def get_search_params(self):
+        params = self.request.query_params
+        data = {key: params.get(key) for key in ['q', 'min_fee', 'max_fee', 'min_rating', 'min_experience'] if params.get(key)}
+        if params.getlist('specialty'):
+            data['specialty'] = params.getlist('specialty')
+        serializer = DoctorSearchParamsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+    
+    def get_queryset(self):
+        params = self.get_search_params()
+        return DoctorSearchService.search(
+            query=params.get('q'),
+            specialties=params.get('specialty'),
+            min_fee=params.get('min_fee'),
+            max_fee=params.get('max_fee'),
+            min_rating=params.get('min_rating'),
+            min_experience=params.get('min_experience')
+        )
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['facets'] = DoctorSearchService.facets(queryset)
+        return response
+
+
+class DoctorDetailView(CachedPublicResponseMixin, generics.RetrieveAPIView):
     """
     Get doctor details
     """
-    queryset = Doctor.objects.all()
+    queryset = Doctor.objects.select_related('user__profile').prefetch_related('availability')
     serializer_class = DoctorSerializer
     permission_classes = [permissions.AllowAny]
+    
+    def get_cache_scope(self):
+        return str(self.kwargs['pk'])
 
 
 class DoctorRegistrationView(generics.CreateAPIView):
@@ -79,16 +181,20 @@ class DoctorAvailabilityDetailView(generics.RetrieveUpdateDestroyAPIView):
         return DoctorAvailability.objects.filter(doctor=self.request.user.doctor_profile)
 
 
-class DoctorReviewsView(generics.ListAPIView):
+class DoctorReviewsView(CachedPublicResponseMixin, generics.ListAPIView):
     """
     Get reviews for a specific doctor
     """
     serializer_class = DoctorReviewSerializer
     permission_classes = [permissions.AllowAny]
+    ordering = ['-created_at']
+    
+    def get_cache_scope(self):
+        return str(self.kwargs['doctor_id'])
     
     def get_queryset(self):
         doctor_id = self.kwargs['doctor_id']
-        return DoctorReview.objects.filter(doctor_id=doctor_id).order_by('-created_at')
+        return DoctorReview.objects.filter(doctor_id=doctor_id).select_related('patient').order_by('-created_at')
 
 
 class CreateDoctorReviewView(generics.CreateAPIView):
@@ -136,24 +242,51 @@ class CreateDoctorReviewView(generics.CreateAPIView):
 @permission_classes([permissions.AllowAny])
 def doctor_availability_slots(request, doctor_id):
     """
-    Get available time slots for a doctor on a specific date
+    Get available time slots for a doctor on a specific date or date range
     """
     date = request.GET.get('date')
     if not date:
         return Response({'error': 'Date parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        doctor = Doctor.objects.get(id=doctor_id)
-        # TODO: Implement slot generation logic based on doctor's availability and existing appointments
-        # This would integrate with the appointments app
-        
+        start_date = datetime.strptime(date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date() if request.GET.get('end_date') else start_date
+        slot_minutes = int(request.GET.get('duration', DEFAULT_SLOT_MINUTES))
+    except ValueError:
+        return Response({'error': 'Invalid date or duration'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if end_date < start_date or (end_date - start_date).days >= MAX_SLOT_RANGE_DAYS:
+        return Response(
+            {'error': f'Date range must be between 1 and {MAX_SLOT_RANGE_DAYS} days'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if slot_minutes not in ALLOWED_SLOT_MINUTES:
+        return Response(
+            {'error': f"Duration must be one of {', '.join(str(minutes) for minutes in ALLOWED_SLOT_MINUTES)} minutes"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not Doctor.objects.filter(id=doctor_id).exists():
+        return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    slots_by_day = SlotService.get_available_slots(doctor_id, start_date, end_date, slot_minutes)
+    
+    if end_date == start_date:
         return Response({
             'doctor_id': doctor_id,
             'date': date,
-            'available_slots': []  # Placeholder
+            'available_slots': slots_by_day[start_date]
         })
-    except Doctor.DoesNotExist:
-        return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'doctor_id': doctor_id,
+        'start_date': start_date,
+        'end_date': end_date,
+        'days': [
+            {'date': day, 'available_slots': slots}
+            for day, slots in slots_by_day.items()
+        ]
+    })
 
 
 @api_view(['POST'])
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class EmrConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'emr'
-    verbose_name = 'Electronic Medical Records'
\ No newline at end of file
+    verbose_name = 'Electronic Medical Records'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
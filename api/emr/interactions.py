@@ -0,0 +1,190 @@
+"""
+Medication-allergy interaction checks
+
+The allergen class table in ``data/allergy_classes.json`` is compiled once per
+process into plain dicts (generic -> classes, alias -> classes, brand ->
+generics). Each patient's active allergies are cached as a tuple of
+(allergen, severity) pairs, and resolved names are memoized, so checking a
+prescription is a handful of set intersections.
+"""
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Allergy
+
+ALLERGY_CLASS_DATA = Path(__file__).resolve().parent / 'data' / 'allergy_classes.json'
+ALLERGY_SET_CACHE_TIMEOUT = 60 * 60  # 1 hour
+NAME_SEPARATOR_RE = re.compile(r'[^a-z0-9]+')
+
+
+class InteractionTable(NamedTuple):
+    generic_classes: Dict[str, FrozenSet[str]]
+    alias_classes: Dict[str, FrozenSet[str]]
+    brand_generics: Dict[str, FrozenSet[str]]
+    cross_reactive: Dict[str, FrozenSet[str]]
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase and collapse punctuation, so "Beta-Lactam" matches "beta lactam" """
+    return ' '.join(NAME_SEPARATOR_RE.sub(' ', (name or '').lower()).split())
+
+
+@lru_cache(maxsize=None)
+def interaction_table() -> InteractionTable:
+    """Load and index the allergen class data file once per process"""
+    with open(ALLERGY_CLASS_DATA, encoding='utf-8') as data_file:
+        data = json.load(data_file)
+
+    generic_classes: Dict[str, set] = {}
+    for class_name, generics in data['classes'].items():
+        for generic in generics:
+            generic_classes.setdefault(normalize_name(generic), set()).add(class_name)
+
+    alias_classes = {normalize_name(class_name): frozenset([class_name]) for class_name in data['classes']}
+    alias_classes.update({
+        normalize_name(alias): frozenset(classes) for alias, classes in data.get('aliases', {}).items()
+    })
+
+    return InteractionTable(
+        generic_classes={generic: frozenset(classes) for generic, classes in generic_classes.items()},
+        alias_classes=alias_classes,
+        brand_generics={
+            normalize_name(brand): frozenset(normalize_name(generic) for generic in generics)
+            for brand, generics in data.get('brands', {}).items()
+        },
+        cross_reactive={
+            class_name: frozenset(classes) for class_name, classes in data.get('cross_reactivity', {}).items()
+        },
+    )
+
+
+def _classes_of(table: InteractionTable, generics: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(
+        class_name for generic in generics for class_name in table.generic_classes.get(generic, ())
+    )
+
+
+@lru_cache(maxsize=4096)
+def resolve_medication(medication_name: str, generic_name: str = '') -> Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]:
+    """Return the (generics, classes, name tokens) a prescribed medication maps to"""
+    table = interaction_table()
+    tokens = set()
+    for name in (medication_name, generic_name):
+        normalized = normalize_name(name)
+        if normalized:
+            tokens.add(normalized)
+            tokens.update(normalized.split())
+
+    generics = set()
+    for token in tokens:
+        if token in table.generic_classes:
+            generics.add(token)
+        generics.update(table.brand_generics.get(token, ()))
+    return frozenset(generics), _classes_of(table, generics), frozenset(tokens)
+
+
+@lru_cache(maxsize=4096)
+def resolve_allergen(allergen: str) -> Tuple[str, FrozenSet[str], FrozenSet[str]]:
+    """
+    Return the (normalized term, generics, classes) an allergy entry covers.
+
+    The whole entry is tried before its individual words, so "sulfa drugs"
+    resolves through the "sulfa" alias. Unknown allergens cover nothing beyond
+    a literal name match.
+    """
+    table = interaction_table()
+    term = normalize_name(allergen)
+    for candidate in [term] + term.split():
+        if candidate in table.alias_classes:
+            return term, frozenset(), table.alias_classes[candidate]
+        if candidate in table.generic_classes:
+            return term, frozenset([candidate]), table.generic_classes[candidate]
+        if candidate in table.brand_generics:
+            generics = table.brand_generics[candidate]
+            return term, generics, _classes_of(table, generics)
+    return term, frozenset(), frozenset()
+
+
+def find_conflicts(
+    allergies: Iterable[Tuple[str, str]],
+    medication_name: str,
+    generic_name: str = ''
+) -> List[Dict[str, Any]]:
+    """
+    Match one medication against (allergen, severity) pairs.
+
+    A shared generic, a shared class or a literal name match is
+    ``contraindicated``; a class listed as cross-reactive with the allergen's
+    class (e.g. cephalosporins for a penicillin allergy) is ``caution``.
+    """
+    table = interaction_table()
+    drug_generics, drug_classes, drug_tokens = resolve_medication(medication_name or '', generic_name or '')
+    conflicts = []
+    for allergen, severity in allergies:
+        term, generics, classes = resolve_allergen(allergen)
+        if not term:
+            continue
+        matched = (generics & drug_generics) | (classes & drug_classes)
+        if matched or term in drug_tokens:
+            level = 'contraindicated'
+            matched = matched or {term}
+        else:
+            matched = frozenset(
+                related for class_name in classes for related in table.cross_reactive.get(class_name, ())
+            ) & drug_classes
+            if not matched:
+                continue
+            level = 'caution'
+        conflicts.append({
+            'allergen': allergen,
+            'severity': severity,
+            'level': level,
+            'matched': sorted(matched),
+        })
+    return conflicts
+
+
+class AllergyCheckService:
+    """Check prescriptions against a patient's cached active allergies"""
+
+    @staticmethod
+    def cache_key(patient_id: int) -> str:
+        return f'emr_allergy_set:{patient_id}'
+
+    @staticmethod
+    def invalidate(patient_id: int) -> None:
+        """Drop a patient's cached allergy set once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(AllergyCheckService.cache_key(patient_id)))
+
+    @staticmethod
+    def active_allergies(patient_id: int) -> Tuple[Tuple[str, str], ...]:
+        """(allergen, severity) pairs for the patient's active allergies"""
+        key = AllergyCheckService.cache_key(patient_id)
+        allergies = cache.get(key)
+        if allergies is None:
+            allergies = tuple(
+                Allergy.objects.filter(patient_id=patient_id, is_active=True)
+                .order_by('allergen')
+                .values_list('allergen', 'severity')
+            )
+            cache.set(key, allergies, ALLERGY_SET_CACHE_TIMEOUT)
+        return allergies
+
+    @staticmethod
+    def check(patient_id: int, medication_name: str, generic_name: str = '') -> List[Dict[str, Any]]:
+        """Conflicts between one medication and the patient's active allergies"""
+        return find_conflicts(AllergyCheckService.active_allergies(patient_id), medication_name, generic_name)
+
+    @staticmethod
+    def check_many(patient_id: int, medications: Iterable[Dict[str, str]]) -> List[List[Dict[str, Any]]]:
+        """Conflicts for each medication of a multi-drug prescription, loading allergies once"""
+        allergies = AllergyCheckService.active_allergies(patient_id)
+        return [
+            find_conflicts(allergies, medication.get('medication_name', ''), medication.get('generic_name', ''))
+            for medication in medications
+        ]
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from emr.services import LabValueService, LAB_VALUE_REBUILD_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized lab result value table from existing lab results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=LAB_VALUE_REBUILD_CHUNK_SIZE,
+                            help='Lab results processed per batch')
+
+    def handle(self, *args, **options):
+        created = LabValueService.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Extracted {created} lab values'))
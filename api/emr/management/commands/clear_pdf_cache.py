@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from emr.services import PDFCacheService
+
+
+class Command(BaseCommand):
+    help = 'Delete every cached prescription and medical record PDF; they are re-rendered on the next download'
+
+    def handle(self, *args, **options):
+        removed = PDFCacheService.clear()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {removed} cached PDFs'))
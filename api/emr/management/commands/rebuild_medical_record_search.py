@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from emr.services import MedicalRecordSearchService
+
+
+class Command(BaseCommand):
+    help = 'Repopulate the trigger-maintained medical record full-text index (SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias whose index is rebuilt')
+
+    def handle(self, *args, **options):
+        MedicalRecordSearchService.rebuild(using=options['database'])
+        self.stdout.write(self.style.SUCCESS('Medical record search index is up to date'))
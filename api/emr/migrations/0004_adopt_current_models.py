@@ -0,0 +1,197 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+CURRENT_MODELS = ['MedicalRecord', 'Prescription', 'LabResult', 'VitalSign', 'Allergy']
+
+
+def create_missing_tables(apps, schema_editor):
+    """
+    Create the current emr tables that do not exist yet.
+
+    Tables that already have every column of the current model are adopted
+    as they are. A legacy table occupying the same name (the 0001
+    ``emr_prescription``) is renamed to ``<table>_legacy`` rather than dropped.
+    """
+    connection = schema_editor.connection
+    tables = set(connection.introspection.table_names())
+    for name in CURRENT_MODELS:
+        model = apps.get_model('emr', name)
+        table = model._meta.db_table
+        if table in tables:
+            with connection.cursor() as cursor:
+                columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+            if {field.column for field in model._meta.local_concrete_fields} <= columns:
+                continue
+            legacy = f'{table}_legacy'
+            schema_editor.alter_db_table(model, table, legacy)
+            if connection.vendor == 'postgresql':
+                # Renaming a table keeps its primary key's name, which the new table needs
+                schema_editor.execute('ALTER TABLE %s RENAME CONSTRAINT %s TO %s' % (
+                    schema_editor.quote_name(legacy),
+                    schema_editor.quote_name(f'{table}_pkey'),
+                    schema_editor.quote_name(f'{legacy}_pkey'),
+                ))
+        schema_editor.create_model(model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emr', '0003_auto_20250906_0241'),
+    ]
+
+    operations = [
+        # 0001 and 0002 describe the app's earlier models. Swap them for the
+        # current ones in the migration state only; the legacy tables are left
+        # in place and create_missing_tables builds whatever is absent
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(name='Vitals'),
+                migrations.DeleteModel(name='Prescription'),
+                migrations.DeleteModel(name='MedicalDocument'),
+                migrations.DeleteModel(name='MedicalHistory'),
+                migrations.DeleteModel(name='Encounter'),
+                migrations.CreateModel(
+                    name='MedicalRecord',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medical_records', to=settings.AUTH_USER_MODEL)),
+                        ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_medical_records', to=settings.AUTH_USER_MODEL)),
+                        ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='appointments.appointment')),
+                        ('chief_complaint', models.TextField(help_text='Primary reason for visit')),
+                        ('history_of_present_illness', models.TextField(help_text='Detailed history of current condition')),
+                        ('past_medical_history', models.TextField(blank=True, help_text='Previous medical conditions')),
+                        ('family_history', models.TextField(blank=True, help_text='Family medical history')),
+                        ('social_history', models.TextField(blank=True, help_text='Lifestyle factors, smoking, alcohol, etc.')),
+                        ('vital_signs', models.JSONField(default=dict, help_text='Blood pressure, temperature, pulse, etc.')),
+                        ('physical_examination', models.TextField(help_text='Physical examination findings')),
+                        ('diagnosis', models.TextField(help_text='Primary and secondary diagnoses')),
+                        ('treatment_plan', models.TextField(help_text='Treatment recommendations')),
+                        ('notes', models.TextField(blank=True, help_text='Additional clinical notes')),
+                        ('follow_up_required', models.BooleanField(default=False)),
+                        ('follow_up_date', models.DateField(blank=True, null=True)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('is_active', models.BooleanField(default=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Medical Record',
+                        'verbose_name_plural': 'Medical Records',
+                        'ordering': ['-created_at'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='Prescription',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('medical_record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescriptions', to='emr.medicalrecord')),
+                        ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescriptions', to=settings.AUTH_USER_MODEL)),
+                        ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='issued_prescriptions', to=settings.AUTH_USER_MODEL)),
+                        ('medication_name', models.CharField(max_length=200)),
+                        ('generic_name', models.CharField(blank=True, max_length=200)),
+                        ('dosage', models.CharField(help_text='e.g., 500mg, 10ml', max_length=100)),
+                        ('frequency', models.CharField(help_text='e.g., Twice daily, Every 8 hours', max_length=100)),
+                        ('duration', models.CharField(help_text='e.g., 7 days, 2 weeks', max_length=100)),
+                        ('quantity', models.PositiveIntegerField(help_text='Total quantity to dispense')),
+                        ('instructions', models.TextField(help_text='Special instructions for patient')),
+                        ('status', models.CharField(choices=[('pending', 'Pending'), ('filled', 'Filled'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='pending', max_length=20)),
+                        ('refills_allowed', models.PositiveIntegerField(default=0)),
+                        ('refills_used', models.PositiveIntegerField(default=0)),
+                        ('expiry_date', models.DateField(blank=True, null=True)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Prescription',
+                        'verbose_name_plural': 'Prescriptions',
+                        'ordering': ['-created_at'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='LabResult',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('medical_record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_results', to='emr.medicalrecord')),
+                        ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_results', to=settings.AUTH_USER_MODEL)),
+                        ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ordered_lab_results', to=settings.AUTH_USER_MODEL)),
+                        ('test_name', models.CharField(max_length=200)),
+                        ('test_type', models.CharField(help_text='e.g., Blood Test, Urine Test, X-Ray', max_length=100)),
+                        ('lab_name', models.CharField(blank=True, max_length=200)),
+                        ('test_date', models.DateField()),
+                        ('result_date', models.DateField(blank=True, null=True)),
+                        ('results', models.JSONField(default=dict, help_text='Test results with values and units')),
+                        ('normal_range', models.CharField(blank=True, max_length=200)),
+                        ('interpretation', models.TextField(blank=True, help_text="Doctor's interpretation of results")),
+                        ('notes', models.TextField(blank=True)),
+                        ('result_file', models.FileField(blank=True, null=True, upload_to='lab_results/')),
+                        ('status', models.CharField(choices=[('ordered', 'Ordered'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='ordered', max_length=20)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Lab Result',
+                        'verbose_name_plural': 'Lab Results',
+                        'ordering': ['-test_date'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='VitalSign',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vital_signs', to=settings.AUTH_USER_MODEL)),
+                        ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recorded_vital_signs', to=settings.AUTH_USER_MODEL)),
+                        ('medical_record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='record_vital_signs', to='emr.medicalrecord')),
+                        ('blood_pressure_systolic', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(50), django.core.validators.MaxValueValidator(300)])),
+                        ('blood_pressure_diastolic', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(200)])),
+                        ('heart_rate', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(300)])),
+                        ('temperature', models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True, validators=[django.core.validators.MinValueValidator(Decimal('90.0')), django.core.validators.MaxValueValidator(Decimal('110.0'))])),
+                        ('respiratory_rate', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(60)])),
+                        ('oxygen_saturation', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(50), django.core.validators.MaxValueValidator(100)])),
+                        ('weight', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.1')), django.core.validators.MaxValueValidator(Decimal('1000.0'))])),
+                        ('height', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.1')), django.core.validators.MaxValueValidator(Decimal('300.0'))])),
+                        ('bmi', models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True)),
+                        ('pain_level', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(10)])),
+                        ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('notes', models.TextField(blank=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Vital Sign',
+                        'verbose_name_plural': 'Vital Signs',
+                        'ordering': ['-recorded_at'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='Allergy',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allergies', to=settings.AUTH_USER_MODEL)),
+                        ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recorded_allergies', to=settings.AUTH_USER_MODEL)),
+                        ('allergen', models.CharField(help_text='Substance causing allergy', max_length=200)),
+                        ('allergy_type', models.CharField(help_text='e.g., Drug, Food, Environmental', max_length=100)),
+                        ('severity', models.CharField(choices=[('mild', 'Mild'), ('moderate', 'Moderate'), ('severe', 'Severe'), ('life_threatening', 'Life-threatening')], max_length=50)),
+                        ('reaction', models.TextField(help_text='Description of allergic reaction')),
+                        ('notes', models.TextField(blank=True)),
+                        ('is_active', models.BooleanField(default=True)),
+                        ('confirmed_date', models.DateField()),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Allergy',
+                        'verbose_name_plural': 'Allergies',
+                        'ordering': ['-confirmed_date'],
+                        'unique_together': {('patient', 'allergen')},
+                    },
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.RunPython(create_missing_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('emr', '0004_adopt_current_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabResultValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analyte', models.CharField(max_length=100)),
+                ('value', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('unit', models.CharField(blank=True, max_length=50)),
+                ('flag', models.CharField(blank=True, help_text='e.g., H, L, critical', max_length=20)),
+                ('test_date', models.DateField()),
+                ('lab_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='emr.labresult')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_result_values', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lab Result Value',
+                'verbose_name_plural': 'Lab Result Values',
+                'ordering': ['-test_date'],
+                'indexes': [
+                    models.Index(fields=['analyte', 'value', 'test_date'], name='emr_labvalue_analyte_idx'),
+                    models.Index(fields=['patient', 'analyte', 'test_date'], name='emr_labvalue_patient_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emr', '0005_lab_result_value'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vitalsign',
+            index=models.Index(fields=['patient', 'recorded_at'], name='emr_vital_patient_recorded_idx'),
+        ),
+    ]
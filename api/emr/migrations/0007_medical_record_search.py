@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations
+
+FTS_COLUMNS = (
+    'chief_complaint, diagnosis, history_of_present_illness, treatment_plan, notes, '
+    'physical_examination, past_medical_history, family_history, social_history'
+)
+FTS_NEW_VALUES = ', '.join(f'new.{column}' for column in FTS_COLUMNS.split(', '))
+FTS_INSERT = f'INSERT INTO emr_medicalrecord_fts (record_id, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW_VALUES});'
+FTS_DELETE = 'DELETE FROM emr_medicalrecord_fts WHERE record_id = old.id;'
+
+# Weight A: complaint and diagnosis; B: history, plan and notes; C: exam and background history
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(chief_complaint, '') || ' ' || coalesce(diagnosis, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(history_of_present_illness, '') || ' ' || "
+    "coalesce(treatment_plan, '') || ' ' || coalesce(notes, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(physical_examination, '') || ' ' || "
+    "coalesce(past_medical_history, '') || ' ' || coalesce(family_history, '') || ' ' || "
+    "coalesce(social_history, '')), 'C')"
+)
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL that only runs on one database vendor"""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor] + list(args), kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emr', '0006_vitalsign_patient_recorded_idx'),
+    ]
+
+    # Earlier releases created these structures after migrate, so every
+    # statement tolerates them already existing
+    operations = [
+        # PostgreSQL: a stored generated tsvector column with a GIN index
+        VendorRunSQL(
+            'postgresql',
+            sql=[
+                f'ALTER TABLE emr_medicalrecord ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED',
+                'CREATE INDEX IF NOT EXISTS emr_medicalrecord_search_idx ON emr_medicalrecord USING GIN (search_vector)',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS emr_medicalrecord_search_idx',
+                'ALTER TABLE emr_medicalrecord DROP COLUMN IF EXISTS search_vector',
+            ],
+        ),
+        # SQLite: an FTS5 table kept in step by triggers, populated from existing records
+        VendorRunSQL(
+            'sqlite',
+            sql=[
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS emr_medicalrecord_fts USING fts5('
+                f"record_id UNINDEXED, {FTS_COLUMNS}, tokenize = 'porter unicode61')",
+                f'CREATE TRIGGER IF NOT EXISTS emr_medicalrecord_fts_ai AFTER INSERT ON emr_medicalrecord '
+                f'BEGIN {FTS_INSERT} END',
+                f'CREATE TRIGGER IF NOT EXISTS emr_medicalrecord_fts_au AFTER UPDATE OF id, {FTS_COLUMNS} '
+                f'ON emr_medicalrecord BEGIN {FTS_DELETE} {FTS_INSERT} END',
+                f'CREATE TRIGGER IF NOT EXISTS emr_medicalrecord_fts_ad AFTER DELETE ON emr_medicalrecord '
+                f'BEGIN {FTS_DELETE} END',
+                'DELETE FROM emr_medicalrecord_fts',
+                f'INSERT INTO emr_medicalrecord_fts (record_id, {FTS_COLUMNS}) '
+                f'SELECT id, {FTS_COLUMNS} FROM emr_medicalrecord',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER IF EXISTS emr_medicalrecord_fts_ai',
+                'DROP TRIGGER IF EXISTS emr_medicalrecord_fts_au',
+                'DROP TRIGGER IF EXISTS emr_medicalrecord_fts_ad',
+                'DROP TABLE IF EXISTS emr_medicalrecord_fts',
+            ],
+        ),
+    ]
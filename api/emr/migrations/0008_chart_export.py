@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('emr', '0007_medical_record_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartExport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filters', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_records', models.PositiveIntegerField(default=0)),
+                ('records_done', models.PositiveIntegerField(default=0)),
+                ('prescriptions_done', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chart_exports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Chart Export',
+                'verbose_name_plural': 'Chart Exports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,11 +1,25 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 
 User = get_user_model()
 
+# VitalSign fields exposed by the trend API
+VITAL_TREND_METRICS = [
+    'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate',
+    'oxygen_saturation', 'weight', 'bmi'
+]
+
+def calculate_bmi(weight, height):
+    """BMI from weight in kg and height in cm, or None if either is missing"""
+    if not weight or not height:
+        return None
+    height_m = float(height) / 100  # Convert cm to meters
+    return round(float(weight) / (height_m ** 2), 1)
+
 class MedicalRecord(models.Model):
     """Main medical record for a patient"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -137,6 +151,33 @@ class LabResult(models.Model):
     def __str__(self):
         return f"{self.test_name} - {self.patient.get_full_name()}"
 
+class LabResultValue(models.Model):
+    """
+    One numeric analyte reading extracted from LabResult.results, for indexed
+    cross-patient queries. Rebuilt on every lab result save.
+    """
+    lab_result = models.ForeignKey(LabResult, on_delete=models.CASCADE, related_name='values')
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lab_result_values')
+    
+    # Analyte names are stored lowercased so "HbA1c" and "hba1c" match
+    analyte = models.CharField(max_length=100)
+    value = models.DecimalField(max_digits=14, decimal_places=4)
+    unit = models.CharField(max_length=50, blank=True)
+    flag = models.CharField(max_length=20, blank=True, help_text="e.g., H, L, critical")
+    test_date = models.DateField()
+    
+    class Meta:
+        ordering = ['-test_date']
+        verbose_name = "Lab Result Value"
+        verbose_name_plural = "Lab Result Values"
+        indexes = [
+            models.Index(fields=['analyte', 'value', 'test_date'], name='emr_labvalue_analyte_idx'),
+            models.Index(fields=['patient', 'analyte', 'test_date'], name='emr_labvalue_patient_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.analyte} = {self.value} {self.unit}"
+
 class VitalSign(models.Model):
     """Patient vital signs"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -159,13 +200,17 @@ class VitalSign(models.Model):
     pain_level = models.PositiveIntegerField(null=True, blank=True, validators=[MinValueValidator(0), MaxValueValidator(10)])
     
     # Metadata
-    recorded_at = models.DateTimeField(auto_now_add=True)
+    # Defaults to now; device feeds supply the time the reading was taken
+    recorded_at = models.DateTimeField(default=timezone.now)
     notes = models.TextField(blank=True)
     
     class Meta:
         ordering = ['-recorded_at']
         verbose_name = "Vital Sign"
         verbose_name_plural = "Vital Signs"
+        indexes = [
+            models.Index(fields=['patient', 'recorded_at'], name='emr_vital_patient_recorded_idx'),
+        ]
     
     def __str__(self):
         return f"Vital Signs - {self.patient.get_full_name()} - {self.recorded_at.strftime('%Y-%m-%d %H:%M')}"
@@ -173,8 +218,7 @@ class VitalSign(models.Model):
     def save(self, *args, **kwargs):
         # Calculate BMI if weight and height are provided
         if self.weight and self.height:
-            height_m = float(self.height) / 100  # Convert cm to meters
-            self.bmi = round(float(self.weight) / (height_m ** 2), 1)
+            self.bmi = calculate_bmi(self.weight, self.height)
         super().save(*args, **kwargs)
 
 class Allergy(models.Model):
@@ -210,4 +254,40 @@ class Allergy(models.Model):
         unique_together = ['patient', 'allergen']
     
     def __str__(self):
-        return f"{self.allergen} - {self.patient.get_full_name()}"
\ No newline at end of file
+        return f"{self.allergen} - {self.patient.get_full_name()}"
+
+class ChartExport(models.Model):
+    """Bulk chart export job: who requested it, its progress and the finished ZIP"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('finished', 'Finished'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chart_exports')
+    filters = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Progress
+    total_records = models.PositiveIntegerField(default=0)
+    records_done = models.PositiveIntegerField(default=0)
+    prescriptions_done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    # Storage path of the finished ZIP, cleared once it is purged
+    path = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Chart Export"
+        verbose_name_plural = "Chart Exports"
+    
+    def __str__(self):
+        return f"Chart export {self.id} ({self.status})"
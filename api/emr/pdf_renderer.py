@@ -0,0 +1,342 @@
+"""
+Shared ReportLab renderer for prescription and medical record PDFs
+"""
+import tempfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+CLINIC_NAME = 'Healthcare Platform'
+CLINIC_ADDRESS = '123 Medical Center Drive | Healthcare City, HC 12345 | (555) 123-4567'
+
+# Rendered documents stay in memory up to this size, larger ones spill to a temp file
+SPOOL_MAX_MEMORY = 1024 * 1024  # 1 MB
+
+# Style sheets are built once per process and shared by every render
+styles = getSampleStyleSheet()
+
+title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=styles['Heading1'],
+    fontSize=20,
+    spaceAfter=20,
+    alignment=TA_CENTER,
+    textColor=colors.HexColor('#2563eb')
+)
+
+heading_style = ParagraphStyle(
+    'CustomHeading',
+    parent=styles['Heading2'],
+    fontSize=14,
+    spaceAfter=8,
+    textColor=colors.HexColor('#374151'),
+    backColor=colors.HexColor('#f3f4f6'),
+    leftIndent=10,
+    rightIndent=10,
+    borderColor=colors.HexColor('#2563eb'),
+    borderWidth=1,
+    borderPadding=8
+)
+
+normal_style = ParagraphStyle(
+    'CustomNormal',
+    parent=styles['Normal'],
+    fontSize=11,
+    spaceAfter=6
+)
+
+address_style = ParagraphStyle('Address', parent=styles['Normal'], fontSize=10, alignment=TA_CENTER, textColor=colors.grey)
+id_style = ParagraphStyle('ID', parent=styles['Normal'], fontSize=10, alignment=TA_RIGHT, textColor=colors.grey)
+document_title_style = ParagraphStyle('DocumentTitle', parent=styles['Heading1'], fontSize=16, alignment=TA_CENTER, textColor=colors.HexColor('#1f2937'))
+cell_style = ParagraphStyle('Cell', parent=styles['Normal'], fontSize=10)
+instructions_style = ParagraphStyle('Instructions', parent=styles['Normal'], fontSize=11,
+                                    leftIndent=20, backColor=colors.HexColor('#fef3c7'),
+                                    borderColor=colors.HexColor('#f59e0b'), borderWidth=1,
+                                    borderPadding=10)
+prescription_style = ParagraphStyle('Prescription', parent=styles['Normal'], fontSize=10,
+                                    leftIndent=20, backColor=colors.HexColor('#fefce8'),
+                                    borderColor=colors.HexColor('#d1d5db'), borderWidth=1,
+                                    borderPadding=8)
+lab_result_style = ParagraphStyle('LabResult', parent=styles['Normal'], fontSize=10,
+                                  leftIndent=20, backColor=colors.HexColor('#f0f9ff'),
+                                  borderColor=colors.HexColor('#d1d5db'), borderWidth=1,
+                                  borderPadding=8)
+detail_style = ParagraphStyle('Detail', parent=styles['Normal'], fontSize=9,
+                              leftIndent=40, textColor=colors.HexColor('#6b7280'))
+footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=9, alignment=TA_CENTER, textColor=colors.grey)
+
+people_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#374151')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8fafc')),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db'))
+])
+
+detail_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3f4f6')),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#374151')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+vitals_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#374151')),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db'))
+])
+
+signature_table_style = TableStyle([
+    ('LINEBELOW', (0, 1), (0, 1), 1, colors.black),
+    ('LINEBELOW', (1, 1), (1, 1), 1, colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('TOPPADDING', (0, 1), (-1, 1), 20),
+])
+
+
+def _text(value):
+    """Escape free text for Paragraph markup, keeping line breaks"""
+    return escape(str(value)).replace('\n', '<br/>')
+
+
+def _format_date(value):
+    return value.strftime('%B %d, %Y') if value else 'N/A'
+
+
+def _patient_details(patient):
+    return '<br/>'.join([
+        f"Name: {_text(patient.get_full_name())}",
+        f"DOB: {_format_date(patient.date_of_birth)}",
+        f"Gender: {_text(patient.get_gender_display() or 'N/A')}",
+        f"Phone: {_text(patient.phone or 'N/A')}",
+    ])
+
+
+def _doctor_details(doctor, issued_on):
+    if doctor is None:
+        return 'Not assigned'
+    profile = getattr(doctor, 'doctor_profile', None)
+    return '<br/>'.join([
+        f"Name: Dr. {_text(doctor.get_full_name())}",
+        f"Specialty: {_text(', '.join(profile.specialties) if profile else 'N/A')}",
+        f"License: {_text(profile.registration_number if profile else 'N/A')}",
+        f"Date: {_format_date(issued_on)}",
+    ])
+
+
+def _related_rows(instance, name, ordering):
+    """Rows the caller prefetched, otherwise an ordered iterator over the database"""
+    if name in getattr(instance, '_prefetched_objects_cache', {}):
+        return getattr(instance, name).all()
+    return getattr(instance, name).order_by(ordering).iterator()
+
+
+def _header(story, document_title, id_label, object_id):
+    story.append(Paragraph(CLINIC_NAME, title_style))
+    story.append(Paragraph(CLINIC_ADDRESS, address_style))
+    story.append(Spacer(1, 20))
+    story.append(Paragraph(f"{id_label}: {str(object_id)[:8].upper()}", id_style))
+    story.append(Spacer(1, 20))
+    story.append(Paragraph(document_title, document_title_style))
+    story.append(Spacer(1, 20))
+
+
+def _people_table(story, headings, patient, doctor, issued_on):
+    table = Table([
+        headings,
+        [Paragraph(_patient_details(patient), cell_style), Paragraph(_doctor_details(doctor, issued_on), cell_style)],
+    ], colWidths=[3*inch, 3*inch])
+    table.setStyle(people_table_style)
+    story.append(table)
+    story.append(Spacer(1, 20))
+
+
+def _section(story, title, body):
+    story.append(Paragraph(title, heading_style))
+    story.append(Paragraph(_text(body), normal_style))
+    story.append(Spacer(1, 15))
+
+
+def _footer(story, lines):
+    story.append(Spacer(1, 30))
+    story.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", footer_style))
+    for line in lines:
+        story.append(Paragraph(line, footer_style))
+
+
+def prescription_story(prescription):
+    """Flowables for a single prescription"""
+    story = []
+    _header(story, 'PRESCRIPTION', 'Prescription ID', prescription.id)
+    _people_table(story, ['Patient Information', 'Prescribing Doctor'], prescription.patient, prescription.doctor, prescription.created_at)
+
+    story.append(Paragraph("Medication Details", heading_style))
+    medication_data = [
+        ['Medication Name', prescription.medication_name],
+        ['Generic Name', prescription.generic_name or 'N/A'],
+        ['Dosage', prescription.dosage],
+        ['Frequency', prescription.frequency],
+        ['Duration', prescription.duration],
+        ['Quantity', str(prescription.quantity)],
+        ['Refills Allowed', str(prescription.refills_allowed)],
+        ['Status', prescription.get_status_display()],
+    ]
+    if prescription.expiry_date:
+        medication_data.append(['Expiry Date', _format_date(prescription.expiry_date)])
+    medication_table = Table(medication_data, colWidths=[2*inch, 4*inch])
+    medication_table.setStyle(detail_table_style)
+    story.append(medication_table)
+    story.append(Spacer(1, 15))
+
+    if prescription.instructions:
+        story.append(Paragraph("Instructions", heading_style))
+        story.append(Paragraph(_text(prescription.instructions), instructions_style))
+        story.append(Spacer(1, 15))
+
+    if prescription.medical_record and prescription.medical_record.diagnosis:
+        _section(story, "Diagnosis", prescription.medical_record.diagnosis)
+
+    story.append(Spacer(1, 30))
+    signature_table = Table([["Doctor's Signature", 'Date'], ['', '']], colWidths=[3*inch, 3*inch])
+    signature_table.setStyle(signature_table_style)
+    story.append(signature_table)
+
+    _footer(story, [
+        "This prescription is valid for 30 days from the date of issue.",
+        "For questions, contact your healthcare provider.",
+    ])
+    return story
+
+
+def _vital_rows(vital):
+    measurements = [
+        ('Blood Pressure', f"{vital.blood_pressure_systolic}/{vital.blood_pressure_diastolic}" if vital.blood_pressure_systolic else None, 'mmHg'),
+        ('Heart Rate', vital.heart_rate, 'bpm'),
+        ('Temperature', vital.temperature, '°F'),
+        ('Respiratory Rate', vital.respiratory_rate, '/min'),
+        ('Oxygen Saturation', vital.oxygen_saturation, '%'),
+        ('Weight', vital.weight, 'kg'),
+        ('Height', vital.height, 'cm'),
+        ('BMI', vital.bmi, ''),
+    ]
+    return [[label, str(value), unit] for label, value, unit in measurements if value]
+
+
+def medical_record_story(medical_record):
+    """Flowables for a complete medical record, using prefetched related rows when present"""
+    story = []
+    _header(story, 'MEDICAL RECORD', 'Medical Record ID', medical_record.id)
+    _people_table(story, ['Patient', 'Doctor'], medical_record.patient, medical_record.doctor, medical_record.created_at)
+
+    _section(story, "Chief Complaint", medical_record.chief_complaint)
+    _section(story, "History of Present Illness", medical_record.history_of_present_illness)
+    for title, body in [
+        ("Past Medical History", medical_record.past_medical_history),
+        ("Family History", medical_record.family_history),
+        ("Social History", medical_record.social_history),
+    ]:
+        if body:
+            _section(story, title, body)
+
+    vital_data = [['Measurement', 'Value', 'Unit']]
+    for vital in _related_rows(medical_record, 'record_vital_signs', 'recorded_at'):
+        vital_data.extend(_vital_rows(vital))
+    if len(vital_data) > 1:
+        story.append(Paragraph("Vital Signs", heading_style))
+        vital_table = Table(vital_data, colWidths=[2*inch, 1.5*inch, 1*inch], repeatRows=1)
+        vital_table.setStyle(vitals_table_style)
+        story.append(vital_table)
+        story.append(Spacer(1, 15))
+
+    _section(story, "Physical Examination", medical_record.physical_examination)
+    _section(story, "Diagnosis", medical_record.diagnosis)
+    _section(story, "Treatment Plan", medical_record.treatment_plan)
+
+    first = True
+    for prescription in _related_rows(medical_record, 'prescriptions', 'created_at'):
+        if first:
+            story.append(Paragraph("Prescriptions", heading_style))
+            first = False
+        story.append(Paragraph(
+            f"<b>{_text(prescription.medication_name)}</b> - {_text(prescription.dosage)} - "
+            f"{_text(prescription.frequency)} - {_text(prescription.duration)}",
+            prescription_style
+        ))
+        if prescription.instructions:
+            story.append(Paragraph(f"Instructions: {_text(prescription.instructions)}", detail_style))
+    if not first:
+        story.append(Spacer(1, 15))
+
+    first = True
+    for lab_result in _related_rows(medical_record, 'lab_results', 'test_date'):
+        if first:
+            story.append(Paragraph("Lab Results", heading_style))
+            first = False
+        story.append(Paragraph(
+            f"<b>{_text(lab_result.test_name)}</b> - {_text(lab_result.test_type)} - {_format_date(lab_result.test_date)}",
+            lab_result_style
+        ))
+        if lab_result.interpretation:
+            story.append(Paragraph(f"Interpretation: {_text(lab_result.interpretation)}", detail_style))
+    if not first:
+        story.append(Spacer(1, 15))
+
+    if medical_record.notes:
+        _section(story, "Additional Notes", medical_record.notes)
+
+    if medical_record.follow_up_required:
+        story.append(Paragraph("Follow-up", heading_style))
+        story.append(Paragraph("Follow-up required: Yes", normal_style))
+        if medical_record.follow_up_date:
+            story.append(Paragraph(f"Follow-up date: {_format_date(medical_record.follow_up_date)}", normal_style))
+        story.append(Spacer(1, 15))
+
+    _footer(story, [
+        f"Record ID: {str(medical_record.id)[:8].upper()}",
+        "For questions or concerns, please contact your healthcare provider.",
+    ])
+    return story
+
+
+STORIES = {
+    'prescription': prescription_story,
+    'medical_record': medical_record_story,
+}
+
+
+def render_pdf(kind, obj, output):
+    """Render a document into any writable binary file object"""
+    doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    doc.build(STORIES[kind](obj))
+
+
+def render_to_tempfile(kind, obj):
+    """
+    Render a document into a spooled temp file, rewound and ready to stream.
+    Small documents stay in memory; large ones spill to disk instead of being
+    copied out of a BytesIO.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    render_pdf(kind, obj, output)
+    output.seek(0)
+    return output
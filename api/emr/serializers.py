@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import MedicalRecord, Prescription, LabResult, VitalSign, Allergy
+from .models import (
+    MedicalRecord, Prescription, LabResult, LabResultValue, VitalSign, Allergy, ChartExport, VITAL_TREND_METRICS
+)
+from .interactions import AllergyCheckService
 
 User = get_user_model()
 
@@ -85,6 +88,32 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class MedicalRecordSummarySerializer(serializers.ModelSerializer):
+    """Medical record without nested prescriptions, lab results and vitals"""
+    doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
+    patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
+    
+    class Meta:
+        model = MedicalRecord
+        fields = [
+            'id', 'patient', 'patient_name', 'doctor', 'doctor_name', 'appointment',
+            'chief_complaint', 'diagnosis', 'treatment_plan', 'follow_up_required',
+            'follow_up_date', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+class MedicalRecordSearchResultSerializer(MedicalRecordSummarySerializer):
+    """Medical record summary with its search rank and highlighted snippet"""
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.SerializerMethodField()
+    
+    class Meta(MedicalRecordSummarySerializer.Meta):
+        fields = MedicalRecordSummarySerializer.Meta.fields + ['rank', 'snippet']
+        read_only_fields = fields
+    
+    def get_snippet(self, obj):
+        return self.context.get('snippets', {}).get(obj.id, '')
+
 class MedicalRecordCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating medical records with prescriptions"""
     prescriptions = PrescriptionSerializer(many=True, required=False)
@@ -123,15 +152,48 @@ class MedicalRecordCreateSerializer(serializers.ModelSerializer):
         return medical_record
 
 class PrescriptionCreateSerializer(serializers.ModelSerializer):
+    acknowledge_allergies = serializers.BooleanField(
+        write_only=True, required=False, default=False,
+        help_text="Prescribe despite allergy conflicts"
+    )
+    
     class Meta:
         model = Prescription
         fields = [
             'medical_record', 'medication_name', 'generic_name', 'dosage',
             'frequency', 'duration', 'quantity', 'instructions', 'refills_allowed',
-            'expiry_date'
+            'expiry_date', 'acknowledge_allergies'
         ]
     
+    def validate(self, attrs):
+        if attrs.get('acknowledge_allergies'):
+            return attrs
+        
+        instance = self.instance
+        if instance is not None and not {'medical_record', 'medication_name', 'generic_name'} & set(attrs):
+            # Dosage or status edits leave the prescribed drug unchanged
+            return attrs
+        medical_record = attrs.get('medical_record') or getattr(instance, 'medical_record', None)
+        medication_name = attrs.get('medication_name', getattr(instance, 'medication_name', ''))
+        generic_name = attrs.get('generic_name', getattr(instance, 'generic_name', ''))
+        if medical_record is None:
+            return attrs
+        
+        conflicts = AllergyCheckService.check(medical_record.patient_id, medication_name, generic_name)
+        if conflicts:
+            raise serializers.ValidationError({
+                'allergy_conflicts': conflicts,
+                'detail': "Medication conflicts with the patient's allergies; "
+                          "resubmit with acknowledge_allergies to override",
+            })
+        return attrs
+    
+    def update(self, instance, validated_data):
+        validated_data.pop('acknowledge_allergies', None)
+        return super().update(instance, validated_data)
+    
     def create(self, validated_data):
+        validated_data.pop('acknowledge_allergies', None)
         # Set patient and doctor from medical record
         medical_record = validated_data['medical_record']
         validated_data['patient'] = medical_record.patient
@@ -139,6 +201,15 @@ class PrescriptionCreateSerializer(serializers.ModelSerializer):
         
         return Prescription.objects.create(**validated_data)
 
+class AllergyCheckMedicationSerializer(serializers.Serializer):
+    medication_name = serializers.CharField(max_length=200)
+    generic_name = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+
+class AllergyCheckRequestSerializer(serializers.Serializer):
+    """Body for the batch medication-allergy check"""
+    patient = serializers.IntegerField()
+    medications = AllergyCheckMedicationSerializer(many=True, allow_empty=False)
+
 class LabResultCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = LabResult
@@ -181,4 +252,76 @@ class AllergyCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Set recorded_by from request user
         validated_data['recorded_by'] = self.context['request'].user
-        return Allergy.objects.create(**validated_data)
\ No newline at end of file
+        return Allergy.objects.create(**validated_data)
+
+class ChartExportRequestSerializer(serializers.Serializer):
+    """Filters for a bulk chart export"""
+    patient = serializers.IntegerField(required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('start_date') and attrs.get('end_date') and attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError("start_date must be before end_date")
+        return attrs
+
+class ChartExportSerializer(serializers.ModelSerializer):
+    """Progress of a chart export job"""
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    
+    class Meta:
+        model = ChartExport
+        fields = [
+            'job_id', 'status', 'filters', 'total_records', 'records_done', 'prescriptions_done',
+            'error', 'created_at', 'finished_at', 'expires_at'
+        ]
+        read_only_fields = fields
+
+class VitalTrendParamsSerializer(serializers.Serializer):
+    """Query parameters for the vital sign trend endpoint"""
+    patient = serializers.IntegerField(required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(choices=['hour', 'day', 'week', 'month', 'quarter', 'year'], required=False)
+    metrics = serializers.CharField(required=False, help_text="Comma-separated metric names")
+    
+    def validate_metrics(self, value):
+        metrics = [metric.strip() for metric in value.split(',') if metric.strip()]
+        unknown = set(metrics) - set(VITAL_TREND_METRICS)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+        return metrics
+    
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError("start must be before end")
+        return attrs
+
+class LabResultValueSerializer(serializers.ModelSerializer):
+    patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
+    test_name = serializers.CharField(source='lab_result.test_name', read_only=True)
+    
+    class Meta:
+        model = LabResultValue
+        fields = [
+            'id', 'lab_result', 'test_name', 'patient', 'patient_name',
+            'analyte', 'value', 'unit', 'flag', 'test_date'
+        ]
+        read_only_fields = fields
+
+class LabValueQueryParamsSerializer(serializers.Serializer):
+    """Query parameters for the lab value search endpoint"""
+    analyte = serializers.CharField(max_length=100)
+    min_value = serializers.DecimalField(max_digits=14, decimal_places=4, required=False)
+    max_value = serializers.DecimalField(max_digits=14, decimal_places=4, required=False)
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    days = serializers.IntegerField(min_value=1, required=False, help_text="Shorthand for since=today-days")
+    
+    def validate(self, attrs):
+        if attrs.get('days') and attrs.get('since'):
+            raise serializers.ValidationError("Use either days or since, not both")
+        if attrs.get('min_value') is not None and attrs.get('max_value') is not None \
+                and attrs['min_value'] > attrs['max_value']:
+            raise serializers.ValidationError("min_value must not exceed max_value")
+        return attrs
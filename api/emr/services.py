@@ -0,0 +1,886 @@
+"""
+Services for electronic medical records
+"""
+import hashlib
+import html
+import logging
+import re
+import tempfile
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from django.db import connections, transaction
+from django.db.models import (
+    Avg, BooleanField, Count, Exists, FloatField, Max, Min, OuterRef, Prefetch, Q, QuerySet, Subquery
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from django.utils.text import slugify
+from celery import shared_task
+
+from appointments.models import Appointment
+from .models import (
+    MedicalRecord, Prescription, LabResult, LabResultValue, VitalSign, Allergy, ChartExport,
+    VITAL_TREND_METRICS, calculate_bmi
+)
+from .pdf_renderer import render_pdf, render_to_tempfile
+from .serializers import (
+    MedicalRecordSummarySerializer, PrescriptionSerializer, LabResultSerializer,
+    VitalSignSerializer, AllergySerializer, VitalSignCreateSerializer
+)
+
+logger = logging.getLogger(__name__)
+
+EMR_SUMMARY_CACHE_TIMEOUT = 60 * 10  # 10 minutes
+RECENT_LAB_RESULTS_LIMIT = 5
+EMR_STATS_CACHE_TIMEOUT = 60 * 10  # 10 minutes
+RECENT_RECORDS_LIMIT = 5
+
+# Bump when the PDF layouts change so previously cached documents are not served
+PDF_RENDER_VERSION = 2
+PDF_CACHE_DIR = 'pdf_cache'
+PDF_RENDER_LOCK_TIMEOUT = 60 * 10  # 10 minutes
+# Medical records with more related rows than this are rendered in the background
+PDF_ASYNC_ROW_THRESHOLD = 100
+
+CHART_EXPORT_DIR = 'chart_exports'
+CHART_EXPORT_CHUNK_SIZE = 50
+# Finished ZIPs are downloadable for this long, then deleted by purge_chart_exports
+CHART_EXPORT_RETENTION = timedelta(days=1)
+
+# Truncation kinds from finest to coarsest with their approximate width
+VITAL_TREND_BUCKETS = [
+    ('hour', timedelta(hours=1)),
+    ('day', timedelta(days=1)),
+    ('week', timedelta(weeks=1)),
+    ('month', timedelta(days=30)),
+    ('quarter', timedelta(days=91)),
+    ('year', timedelta(days=365)),
+]
+VITAL_TREND_MAX_POINTS = 120
+VITAL_TREND_DEFAULT_RANGE = timedelta(days=365)
+
+VITALS_BULK_MAX_ITEMS = 10000
+VITALS_BULK_BATCH_SIZE = 1000
+
+# "8.2", "8.2 %", "<0.5 mg/dL": optional comparator, number, then the unit
+LAB_VALUE_NUMBER_RE = re.compile(r'^\s*[<>]?=?\s*(-?\d+(?:\.\d+)?)\s*(.*)$')
+LAB_VALUE_QUANTUM = Decimal('0.0001')
+LAB_VALUE_LIMIT = Decimal('1e10')
+LAB_VALUE_REBUILD_CHUNK_SIZE = 1000
+
+# Clinical text indexed for full-text search, heaviest weight first
+MEDICAL_RECORD_SEARCH_FIELDS = {
+    'A': ['chief_complaint', 'diagnosis'],
+    'B': ['history_of_present_illness', 'treatment_plan', 'notes'],
+    'C': ['physical_examination', 'past_medical_history', 'family_history', 'social_history'],
+}
+MEDICAL_RECORD_SEARCH_WEIGHTS = {'A': 4.0, 'B': 2.0, 'C': 1.0}
+MEDICAL_RECORD_SEARCH_CONFIG = 'english'
+MEDICAL_RECORD_FTS_TABLE = 'emr_medicalrecord_fts'
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+# Control characters that cannot occur in clinical text mark highlights until the snippet is escaped
+SNIPPET_START, SNIPPET_STOP = '\x02', '\x03'
+SNIPPET_WORDS = 24
+
+
+def _count_for_patient(model) -> Coalesce:
+    """Correlated COUNT(*) of ``model`` rows for the outer row's patient"""
+    counts = (
+        model.objects.filter(patient=OuterRef('patient'))
+        .order_by()
+        .values('patient')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class EMRSummaryService:
+    """Patient EMR home-screen summary with a fixed query budget and per-patient caching"""
+
+    @staticmethod
+    def cache_key(patient_id: int) -> str:
+        return f'emr_summary:{patient_id}'
+
+    @staticmethod
+    def invalidate(patient_id: int) -> None:
+        """Drop a patient's cached summary once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(EMRSummaryService.cache_key(patient_id)))
+
+    @staticmethod
+    def build(patient) -> Dict[str, Any]:
+        """
+        Build the summary in five queries regardless of record volume.
+
+        The record and prescription totals ride along as correlated subqueries on
+        the latest-record query, and every list is fetched with its doctor and
+        patient joined so the serializers never touch the database.
+        """
+        latest_record = (
+            MedicalRecord.objects.filter(patient=patient)
+            .select_related('doctor', 'patient')
+            .annotate(
+                total_records=_count_for_patient(MedicalRecord),
+                total_prescriptions=_count_for_patient(Prescription),
+            )
+            .order_by('-created_at')
+            .first()
+        )
+        active_prescriptions = (
+            Prescription.objects.filter(patient=patient, status='pending')
+            .select_related('doctor', 'patient')
+            .order_by('-created_at')
+        )
+        recent_lab_results = (
+            LabResult.objects.filter(patient=patient, status='completed')
+            .select_related('doctor', 'patient')
+            .order_by('-result_date')[:RECENT_LAB_RESULTS_LIMIT]
+        )
+        allergies = Allergy.objects.filter(patient=patient, is_active=True).select_related('recorded_by')
+        latest_vitals = (
+            VitalSign.objects.filter(patient=patient)
+            .select_related('recorded_by')
+            .order_by('-recorded_at')
+            .first()
+        )
+
+        # Prescriptions always hang off a medical record, so no records means no prescriptions
+        return {
+            'latest_record': MedicalRecordSummarySerializer(latest_record).data if latest_record else None,
+            'active_prescriptions': PrescriptionSerializer(active_prescriptions, many=True).data,
+            'recent_lab_results': LabResultSerializer(recent_lab_results, many=True).data,
+            'allergies': AllergySerializer(allergies, many=True).data,
+            'latest_vitals': VitalSignSerializer(latest_vitals).data if latest_vitals else None,
+            'total_records': latest_record.total_records if latest_record else 0,
+            'total_prescriptions': latest_record.total_prescriptions if latest_record else 0,
+        }
+
+    @staticmethod
+    def get_summary(patient) -> Dict[str, Any]:
+        """Return the cached summary for a patient, building it on a miss"""
+        key = EMRSummaryService.cache_key(patient.id)
+        summary = cache.get(key)
+        if summary is None:
+            summary = EMRSummaryService.build(patient)
+            cache.set(key, summary, EMR_SUMMARY_CACHE_TIMEOUT)
+        return summary
+
+
+class EMRStatsService:
+    """Doctor dashboard counters computed with one conditional aggregate per table"""
+
+    @staticmethod
+    def cache_key(doctor_id: int) -> str:
+        return f'emr_stats:{doctor_id}'
+
+    @staticmethod
+    def invalidate(doctor_id: int) -> None:
+        """Drop a doctor's cached stats once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(EMRStatsService.cache_key(doctor_id)))
+
+    @staticmethod
+    def build(doctor) -> Dict[str, Any]:
+        """Four queries: a count and an aggregate per table plus the recent records"""
+        records = MedicalRecord.objects.filter(doctor=doctor).order_by()
+        prescriptions = Prescription.objects.filter(doctor=doctor).order_by().aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='pending')),
+        )
+        lab_results = LabResult.objects.filter(doctor=doctor).order_by().aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        return {
+            'total_records': records.count(),
+            'total_prescriptions': prescriptions['total'],
+            'total_lab_results': lab_results['total'],
+            'active_prescriptions': prescriptions['active'],
+            'completed_lab_results': lab_results['completed'],
+            'recent_records': list(
+                records.order_by('-created_at')[:RECENT_RECORDS_LIMIT].values(
+                    'id', 'patient__first_name', 'patient__last_name', 'created_at', 'diagnosis'
+                )
+            ),
+        }
+
+    @staticmethod
+    def get_stats(doctor) -> Dict[str, Any]:
+        """Return the cached dashboard stats for a doctor, building them on a miss"""
+        key = EMRStatsService.cache_key(doctor.id)
+        stats = cache.get(key)
+        if stats is None:
+            stats = EMRStatsService.build(doctor)
+            cache.set(key, stats, EMR_STATS_CACHE_TIMEOUT)
+        return stats
+
+
+class PDFCacheService:
+    """
+    Content-addressed cache of rendered prescription and medical record PDFs
+
+    Each object's renders live under their own directory, and storing a new
+    render deletes the superseded ones, so only the current version of a
+    document is kept in storage.
+    """
+
+    SOURCES = {
+        'prescription': (Prescription, ['patient', 'doctor__doctor_profile', 'medical_record']),
+        'medical_record': (MedicalRecord, ['patient', 'doctor__doctor_profile']),
+    }
+
+    @staticmethod
+    def load(kind: str, object_id) -> Any:
+        model, related = PDFCacheService.SOURCES[kind]
+        return model.objects.select_related(*related).get(id=object_id)
+
+    @staticmethod
+    def fingerprint(kind: str, obj) -> Tuple[str, int]:
+        """
+        Hash everything the document is rendered from: the object's and its
+        people's ``updated_at`` (including the doctor's profile) plus the count
+        and latest change of each related table. Returns the digest and the
+        number of related rows.
+        """
+        parts = [kind, PDF_RENDER_VERSION, obj.id, obj.updated_at, obj.patient.updated_at]
+        parts.append(obj.doctor.updated_at if obj.doctor else None)
+        profile = getattr(obj.doctor, 'doctor_profile', None) if obj.doctor else None
+        parts.append(profile.updated_at if profile else None)
+        rows = 0
+        if kind == 'prescription':
+            parts.append(obj.medical_record.updated_at)
+        else:
+            children = [
+                (obj.prescriptions, 'updated_at'),
+                (obj.lab_results, 'updated_at'),
+                (obj.record_vital_signs, 'recorded_at'),
+            ]
+            for manager, changed_field in children:
+                stats = manager.order_by().aggregate(total=Count('id'), changed=Max(changed_field))
+                parts += [stats['total'], stats['changed']]
+                rows += stats['total']
+        digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+        return digest, rows
+
+    @staticmethod
+    def object_dir(kind: str, object_id) -> str:
+        return f'{PDF_CACHE_DIR}/{kind}/{object_id}'
+
+    @staticmethod
+    def storage_path(kind: str, object_id, digest: str) -> str:
+        return f'{PDFCacheService.object_dir(kind, object_id)}/{digest}.pdf'
+
+    @staticmethod
+    def open_cached(kind: str, object_id, digest: str) -> Optional[File]:
+        """Open a previously rendered PDF from the default storage backend for streaming"""
+        path = PDFCacheService.storage_path(kind, object_id, digest)
+        if not default_storage.exists(path):
+            return None
+        return default_storage.open(path, 'rb')
+
+    @staticmethod
+    def render_and_store(kind: str, obj, digest: str):
+        """
+        Render into a spooled temp file, copy it to storage in chunks and return
+        the temp file rewound so the caller can stream it without a second read.
+        """
+        output = render_to_tempfile(kind, obj)
+        path = PDFCacheService.storage_path(kind, obj.id, digest)
+        if not default_storage.exists(path):
+            default_storage.save(path, File(output, name=path))
+            output.seek(0)
+            PDFCacheService.prune(kind, obj.id, keep=digest)
+        return output
+
+    @staticmethod
+    def prune(kind: str, object_id, keep: Optional[str] = None) -> int:
+        """Delete an object's cached renders other than ``keep``; returns how many were removed"""
+        directory = PDFCacheService.object_dir(kind, object_id)
+        try:
+            _, files = default_storage.listdir(directory)
+        except FileNotFoundError:
+            return 0
+        stale = [name for name in files if name != f'{keep}.pdf']
+        for name in stale:
+            default_storage.delete(f'{directory}/{name}')
+        return len(stale)
+
+    @staticmethod
+    def clear() -> int:
+        """Delete every cached render, including ones from before the per-object layout"""
+        removed = 0
+        pending = [PDF_CACHE_DIR]
+        while pending:
+            directory = pending.pop()
+            try:
+                directories, files = default_storage.listdir(directory)
+            except FileNotFoundError:
+                continue
+            for name in files:
+                default_storage.delete(f'{directory}/{name}')
+            removed += len(files)
+            pending.extend(f'{directory}/{name}' for name in directories)
+        return removed
+
+    @staticmethod
+    def _lock_key(kind: str, digest: str) -> str:
+        return f'pdf_render:{kind}:{digest}'
+
+    @staticmethod
+    def enqueue(kind: str, object_id, digest: str) -> bool:
+        """Schedule a background render unless one is already running for this digest"""
+        if not cache.add(PDFCacheService._lock_key(kind, digest), True, PDF_RENDER_LOCK_TIMEOUT):
+            return False
+        render_emr_pdf.delay(kind, str(object_id), digest)
+        return True
+
+
+class ChartExportService:
+    """
+    Bulk export of medical records and prescriptions into a single ZIP of PDFs.
+
+    Jobs are ChartExport rows, so the requester, progress and archive path are
+    visible to every web and worker process.
+    """
+
+    @staticmethod
+    def records_queryset(filters: Dict[str, Any]) -> QuerySet:
+        """
+        Medical records matching the export filters with every row the renderer
+        needs joined or prefetched: four queries per chunk of records.
+        """
+        records = MedicalRecord.objects.all()
+        if filters.get('patient_id'):
+            records = records.filter(patient_id=filters['patient_id'])
+        if filters.get('doctor_id'):
+            records = records.filter(doctor_id=filters['doctor_id'])
+        if filters.get('start_date'):
+            records = records.filter(created_at__date__gte=filters['start_date'])
+        if filters.get('end_date'):
+            records = records.filter(created_at__date__lte=filters['end_date'])
+        return (
+            records.select_related('patient', 'doctor__doctor_profile')
+            .prefetch_related(
+                Prefetch(
+                    'prescriptions',
+                    queryset=Prescription.objects.select_related('patient', 'doctor__doctor_profile').order_by('created_at')
+                ),
+                Prefetch('lab_results', queryset=LabResult.objects.order_by('test_date')),
+                Prefetch('record_vital_signs', queryset=VitalSign.objects.order_by('recorded_at')),
+            )
+            .order_by('created_at', 'id')
+        )
+
+    @staticmethod
+    def start(user, filters: Dict[str, Any]) -> ChartExport:
+        """Register an export job and hand it to Celery"""
+        job = ChartExport.objects.create(
+            requested_by=user,
+            filters={key: str(value) for key, value in filters.items() if value},
+            total_records=ChartExportService.records_queryset(filters).count(),
+        )
+        export_chart.delay(str(job.id))
+        return job
+
+    @staticmethod
+    def export(job: ChartExport) -> ChartExport:
+        """
+        Render every matching record, and each of its prescriptions, straight
+        into a ZIP entry. The archive is built in a temp file on disk and copied
+        to the default storage backend once complete.
+        """
+        job.status = 'running'
+        job.save(update_fields=['status', 'updated_at'])
+
+        archive = tempfile.TemporaryFile()
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            records = ChartExportService.records_queryset(job.filters)
+            for record in records.iterator(chunk_size=CHART_EXPORT_CHUNK_SIZE):
+                prefix = f"{record.created_at:%Y-%m-%d}_{str(record.id)[:8]}"
+                with zf.open(f'medical_records/{prefix}.pdf', 'w', force_zip64=True) as entry:
+                    render_pdf('medical_record', record, entry)
+                for prescription in record.prescriptions.all():
+                    name = f"{slugify(prescription.medication_name) or 'prescription'}_{str(prescription.id)[:8]}"
+                    with zf.open(f'prescriptions/{prefix}_{name}.pdf', 'w', force_zip64=True) as entry:
+                        render_pdf('prescription', prescription, entry)
+                    job.prescriptions_done += 1
+                job.records_done += 1
+                job.save(update_fields=['records_done', 'prescriptions_done', 'updated_at'])
+
+        archive.seek(0)
+        path = f'{CHART_EXPORT_DIR}/{job.id.hex}.zip'
+        job.path = default_storage.save(path, File(archive, name=path))
+        archive.close()
+        job.status = 'finished'
+        job.finished_at = timezone.now()
+        job.expires_at = job.finished_at + CHART_EXPORT_RETENTION
+        job.save(update_fields=['path', 'status', 'finished_at', 'expires_at', 'updated_at'])
+        return job
+
+    @staticmethod
+    def is_expired(job: ChartExport, now: Optional[datetime] = None) -> bool:
+        return job.expires_at is not None and job.expires_at <= (now or timezone.now())
+
+    @staticmethod
+    def purge_expired(now: Optional[datetime] = None) -> int:
+        """Delete export ZIPs past their expiry; returns how many were removed"""
+        expired = list(
+            ChartExport.objects.filter(expires_at__lte=now or timezone.now())
+            .exclude(path='')
+            .values_list('id', 'path')
+        )
+        for _, path in expired:
+            default_storage.delete(path)
+        ChartExport.objects.filter(id__in=[job_id for job_id, _ in expired]).update(path='', updated_at=timezone.now())
+        return len(expired)
+
+
+class VitalTrendService:
+    """Downsampled vital sign series grouped by a database-side date_trunc"""
+
+    @staticmethod
+    def choose_bucket(start: datetime, end: datetime, max_points: int = VITAL_TREND_MAX_POINTS) -> str:
+        """Finest bucket that keeps the series within ``max_points``"""
+        span = end - start
+        for kind, width in VITAL_TREND_BUCKETS:
+            if span / width <= max_points:
+                return kind
+        return VITAL_TREND_BUCKETS[-1][0]
+
+    @staticmethod
+    def resolve_bucket(start: datetime, end: datetime, bucket: Optional[str] = None) -> str:
+        """The requested bucket, coarsened to ``choose_bucket`` when it would exceed the point limit"""
+        finest = VitalTrendService.choose_bucket(start, end)
+        if bucket is None:
+            return finest
+        kinds = [kind for kind, _ in VITAL_TREND_BUCKETS]
+        return bucket if kinds.index(bucket) >= kinds.index(finest) else finest
+
+    @staticmethod
+    def series(
+        patient_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        bucket: Optional[str] = None,
+        metrics: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Min/max/avg per bucket for each metric in one grouped query on the
+        (patient, recorded_at) index. The number of points is bounded by the
+        bucket choice, not by how many readings the patient has: a requested
+        bucket finer than the range allows is coarsened, and the bucket used
+        is returned with the series.
+        """
+        end = end or timezone.now()
+        start = start or end - VITAL_TREND_DEFAULT_RANGE
+        bucket = VitalTrendService.resolve_bucket(start, end, bucket)
+        metrics = metrics or VITAL_TREND_METRICS
+
+        aggregates = {'readings': Count('id')}
+        for metric in metrics:
+            aggregates[f'{metric}__min'] = Min(metric)
+            aggregates[f'{metric}__max'] = Max(metric)
+            aggregates[f'{metric}__avg'] = Avg(metric)
+        rows = (
+            VitalSign.objects.filter(patient_id=patient_id, recorded_at__gte=start, recorded_at__lt=end)
+            .annotate(bucket=Trunc('recorded_at', bucket))
+            .values('bucket')
+            .annotate(**aggregates)
+            .order_by('bucket')
+        )
+
+        points = []
+        for row in rows:
+            point = {'bucket': row['bucket'], 'readings': row['readings']}
+            for metric in metrics:
+                if row[f'{metric}__avg'] is None:
+                    point[metric] = None
+                    continue
+                point[metric] = {
+                    'min': float(row[f'{metric}__min']),
+                    'max': float(row[f'{metric}__max']),
+                    'avg': round(float(row[f'{metric}__avg']), 1),
+                }
+            points.append(point)
+        return {'bucket': bucket, 'start': start, 'end': end, 'metrics': metrics, 'points': points}
+
+
+class VitalSignIngestionService:
+    """Validate and insert batches of device vital sign readings"""
+
+    RELATION_FIELDS = ('patient', 'medical_record')
+
+    @staticmethod
+    def _scalar_fields() -> Dict[str, serializers.Field]:
+        """
+        Bound fields of VitalSignCreateSerializer, so bulk readings get the same
+        type coercion and range validators as single POSTs, plus recorded_at.
+        """
+        fields = {
+            name: field for name, field in VitalSignCreateSerializer().fields.items()
+            if name not in VitalSignIngestionService.RELATION_FIELDS
+        }
+        fields['recorded_at'] = serializers.DateTimeField(required=False)
+        return fields
+
+    @staticmethod
+    def _as_uuid(value) -> Optional[uuid.UUID]:
+        try:
+            return uuid.UUID(str(value)) if value else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def ingest(items: List[Any], recorded_by, patient=None, doctor=None) -> Dict[str, Any]:
+        """
+        Validate every item, insert the valid ones with bulk_create and report
+        per-item errors by index. Patients and medical records are resolved
+        with one query each instead of one per reading. ``patient`` pins all
+        readings to a single patient (used for patient-authenticated devices);
+        ``doctor`` limits readings to patients that doctor has an appointment
+        or medical record with.
+        """
+        User = get_user_model()
+        fields = VitalSignIngestionService._scalar_fields()
+
+        patient_ids = set()
+        record_ids = set()
+        for item in items:
+            if isinstance(item, dict):
+                if patient is None and isinstance(item.get('patient'), int):
+                    patient_ids.add(item['patient'])
+                record_id = VitalSignIngestionService._as_uuid(item.get('medical_record'))
+                if record_id:
+                    record_ids.add(record_id)
+        patients = User.objects.filter(id__in=patient_ids, role='patient')
+        if doctor is not None:
+            patients = patients.filter(
+                Exists(Appointment.objects.filter(doctor__user=doctor, patient=OuterRef('pk')))
+                | Exists(MedicalRecord.objects.filter(doctor=doctor, patient=OuterRef('pk')))
+            )
+        known_patients = set(patients.values_list('id', flat=True))
+        record_patients = dict(MedicalRecord.objects.filter(id__in=record_ids).values_list('id', 'patient_id'))
+
+        readings = []
+        errors = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object']}})
+                continue
+
+            item_errors = {}
+            values = {}
+            for name, field in fields.items():
+                if name not in item:
+                    continue
+                try:
+                    values[name] = field.run_validation(item[name])
+                except serializers.ValidationError as e:
+                    item_errors[name] = e.detail
+
+            if patient is not None:
+                patient_id = patient.id
+                if item.get('patient') not in (None, patient_id):
+                    item_errors['patient'] = ['Readings can only be submitted for yourself.']
+            else:
+                patient_id = item.get('patient')
+                if patient_id not in known_patients:
+                    item_errors['patient'] = ['This field is required.' if patient_id is None else 'Invalid patient.']
+            record_id = None
+            if item.get('medical_record'):
+                record_id = VitalSignIngestionService._as_uuid(item['medical_record'])
+                if record_id not in record_patients:
+                    item_errors['medical_record'] = ['Invalid medical record.']
+                elif record_patients[record_id] != patient_id:
+                    item_errors['medical_record'] = ['Medical record belongs to a different patient.']
+
+            if item_errors:
+                errors.append({'index': index, 'errors': item_errors})
+                continue
+            readings.append(VitalSign(
+                patient_id=patient_id,
+                medical_record_id=record_id,
+                recorded_by=recorded_by,
+                bmi=calculate_bmi(values.get('weight'), values.get('height')),
+                **values
+            ))
+
+        with transaction.atomic():
+            VitalSign.objects.bulk_create(readings, batch_size=VITALS_BULK_BATCH_SIZE)
+            # bulk_create bypasses post_save, so drop cached summaries explicitly
+            for patient_id in {reading.patient_id for reading in readings}:
+                EMRSummaryService.invalidate(patient_id)
+
+        return {'created': len(readings), 'failed': len(errors), 'errors': errors}
+
+
+class LabValueService:
+    """Maintain and query the normalized LabResultValue side table"""
+
+    @staticmethod
+    def parse_number(raw) -> Tuple[Optional[Decimal], str]:
+        """Numeric value and any trailing unit from a JSON scalar, or (None, '')"""
+        if isinstance(raw, bool) or raw is None:
+            return None, ''
+        if isinstance(raw, (int, float)):
+            text, unit = str(raw), ''
+        elif isinstance(raw, str):
+            match = LAB_VALUE_NUMBER_RE.match(raw)
+            if not match:
+                return None, ''
+            text, unit = match.group(1), match.group(2).strip()
+        else:
+            return None, ''
+        try:
+            value = Decimal(text).quantize(LAB_VALUE_QUANTUM)
+        except InvalidOperation:
+            return None, ''
+        if not value.is_finite() or abs(value) >= LAB_VALUE_LIMIT:
+            return None, ''
+        return value, unit
+
+    @staticmethod
+    def extract(lab_result: LabResult) -> List[LabResultValue]:
+        """
+        Unsaved LabResultValue rows for every numeric analyte in ``results``.
+        Accepts ``{"HbA1c": 8.2}``, ``{"HbA1c": "8.2 %"}``,
+        ``{"HbA1c": {"value": 8.2, "unit": "%", "flag": "H"}}`` and lists of
+        ``{"analyte"|"name": ..., "value": ..., "unit": ..., "flag": ...}``.
+        """
+        results = lab_result.results
+        if isinstance(results, dict):
+            entries = list(results.items())
+        elif isinstance(results, list):
+            entries = [
+                (entry.get('analyte') or entry.get('name'), entry)
+                for entry in results if isinstance(entry, dict)
+            ]
+        else:
+            return []
+
+        values = []
+        for name, data in entries:
+            if not isinstance(name, str) or not name.strip():
+                continue
+            if isinstance(data, dict):
+                raw, unit, flag = data.get('value'), data.get('unit') or '', data.get('flag') or ''
+            else:
+                raw, unit, flag = data, '', ''
+            value, parsed_unit = LabValueService.parse_number(raw)
+            if value is None:
+                continue
+            values.append(LabResultValue(
+                lab_result_id=lab_result.id,
+                patient_id=lab_result.patient_id,
+                analyte=name.strip().lower()[:100],
+                value=value,
+                unit=str(unit or parsed_unit)[:50],
+                flag=str(flag)[:20],
+                test_date=lab_result.test_date,
+            ))
+        return values
+
+    @staticmethod
+    def sync(lab_result: LabResult) -> int:
+        """Replace a lab result's extracted values"""
+        values = LabValueService.extract(lab_result)
+        with transaction.atomic():
+            LabResultValue.objects.filter(lab_result_id=lab_result.id).delete()
+            LabResultValue.objects.bulk_create(values)
+        return len(values)
+
+    @staticmethod
+    def rebuild(chunk_size: int = LAB_VALUE_REBUILD_CHUNK_SIZE) -> int:
+        """Backfill the side table from every lab result, one chunk per transaction"""
+        created = 0
+        last_id = None
+        while True:
+            lab_results = LabResult.objects.order_by('id').only('id', 'patient_id', 'results', 'test_date')
+            if last_id is not None:
+                lab_results = lab_results.filter(id__gt=last_id)
+            chunk = list(lab_results[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            values = [value for lab_result in chunk for value in LabValueService.extract(lab_result)]
+            with transaction.atomic():
+                LabResultValue.objects.filter(lab_result_id__in=[lab_result.id for lab_result in chunk]).delete()
+                LabResultValue.objects.bulk_create(values, batch_size=chunk_size)
+            created += len(values)
+        return created
+
+    @staticmethod
+    def query(
+        analyte: str,
+        min_value: Optional[Decimal] = None,
+        max_value: Optional[Decimal] = None,
+        since: Optional[date] = None,
+        until: Optional[date] = None
+    ) -> QuerySet:
+        """Range scan on (analyte, value, test_date)"""
+        values = LabResultValue.objects.filter(analyte=analyte.strip().lower())
+        if min_value is not None:
+            values = values.filter(value__gte=min_value)
+        if max_value is not None:
+            values = values.filter(value__lte=max_value)
+        if since is not None:
+            values = values.filter(test_date__gte=since)
+        if until is not None:
+            values = values.filter(test_date__lte=until)
+        return values
+
+
+class MedicalRecordSearchService:
+    """
+    Ranked full-text search over the clinical text of medical records.
+
+    PostgreSQL gets a stored generated ``tsvector`` column on the medical
+    record table with a GIN index; SQLite (tests and local development) gets
+    an FTS5 table maintained by triggers. Either way the index is updated by
+    the database on every insert, update and delete, including bulk ones.
+    Both are created by migration ``emr.0007_medical_record_search``.
+    """
+
+    @staticmethod
+    def fields() -> List[str]:
+        return [field for weight in MEDICAL_RECORD_SEARCH_FIELDS.values() for field in weight]
+
+    @staticmethod
+    def rebuild(using: str = 'default') -> None:
+        """Repopulate the SQLite FTS5 table; the PostgreSQL column is generated and never stale"""
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            return
+        table = MedicalRecord._meta.db_table
+        columns = ', '.join(MedicalRecordSearchService.fields())
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {MEDICAL_RECORD_FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {MEDICAL_RECORD_FTS_TABLE} (record_id, {columns}) SELECT id, {columns} FROM {table}'
+            )
+
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Quote each word so user input cannot inject FTS5 query syntax; words are ANDed"""
+        return ' '.join(f'"{token}"' for token in SEARCH_TOKEN_RE.findall(query))
+
+    @staticmethod
+    def search(queryset: QuerySet, query: str) -> QuerySet:
+        """Restrict ``queryset`` to records matching ``query``, best match first, with a ``rank``"""
+        connection = connections[queryset.db]
+        table = MedicalRecord._meta.db_table
+        if connection.vendor == 'postgresql':
+            tsquery = f"websearch_to_tsquery('{MEDICAL_RECORD_SEARCH_CONFIG}', %s)"
+            return (
+                queryset
+                .filter(RawSQL(f'{table}.search_vector @@ {tsquery}', [query], output_field=BooleanField()))
+                .annotate(rank=RawSQL(f'ts_rank_cd({table}.search_vector, {tsquery})', [query], output_field=FloatField()))
+                .order_by('-rank', '-created_at')
+            )
+
+        fts_query = MedicalRecordSearchService._fts_query(query)
+        if not fts_query:
+            return queryset.none()
+        # bm25 is lower-is-better, so negate it to keep "higher rank is better" across backends
+        weights = ', '.join(
+            str(MEDICAL_RECORD_SEARCH_WEIGHTS[weight])
+            for weight, fields in MEDICAL_RECORD_SEARCH_FIELDS.items() for _ in fields
+        )
+        rank = (
+            f'SELECT -bm25({MEDICAL_RECORD_FTS_TABLE}, 0, {weights}) FROM {MEDICAL_RECORD_FTS_TABLE} '
+            f'WHERE {MEDICAL_RECORD_FTS_TABLE} MATCH %s AND record_id = {table}.id'
+        )
+        matches = f'SELECT record_id FROM {MEDICAL_RECORD_FTS_TABLE} WHERE {MEDICAL_RECORD_FTS_TABLE} MATCH %s'
+        return (
+            queryset
+            .filter(id__in=RawSQL(matches, [fts_query]))
+            .annotate(rank=RawSQL(f'({rank})', [fts_query], output_field=FloatField()))
+            .order_by('-rank', '-created_at')
+        )
+
+    @staticmethod
+    def _mark(snippet: str) -> str:
+        """HTML-escape a snippet, then turn the highlight markers into <mark> tags"""
+        return (
+            html.escape(snippet or '')
+            .replace(SNIPPET_START, '<mark>')
+            .replace(SNIPPET_STOP, '</mark>')
+        )
+
+    @staticmethod
+    def snippets(record_ids: List[Any], query: str, using: str = 'default') -> Dict[Any, str]:
+        """Highlighted snippets for one page of results, keyed by record id"""
+        if not record_ids:
+            return {}
+        connection = connections[using]
+        table = MedicalRecord._meta.db_table
+        placeholders = ', '.join(['%s'] * len(record_ids))
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                document = " || ' ' || ".join(f"coalesce({field}, '')" for field in MedicalRecordSearchService.fields())
+                options = f'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords={SNIPPET_WORDS}, MinWords=8, MaxFragments=2'
+                cursor.execute(
+                    f"SELECT id, ts_headline('{MEDICAL_RECORD_SEARCH_CONFIG}', {document}, "
+                    f"websearch_to_tsquery('{MEDICAL_RECORD_SEARCH_CONFIG}', %s), %s) "
+                    f'FROM {table} WHERE id IN ({placeholders})',
+                    [query, options] + [str(record_id) for record_id in record_ids]
+                )
+            else:
+                cursor.execute(
+                    f"SELECT record_id, snippet({MEDICAL_RECORD_FTS_TABLE}, -1, %s, %s, '…', {SNIPPET_WORDS}) "
+                    f'FROM {MEDICAL_RECORD_FTS_TABLE} WHERE {MEDICAL_RECORD_FTS_TABLE} MATCH %s '
+                    f'AND record_id IN ({placeholders})',
+                    [SNIPPET_START, SNIPPET_STOP, MedicalRecordSearchService._fts_query(query)]
+                    + [record_id.hex for record_id in record_ids]
+                )
+            rows = cursor.fetchall()
+
+        pk_field = MedicalRecord._meta.pk
+        return {pk_field.to_python(record_id): MedicalRecordSearchService._mark(snippet) for record_id, snippet in rows}
+
+
+# Celery Tasks
+@shared_task
+def render_emr_pdf(kind: str, object_id: str, digest: str):
+    """Render a PDF into the cache so the poll URL can serve it"""
+    try:
+        obj = PDFCacheService.load(kind, object_id)
+        current_digest, _ = PDFCacheService.fingerprint(kind, obj)
+        if not default_storage.exists(PDFCacheService.storage_path(kind, object_id, current_digest)):
+            PDFCacheService.render_and_store(kind, obj, current_digest).close()
+        logger.info(f"Rendered {kind} PDF {object_id} ({current_digest[:12]})")
+    finally:
+        cache.delete(PDFCacheService._lock_key(kind, digest))
+
+
+@shared_task
+def export_chart(job_id: str):
+    """Build a chart export ZIP, recording failures on the job"""
+    job = ChartExport.objects.filter(id=job_id).first()
+    if job is None:
+        logger.warning(f"Chart export {job_id} no longer exists")
+        return None
+    try:
+        ChartExportService.export(job)
+    except Exception as e:
+        logger.error(f"Chart export {job_id} failed: {str(e)}")
+        ChartExport.objects.filter(id=job.id).update(status='failed', error=str(e), updated_at=timezone.now())
+        raise
+    logger.info(f"Chart export {job_id}: {job.records_done} records, {job.prescriptions_done} prescriptions")
+    return {'job_id': job_id, 'records_done': job.records_done, 'prescriptions_done': job.prescriptions_done}
+
+
+@shared_task
+def purge_chart_exports():
+    """Beat entry point: delete chart export ZIPs past their retention"""
+    removed = ChartExportService.purge_expired()
+    logger.info(f"Purged {removed} expired chart exports")
+    return removed
@@ -0,0 +1,45 @@
+"""
+Keep cached EMR summaries, doctor stats and PDFs in sync with medical record writes
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import MedicalRecord, Prescription, LabResult, VitalSign, Allergy
+from .services import (
+    EMRSummaryService, EMRStatsService, LabValueService, PDFCacheService
+)
+from .interactions import AllergyCheckService
+
+
+@receiver([post_save, post_delete], sender=MedicalRecord)
+@receiver([post_save, post_delete], sender=Prescription)
+@receiver([post_save, post_delete], sender=LabResult)
+@receiver([post_save, post_delete], sender=VitalSign)
+@receiver([post_save, post_delete], sender=Allergy)
+def invalidate_emr_summary(sender, instance, **kwargs):
+    EMRSummaryService.invalidate(instance.patient_id)
+
+
+@receiver([post_save, post_delete], sender=MedicalRecord)
+@receiver([post_save, post_delete], sender=Prescription)
+@receiver([post_save, post_delete], sender=LabResult)
+def invalidate_emr_stats(sender, instance, **kwargs):
+    if instance.doctor_id:
+        EMRStatsService.invalidate(instance.doctor_id)
+
+
+@receiver([post_save, post_delete], sender=Allergy)
+def invalidate_allergy_set(sender, instance, **kwargs):
+    AllergyCheckService.invalidate(instance.patient_id)
+
+
+@receiver(post_delete, sender=MedicalRecord)
+@receiver(post_delete, sender=Prescription)
+def delete_cached_pdfs(sender, instance, **kwargs):
+    kind = 'medical_record' if sender is MedicalRecord else 'prescription'
+    PDFCacheService.prune(kind, instance.id)
+
+
+@receiver(post_save, sender=LabResult)
+def sync_lab_result_values(sender, instance, **kwargs):
+    LabValueService.sync(instance)
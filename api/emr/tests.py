@@ -0,0 +1,456 @@
+import shutil
+import tempfile
+import uuid
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+from .interactions import AllergyCheckService
+from .models import Allergy, ChartExport, LabResult, LabResultValue, MedicalRecord, Prescription, VitalSign
+from doctors.models import Doctor
+from .serializers import PrescriptionCreateSerializer
+from .services import (
+    CHART_EXPORT_RETENTION, VITAL_TREND_MAX_POINTS, ChartExportService, PDFCacheService, export_chart
+)
+
+# Queries on a cache miss: one per summary table, totals folded into the latest-record query
+SUMMARY_MISS_QUERIES = 5
+
+
+class PatientEMRSummaryTests(TestCase):
+    """The summary costs a fixed number of queries on a miss and none on a hit"""
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create(username='doctor', first_name='Greg', last_name='House', role='doctor')
+        self.patient = User.objects.create(username='patient', first_name='Pat', last_name='Smith', role='patient')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        self.records = 0
+
+    def add_history(self, records):
+        for i in range(self.records, self.records + records):
+            record = MedicalRecord.objects.create(
+                patient=self.patient,
+                doctor=self.doctor,
+                chief_complaint='Headache',
+                history_of_present_illness='Two days',
+                diagnosis='Tension headache',
+                treatment_plan='Rest'
+            )
+            for j in range(3):
+                Prescription.objects.create(
+                    medical_record=record, patient=self.patient, doctor=self.doctor,
+                    medication_name=f'Medication {j}', dosage='10mg', frequency='Daily',
+                    duration='7 days', quantity=7, instructions='With food'
+                )
+                LabResult.objects.create(
+                    medical_record=record, patient=self.patient, doctor=self.doctor,
+                    test_name='CBC', test_type='Blood Test', test_date=date.today(),
+                    result_date=date.today(), status='completed'
+                )
+            VitalSign.objects.create(patient=self.patient, recorded_by=self.doctor, heart_rate=70 + i)
+            Allergy.objects.create(
+                patient=self.patient, recorded_by=self.doctor, allergen=f'Allergen {i}',
+                allergy_type='Drug', severity='mild', reaction='Rash', confirmed_date=date.today()
+            )
+        self.records += records
+
+    def get_summary(self):
+        response = self.client.get('/api/emr/stats/patient/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_miss_query_count_is_fixed(self):
+        for records in (1, 6):
+            self.add_history(records)
+            cache.clear()
+            with self.assertNumQueries(SUMMARY_MISS_QUERIES):
+                summary = self.get_summary()
+        self.assertEqual(summary['total_records'], 7)
+        self.assertEqual(summary['total_prescriptions'], 21)
+        self.assertEqual(summary['latest_record']['doctor_name'], 'Greg House')
+
+    def test_hit_runs_no_queries(self):
+        self.add_history(2)
+        self.get_summary()
+        with self.assertNumQueries(0):
+            self.get_summary()
+
+    def test_write_invalidates_summary(self):
+        self.add_history(1)
+        self.get_summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            VitalSign.objects.create(patient=self.patient, recorded_by=self.doctor, heart_rate=99)
+        self.assertEqual(self.get_summary()['latest_vitals']['heart_rate'], 99)
+
+
+class VitalTrendTests(TestCase):
+    """A requested bucket never yields more points than the range allows"""
+
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        now = timezone.now()
+        VitalSign.objects.bulk_create([
+            VitalSign(patient=self.patient, recorded_by=self.patient, heart_rate=60 + i % 40,
+                      recorded_at=now - timedelta(hours=6 * i))
+            for i in range(1000)
+        ])
+
+    def get_trends(self, query):
+        response = self.client.get(f'/api/emr/vital-signs/trends/?metrics=heart_rate&{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_too_fine_bucket_is_coarsened(self):
+        trends = self.get_trends('bucket=hour')
+        self.assertEqual(trends['bucket'], 'week')
+        self.assertLessEqual(len(trends['points']), VITAL_TREND_MAX_POINTS)
+
+    def test_coarser_bucket_is_kept(self):
+        trends = self.get_trends('bucket=month')
+        self.assertEqual(trends['bucket'], 'month')
+        self.assertLessEqual(len(trends['points']), 13)
+
+
+class PDFCacheTests(TestCase):
+    """Only the current render of each document is kept in storage"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        doctor = User.objects.create(username='doctor', first_name='Greg', last_name='House', role='doctor')
+        self.profile = Doctor.objects.create(
+            user=doctor, registration_number='REG-1', years_of_experience=5, consultation_fee=50
+        )
+        patient = User.objects.create(username='patient', first_name='Pat', last_name='Smith', role='patient')
+        self.record = MedicalRecord.objects.create(
+            patient=patient, doctor=doctor, chief_complaint='Headache',
+            history_of_present_illness='Two days', diagnosis='Tension headache', treatment_plan='Rest'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(patient)
+
+    def cached_files(self):
+        try:
+            return default_storage.listdir(PDFCacheService.object_dir('medical_record', self.record.id))[1]
+        except FileNotFoundError:
+            return []
+
+    def download(self):
+        response = self.client.get(f'/api/emr/medical-records/{self.record.id}/pdf/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        b''.join(response.streaming_content)
+
+    def test_superseded_render_is_deleted(self):
+        self.download()
+        first = self.cached_files()
+        self.assertEqual(len(first), 1)
+
+        self.record.diagnosis = 'Migraine'
+        self.record.save()
+        self.download()
+        second = self.cached_files()
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first, second)
+
+    def test_doctor_profile_change_rerenders(self):
+        self.download()
+        first = self.cached_files()
+        self.profile.registration_number = 'REG-2'
+        self.profile.save()
+        self.download()
+        self.assertNotEqual(self.cached_files(), first)
+
+    def test_deleting_record_deletes_renders(self):
+        self.download()
+        self.record.delete()
+        self.assertEqual(self.cached_files(), [])
+
+
+class ChartExportRetentionTests(TestCase):
+    """Export ZIPs stop being served and are deleted once their retention passes"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        self.patient = User.objects.create(username='patient', first_name='Pat', last_name='Smith', role='patient')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        with mock.patch('emr.services.export_chart.delay'):
+            job = ChartExportService.start(self.patient, {'patient_id': self.patient.id})
+        self.job = ChartExportService.export(job)
+
+    def test_finished_export_is_downloadable_until_it_expires(self):
+        url = f"/api/emr/exports/{self.job.id}/download/"
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        ChartExport.objects.filter(id=self.job.id).update(expires_at=timezone.now())
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_410_GONE)
+
+    def test_purge_deletes_only_expired_archives(self):
+        self.assertEqual(ChartExportService.purge_expired(), 0)
+        self.assertTrue(default_storage.exists(self.job.path))
+
+        later = timezone.now() + CHART_EXPORT_RETENTION + timedelta(minutes=1)
+        self.assertEqual(ChartExportService.purge_expired(now=later), 1)
+        self.assertFalse(default_storage.exists(self.job.path))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.path, '')
+        self.assertEqual(ChartExportService.purge_expired(now=later), 0)
+
+    def test_status_is_only_visible_to_the_requester(self):
+        url = f"/api/emr/exports/{self.job.id}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], 'finished')
+        self.assertIn('download_url', response.json())
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create(username='other', role='patient'))
+        self.assertEqual(other.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_task_skips_a_missing_job(self):
+        self.assertIsNone(export_chart(uuid.uuid4().hex))
+
+    def test_task_records_failure(self):
+        with mock.patch('emr.services.export_chart.delay'):
+            job = ChartExportService.start(self.patient, {'patient_id': self.patient.id})
+        with mock.patch('emr.services.ChartExportService.export', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                export_chart(str(job.id))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'disk full'))
+
+
+class VitalSignBulkIngestTests(TestCase):
+    """Bulk readings only land on patients, and for doctors only on patients they treat"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.treated = User.objects.create(username='treated', role='patient')
+        self.stranger = User.objects.create(username='stranger', role='patient')
+        MedicalRecord.objects.create(
+            patient=self.treated, doctor=self.doctor, chief_complaint='Headache',
+            history_of_present_illness='Two days', diagnosis='Tension headache', treatment_plan='Rest'
+        )
+
+    def ingest(self, user, patient_ids):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(
+            '/api/emr/vital-signs/bulk/',
+            [{'patient': patient_id, 'heart_rate': 72} for patient_id in patient_ids],
+            format='json'
+        )
+
+    def test_doctor_can_only_record_for_treated_patients(self):
+        response = self.ingest(self.doctor, [self.treated.id, self.stranger.id, self.doctor.id])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertEqual(list(VitalSign.objects.values_list('patient_id', flat=True)), [self.treated.id])
+
+    def test_admin_cannot_record_for_non_patients(self):
+        admin = User.objects.create(username='admin', role='admin')
+        response = self.ingest(admin, [self.stranger.id, self.doctor.id])
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+
+
+class AllergyCheckTests(TestCase):
+    """Prescriptions are checked against the patient's active allergies"""
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.record = MedicalRecord.objects.create(
+            patient=self.patient, doctor=self.doctor, chief_complaint='Sore throat',
+            history_of_present_illness='Three days', diagnosis='Pharyngitis', treatment_plan='Antibiotics'
+        )
+
+    def add_allergy(self, allergen, severity='severe'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Allergy.objects.create(
+                patient=self.patient, recorded_by=self.doctor, allergen=allergen,
+                allergy_type='Drug', severity=severity, reaction='Hives', confirmed_date=date.today()
+            )
+
+    def check(self, medication_name, generic_name=''):
+        return AllergyCheckService.check(self.patient.id, medication_name, generic_name)
+
+    def prescribe(self, medication_name, generic_name='', **extra):
+        return PrescriptionCreateSerializer(data={
+            'medical_record': self.record.id, 'medication_name': medication_name, 'generic_name': generic_name,
+            'dosage': '500mg', 'frequency': 'Twice daily', 'duration': '7 days', 'quantity': 14,
+            'instructions': 'With food', **extra
+        })
+
+    def test_alias_matches_every_class_member(self):
+        self.add_allergy('Sulfa drugs')
+        conflicts = self.check('Bactrim DS')
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(conflicts[0]['level'], 'contraindicated')
+        self.assertEqual(conflicts[0]['matched'], ['sulfonamide_antibiotics'])
+
+    def test_drug_class_matches_brand_and_generic(self):
+        self.add_allergy('Penicillin')
+        self.assertEqual(self.check('Amoxil')[0]['matched'], ['penicillins'])
+        self.assertEqual(self.check('Augmentin', 'amoxicillin-clavulanate')[0]['level'], 'contraindicated')
+        self.assertEqual(self.check('Azithromycin'), [])
+
+    def test_literal_name_match_for_unknown_allergen(self):
+        self.add_allergy('Latex')
+        self.assertEqual(self.check('Latex catheter')[0]['matched'], ['latex'])
+
+    def test_cross_reactive_class_is_a_caution(self):
+        self.add_allergy('Beta-lactams')
+        self.assertEqual(self.check('Keflex')[0]['level'], 'contraindicated')
+
+        Allergy.objects.all().delete()
+        self.add_allergy('amoxicillin')
+        conflicts = self.check('Keflex')
+        self.assertEqual(conflicts[0]['level'], 'caution')
+        self.assertEqual(conflicts[0]['matched'], ['cephalosporins'])
+
+    def test_inactive_allergies_are_ignored(self):
+        allergy = self.add_allergy('Penicillin')
+        allergy.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            allergy.save()
+        self.assertEqual(self.check('Amoxicillin'), [])
+
+    def test_allergy_changes_invalidate_the_cached_set(self):
+        self.assertEqual(self.check('Ibuprofen'), [])
+        with self.assertNumQueries(0):
+            self.check('Ibuprofen')
+
+        allergy = self.add_allergy('NSAIDs')
+        self.assertEqual(self.check('Ibuprofen')[0]['matched'], ['nsaids'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            allergy.delete()
+        self.assertEqual(self.check('Ibuprofen'), [])
+
+    def test_serializer_rejects_conflicting_prescription(self):
+        self.add_allergy('Penicillin')
+        serializer = self.prescribe('Amoxicillin')
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['allergy_conflicts'][0]['allergen'], 'Penicillin')
+
+    def test_serializer_accepts_acknowledged_conflict(self):
+        self.add_allergy('Penicillin')
+        serializer = self.prescribe('Amoxicillin', acknowledge_allergies=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        prescription = serializer.save()
+        self.assertEqual(prescription.patient, self.patient)
+
+    def test_serializer_skips_check_when_drug_is_unchanged(self):
+        prescription = Prescription.objects.create(
+            medical_record=self.record, patient=self.patient, doctor=self.doctor,
+            medication_name='Amoxicillin', dosage='500mg', frequency='Twice daily',
+            duration='7 days', quantity=14, instructions='With food'
+        )
+        self.add_allergy('Penicillin')
+        serializer = PrescriptionCreateSerializer(prescription, data={'dosage': '250mg'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        serializer = PrescriptionCreateSerializer(prescription, data={'generic_name': 'amoxicillin'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+
+
+class LabResultValueTests(TestCase):
+    """Saving a lab result keeps its extracted values searchable"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.record = MedicalRecord.objects.create(
+            patient=self.patient, doctor=self.doctor, chief_complaint='Fatigue',
+            history_of_present_illness='Weeks', diagnosis='Diabetes', treatment_plan='Metformin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def add_result(self, results):
+        return LabResult.objects.create(
+            medical_record=self.record, patient=self.patient, doctor=self.doctor, test_name='Panel',
+            test_type='Blood Test', test_date=date.today(), results=results, status='completed'
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/api/emr/lab-values/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['results']
+
+    def test_save_extracts_values(self):
+        lab_result = self.add_result({'HbA1c': '8.2 %', 'Glucose': {'value': 180, 'unit': 'mg/dL', 'flag': 'H'}})
+        self.assertEqual(
+            sorted(LabResultValue.objects.values_list('analyte', 'unit')),
+            [('glucose', 'mg/dL'), ('hba1c', '%')]
+        )
+
+        lab_result.results = {'HbA1c': 6.1}
+        lab_result.save()
+        self.assertEqual(list(LabResultValue.objects.values_list('analyte', flat=True)), ['hba1c'])
+
+    def test_search_by_value_range(self):
+        self.add_result({'HbA1c': 8.2})
+        self.add_result({'HbA1c': 5.4})
+        values = self.search('analyte=HbA1c&min_value=7')
+        self.assertEqual([value['analyte'] for value in values], ['hba1c'])
+        self.assertEqual(len(values), 1)
+
+
+class MedicalRecordSearchTests(TestCase):
+    """The full-text index created by migration follows record writes"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def add_record(self, diagnosis, notes=''):
+        return MedicalRecord.objects.create(
+            patient=self.patient, doctor=self.doctor, chief_complaint='Cough',
+            history_of_present_illness='One week', diagnosis=diagnosis, treatment_plan='Rest', notes=notes
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/api/emr/medical-records/search/?q={query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['id'] for result in response.json()['results']]
+
+    def test_index_follows_writes(self):
+        bronchitis = self.add_record('Acute bronchitis')
+        pneumonia = self.add_record('Community acquired pneumonia', notes='Follow up on bronchitis history')
+        # The diagnosis outweighs the notes
+        self.assertEqual(self.search('bronchitis'), [str(bronchitis.id), str(pneumonia.id)])
+
+        bronchitis.diagnosis = 'Asthma exacerbation'
+        bronchitis.save()
+        self.assertEqual(self.search('bronchitis'), [str(pneumonia.id)])
+        self.assertEqual(self.search('asthma'), [str(bronchitis.id)])
+
+        pneumonia.delete()
+        self.assertEqual(self.search('bronchitis'), [])
@@ -1,24 +1,45 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.core.files.storage import default_storage
+from django.urls import reverse
 from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from django.http import HttpResponse
-from datetime import datetime
+from django.http import FileResponse
+from django.utils import timezone
+from datetime import datetime, timedelta
 
-from .models import MedicalRecord, Prescription, LabResult, VitalSign, Allergy
+from .models import MedicalRecord, Prescription, LabResult, LabResultValue, VitalSign, Allergy, ChartExport
 from .serializers import (
     MedicalRecordSerializer, MedicalRecordCreateSerializer,
     PrescriptionSerializer, PrescriptionCreateSerializer,
     LabResultSerializer, LabResultCreateSerializer,
     VitalSignSerializer, VitalSignCreateSerializer,
-    AllergySerializer, AllergyCreateSerializer
+    AllergySerializer, AllergyCreateSerializer, ChartExportRequestSerializer, ChartExportSerializer,
+    VitalTrendParamsSerializer, LabResultValueSerializer, LabValueQueryParamsSerializer,
+    AllergyCheckRequestSerializer, MedicalRecordSearchResultSerializer
 )
-from .pdf_generator import generate_prescription_response
-from .medical_record_pdf import generate_medical_record_pdf
+from .services import (
+    EMRSummaryService, EMRStatsService, PDFCacheService, ChartExportService,
+    VitalTrendService, VitalSignIngestionService, LabValueService, MedicalRecordSearchService,
+    PDF_ASYNC_ROW_THRESHOLD, VITALS_BULK_MAX_ITEMS
+)
+from .interactions import AllergyCheckService
 from users.permissions import IsDoctor, IsPatient, IsAdmin
+from healthcare_platform.parsers import JSONLinesParser
+from appointments.models import Appointment
+
+def _doctor_treats_patient(doctor, patient_id) -> bool:
+    """Whether the doctor has an appointment or a medical record with the patient"""
+    return (
+        Appointment.objects.filter(doctor__user=doctor, patient_id=patient_id).exists()
+        or MedicalRecord.objects.filter(doctor=doctor, patient_id=patient_id).exists()
+    )
 
 class MedicalRecordListView(generics.ListCreateAPIView):
     """List and create medical records"""
@@ -44,6 +65,51 @@ class MedicalRecordListView(generics.ListCreateAPIView):
             return MedicalRecordCreateSerializer
         return MedicalRecordSerializer
 
+class MedicalRecordSearchView(generics.ListAPIView):
+    """Ranked full-text search over the clinical text of medical records"""
+    serializer_class = MedicalRecordSearchResultSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    # Results are ordered by rank, which keyset pagination cannot page through
+    pagination_class = PageNumberPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['patient', 'doctor', 'is_active']
+    
+    def get_search_query(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required'})
+        return query
+    
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'doctor':
+            queryset = MedicalRecord.objects.filter(doctor=user)
+        elif user.role == 'patient':
+            queryset = MedicalRecord.objects.filter(patient=user)
+        elif user.role == 'admin':
+            queryset = MedicalRecord.objects.all()
+        else:
+            return MedicalRecord.objects.none()
+        return MedicalRecordSearchService.search(
+            queryset.select_related('doctor', 'patient'),
+            self.get_search_query()
+        )
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['snippets'] = getattr(self, 'snippets', {})
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        # Highlight only the records on this page
+        self.snippets = MedicalRecordSearchService.snippets(
+            [record.id for record in page], self.get_search_query(), using=queryset.db
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
 class MedicalRecordDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a medical record"""
     permission_classes = [permissions.IsAuthenticated]
@@ -106,6 +172,31 @@ class PrescriptionDetailView(generics.RetrieveUpdateDestroyAPIView):
             return PrescriptionCreateSerializer
         return PrescriptionSerializer
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def check_prescription_allergies(request):
+    """Check one or more medications against a patient's active allergies"""
+    serializer = AllergyCheckRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    patient_id = serializer.validated_data['patient']
+    medications = serializer.validated_data['medications']
+    
+    user = request.user
+    if user.role == 'doctor':
+        if not _doctor_treats_patient(user, patient_id):
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    elif user.role != 'admin':
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    results = AllergyCheckService.check_many(patient_id, medications)
+    return Response({
+        'has_conflicts': any(results),
+        'results': [
+            {'medication_name': medication['medication_name'], 'conflicts': conflicts}
+            for medication, conflicts in zip(medications, results)
+        ],
+    })
+
 class LabResultListView(generics.ListCreateAPIView):
     """List and create lab results"""
     permission_classes = [permissions.IsAuthenticated]
@@ -149,6 +240,36 @@ class LabResultDetailView(generics.RetrieveUpdateDestroyAPIView):
             return LabResultCreateSerializer
         return LabResultSerializer
 
+class LabResultValueListView(generics.ListAPIView):
+    """Search extracted lab values by analyte, value range and test date"""
+    serializer_class = LabResultValueSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    ordering = ['-test_date']
+    
+    def get_queryset(self):
+        user = self.request.user
+        if user.role not in ['doctor', 'admin']:
+            return LabResultValue.objects.none()
+        
+        serializer = LabValueQueryParamsSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        since = params.get('since')
+        if params.get('days'):
+            since = timezone.localdate() - timedelta(days=params['days'])
+        
+        queryset = LabValueService.query(
+            params['analyte'],
+            min_value=params.get('min_value'),
+            max_value=params.get('max_value'),
+            since=since,
+            until=params.get('until')
+        )
+        if user.role == 'doctor':
+            queryset = queryset.filter(lab_result__doctor=user)
+        return queryset.select_related('patient', 'lab_result').order_by('-test_date')
+
 class VitalSignListView(generics.ListCreateAPIView):
     """List and create vital signs"""
     permission_classes = [permissions.IsAuthenticated]
@@ -172,6 +293,64 @@ class VitalSignListView(generics.ListCreateAPIView):
             return VitalSignCreateSerializer
         return VitalSignSerializer
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([JSONParser, JSONLinesParser])
+def bulk_ingest_vital_signs(request):
+    """
+    Ingest a batch of vital sign readings as a JSON array or newline-delimited
+    JSON. Valid readings are inserted; invalid ones are reported by index.
+    """
+    items = request.data
+    if not isinstance(items, list):
+        return Response({'error': 'Expected a list of readings'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > VITALS_BULK_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {VITALS_BULK_MAX_ITEMS} readings per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    user = request.user
+    if user.role == 'patient':
+        result = VitalSignIngestionService.ingest(items, recorded_by=user, patient=user)
+    elif user.role == 'doctor':
+        result = VitalSignIngestionService.ingest(items, recorded_by=user, doctor=user)
+    elif user.role == 'admin':
+        result = VitalSignIngestionService.ingest(items, recorded_by=user)
+    else:
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    response_status = status.HTTP_201_CREATED if result['created'] or not items else status.HTTP_400_BAD_REQUEST
+    return Response(result, status=response_status)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def vital_sign_trends(request):
+    """Get downsampled vital sign trends for a patient"""
+    serializer = VitalTrendParamsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    
+    user = request.user
+    if user.role == 'patient':
+        patient_id = user.id
+    elif user.role in ['doctor', 'admin']:
+        patient_id = params.get('patient')
+        if not patient_id:
+            return Response({'error': 'patient is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if user.role == 'doctor' and not _doctor_treats_patient(user, patient_id):
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    else:
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(VitalTrendService.series(
+        patient_id,
+        start=params.get('start'),
+        end=params.get('end'),
+        bucket=params.get('bucket'),
+        metrics=params.get('metrics')
+    ))
+
 class VitalSignDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete vital signs"""
     permission_classes = [permissions.IsAuthenticated]
@@ -235,11 +414,33 @@ class AllergyDetailView(generics.RetrieveUpdateDestroyAPIView):
         return AllergySerializer
 
 # PDF Generation Views
+def _pdf_response(request, kind, obj, filename):
+    """
+    Stream a cached PDF, rendering it inline on a miss. Large documents, or any
+    request with ?async=true, are rendered by Celery instead: the client gets a
+    202 and polls the same URL until the PDF is ready.
+    """
+    digest, rows = PDFCacheService.fingerprint(kind, obj)
+    pdf_file = PDFCacheService.open_cached(kind, obj.id, digest)
+    if pdf_file is None:
+        if request.query_params.get('async') in ('1', 'true') or rows > PDF_ASYNC_ROW_THRESHOLD:
+            PDFCacheService.enqueue(kind, obj.id, digest)
+            poll_url = request.build_absolute_uri()
+            response = Response({'status': 'pending', 'poll_url': poll_url}, status=status.HTTP_202_ACCEPTED)
+            response['Location'] = poll_url
+            response['Retry-After'] = '2'
+            return response
+        pdf_file = PDFCacheService.render_and_store(kind, obj, digest)
+    
+    return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def download_prescription_pdf(request, prescription_id):
     """Download prescription as PDF"""
-    prescription = get_object_or_404(Prescription, id=prescription_id)
+    prescription = get_object_or_404(
+        Prescription.objects.select_related(*PDFCacheService.SOURCES['prescription'][1]), id=prescription_id
+    )
     
     # Check permissions
     user = request.user
@@ -250,13 +451,16 @@ def download_prescription_pdf(request, prescription_id):
     elif user.role not in ['admin', 'doctor', 'patient']:
         return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    return generate_prescription_response(prescription, request)
+    filename = f"prescription_{prescription.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return _pdf_response(request, 'prescription', prescription, filename)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def download_medical_record_pdf(request, medical_record_id):
     """Download medical record as PDF"""
-    medical_record = get_object_or_404(MedicalRecord, id=medical_record_id)
+    medical_record = get_object_or_404(
+        MedicalRecord.objects.select_related(*PDFCacheService.SOURCES['medical_record'][1]), id=medical_record_id
+    )
     
     # Check permissions
     user = request.user
@@ -267,68 +471,88 @@ def download_medical_record_pdf(request, medical_record_id):
     elif user.role not in ['admin', 'doctor', 'patient']:
         return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    pdf_bytes = generate_medical_record_pdf(medical_record, request)
     filename = f"medical_record_{medical_record.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return _pdf_response(request, 'medical_record', medical_record, filename)
+
+# Bulk Chart Export
+def _export_payload(request, job):
+    payload = ChartExportSerializer(job).data
+    payload['status_url'] = request.build_absolute_uri(reverse('chart-export-status', args=[job.id]))
+    if job.status == 'finished':
+        payload['download_url'] = request.build_absolute_uri(reverse('chart-export-download', args=[job.id]))
+    return payload
+
+def _get_export(request, job_id):
+    jobs = ChartExport.objects.filter(id=job_id)
+    if request.user.role != 'admin':
+        jobs = jobs.filter(requested_by=request.user)
+    return jobs.first()
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def start_chart_export(request):
+    """
+    Export a chart as a ZIP of PDFs. Patients export their own records, doctors
+    export their panel (optionally one patient) and admins export any patient.
+    """
+    serializer = ChartExportRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
     
-    response = HttpResponse(pdf_bytes, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    user = request.user
+    filters = {'start_date': params.get('start_date'), 'end_date': params.get('end_date')}
+    if user.role == 'patient':
+        filters['patient_id'] = user.id
+    elif user.role == 'doctor':
+        filters['doctor_id'] = user.id
+        filters['patient_id'] = params.get('patient')
+    elif user.role == 'admin':
+        if not params.get('patient'):
+            return Response({'error': 'patient is required'}, status=status.HTTP_400_BAD_REQUEST)
+        filters['patient_id'] = params['patient']
+    else:
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    job = ChartExportService.start(user, filters)
+    return Response(_export_payload(request, job), status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def chart_export_status(request, job_id):
+    """Get progress of a chart export"""
+    job = _get_export(request, job_id)
+    if job is None:
+        return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_export_payload(request, job))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def download_chart_export(request, job_id):
+    """Download a finished chart export"""
+    job = _get_export(request, job_id)
+    if job is None:
+        return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status != 'finished':
+        return Response({'error': 'Export is not ready'}, status=status.HTTP_409_CONFLICT)
+    if ChartExportService.is_expired(job) or not job.path or not default_storage.exists(job.path):
+        return Response({'error': 'Export has expired'}, status=status.HTTP_410_GONE)
+    
+    return FileResponse(
+        default_storage.open(job.path, 'rb'),
+        as_attachment=True,
+        filename=f"chart_export_{job_id}.zip",
+        content_type='application/zip'
+    )
 
 # Statistics and Analytics
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsDoctor])
 def doctor_emr_stats(request):
     """Get EMR statistics for a doctor"""
-    doctor = request.user
-    
-    stats = {
-        'total_records': MedicalRecord.objects.filter(doctor=doctor).count(),
-        'total_prescriptions': Prescription.objects.filter(doctor=doctor).count(),
-        'total_lab_results': LabResult.objects.filter(doctor=doctor).count(),
-        'active_prescriptions': Prescription.objects.filter(doctor=doctor, status='pending').count(),
-        'completed_lab_results': LabResult.objects.filter(doctor=doctor, status='completed').count(),
-        'recent_records': MedicalRecord.objects.filter(doctor=doctor).order_by('-created_at')[:5].values(
-            'id', 'patient__first_name', 'patient__last_name', 'created_at', 'diagnosis'
-        )
-    }
-    
-    return Response(stats)
+    return Response(EMRStatsService.get_stats(request.user))
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsPatient])
 def patient_emr_summary(request):
     """Get EMR summary for a patient"""
-    patient = request.user
-    
-    # Get latest medical record
-    latest_record = MedicalRecord.objects.filter(patient=patient).order_by('-created_at').first()
-    
-    # Get active prescriptions
-    active_prescriptions = Prescription.objects.filter(
-        patient=patient, 
-        status='pending'
-    ).order_by('-created_at')
-    
-    # Get recent lab results
-    recent_lab_results = LabResult.objects.filter(
-        patient=patient, 
-        status='completed'
-    ).order_by('-result_date')[:5]
-    
-    # Get allergies
-    allergies = Allergy.objects.filter(patient=patient, is_active=True)
-    
-    # Get latest vital signs
-    latest_vitals = VitalSign.objects.filter(patient=patient).order_by('-recorded_at').first()
-    
-    summary = {
-        'latest_record': MedicalRecordSerializer(latest_record).data if latest_record else None,
-        'active_prescriptions': PrescriptionSerializer(active_prescriptions, many=True).data,
-        'recent_lab_results': LabResultSerializer(recent_lab_results, many=True).data,
-        'allergies': AllergySerializer(allergies, many=True).data,
-        'latest_vitals': VitalSignSerializer(latest_vitals).data if latest_vitals else None,
-        'total_records': MedicalRecord.objects.filter(patient=patient).count(),
-        'total_prescriptions': Prescription.objects.filter(patient=patient).count(),
-    }
-    
-    return Response(summary)
\ No newline at end of file
+    return Response(EMRSummaryService.get_summary(request.user))
\ No newline at end of file
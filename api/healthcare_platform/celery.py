@@ -13,6 +13,8 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+# Tasks are also declared alongside the service classes in each app's services.py
+app.autodiscover_tasks(related_name='services')
 
 @app.task(bind=True)
 def debug_task(self):
@@ -0,0 +1,177 @@
+"""
+Shared pagination classes for the REST API
+"""
+import base64
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination on a single ordering field.
+
+    The sort key is the client's ``?ordering=`` field when it is one of the
+    view's ``ordering_fields``, otherwise the first field of ``view.ordering``,
+    with the primary key as a tiebreaker. The cursor carries the sort field
+    and the last row's (value, pk). Each page is a single indexed range
+    query: no COUNT and no OFFSET scan, so deep pages cost the same as the
+    first one.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = api_settings.ORDERING_PARAM
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size: int):
+        self.page_size = page_size
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view) -> Tuple[str, bool]:
+        """
+        Return (field name, descending) to page on.
+
+        A requested ordering must be a single non-nullable field from the
+        view's ``ordering_fields``; anything else is rejected rather than
+        silently paged in a different order.
+        """
+        requested = request.query_params.get(self.ordering_query_param)
+        if requested:
+            terms = [term.strip() for term in requested.split(',') if term.strip()]
+            allowed = getattr(view, 'ordering_fields', None) or []
+            if len(terms) != 1 or terms[0].lstrip('-') not in allowed:
+                raise ValidationError({
+                    self.ordering_query_param: [
+                        f'Cursor pagination accepts a single ordering field from: {", ".join(allowed) or "none"}'
+                    ]
+                })
+            field = terms[0]
+            if queryset.model._meta.get_field(field.lstrip('-')).null:
+                raise ValidationError({
+                    self.ordering_query_param: [f'Cursor pagination cannot order by nullable field {field.lstrip("-")}']
+                })
+            return field.lstrip('-'), field.startswith('-')
+
+        ordering = getattr(view, 'ordering', None) or ['-pk']
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        field = ordering[0]
+        return field.lstrip('-'), field.startswith('-')
+
+    @staticmethod
+    def encode_value(value: Any) -> Any:
+        """Make a sort value JSON-safe; decode_cursor restores it with the field's to_python"""
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (Decimal, UUID)):
+            return str(value)
+        return value
+
+    def encode_cursor(self, field_name: str, value: Any, pk: Any) -> str:
+        payload = json.dumps([field_name, self.encode_value(value), str(pk)])
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, encoded: str, queryset, field_name: str) -> Tuple[Any, Any]:
+        try:
+            cursor_field, value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor_field != field_name:
+                # The cursor belongs to a different ordering than this request
+                raise ValueError(cursor_field)
+            model = queryset.model
+            value = model._meta.get_field(field_name).to_python(value)
+            pk = model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, UnicodeDecodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def paginate_queryset(self, queryset, request, view=None) -> List[Any]:
+        self.request = request
+        field_name, descending = self.get_ordering(request, queryset, view)
+        page_size = self.get_page_size(request)
+
+        direction = '-' if descending else ''
+        queryset = queryset.order_by(f'{direction}{field_name}', f'{direction}pk')
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            value, pk = self.decode_cursor(encoded, queryset, field_name)
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{lookup}': value}) |
+                Q(**{field_name: value, f'pk__{lookup}': pk})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = self.page[-1]
+            self.next_cursor = self.encode_cursor(field_name, getattr(last, field_name), last.pk)
+        return self.page
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Page-number pagination with opt-in keyset pagination.
+
+    Clients that send ``?pagination=cursor`` (or follow a ``cursor`` link)
+    get ``KeysetPagination`` instead, which skips the COUNT query and OFFSET
+    scan; everyone else keeps the existing page-number response.
+    """
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,30 @@
+"""
+Shared request parsers for the REST API
+"""
+import codecs
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class JSONLinesParser(BaseParser):
+    """
+    Parses newline-delimited JSON (one object per line) into a list.
+    Blank lines are skipped; a malformed line fails the request with its line number.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for line_number, line in enumerate(codecs.getreader(encoding)(stream), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'JSON parse error on line {line_number} - {exc}')
+        return items
@@ -5,6 +5,7 @@ Django settings for healthcare_platform project.
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -118,15 +119,40 @@ TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
 SENDGRID_API_KEY = config('SENDGRID_API_KEY', default='')
 SENDGRID_FROM_EMAIL = config('SENDGRID_FROM_EMAIL', default='noreply@healthcareplatform.com')
 
+# Notification providers: 'live' sends through Twilio/SendGrid/SMTP with per-process
+# pooled clients, 'stub' records messages in memory for tests and local development
+NOTIFICATION_PROVIDER_MODE = config('NOTIFICATION_PROVIDER_MODE', default='live')
+
 # Database
 # For development, use SQLite instead of PostgreSQL
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # On disk rather than in memory, so concurrent-booking tests get SQLite's busy timeout
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Cache
+# Uses Redis when CACHE_REDIS_URL is set, otherwise a per-process in-memory cache
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'healthcare',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'healthcare-platform',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -173,7 +199,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'healthcare_platform.pagination.StandardPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -232,6 +258,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-doctor-ratings': {
+        'task': 'doctors.services.reconcile_doctor_ratings',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'schedule-appointment-reminders': {
+        'task': 'appointments.services.schedule_appointment_reminders',
+        'schedule': crontab(minute='*'),
+    },
+    'purge-chart-exports': {
+        'task': 'emr.services.purge_chart_exports',
+        'schedule': crontab(minute=15),
+    },
+}
 
 # Channels Settings
 CHANNEL_LAYERS = {
@@ -0,0 +1,74 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Engine
+from django.template.loader import render_to_string
+
+from notifications.services import EmailService
+
+SAMPLE_CONTEXTS = {
+    'appointment_reminder': lambda i: {
+        'patient_name': f'Patient {i}',
+        'doctor_name': f'Doctor {i % 50}',
+        'appointment_date': 'March 14, 2025',
+        'appointment_time': '09:30 AM',
+        'appointment_type': 'Video Consultation',
+        'meeting_link': f'https://meet.healthcareplatform.com/{i}' if i % 2 else 'N/A',
+    },
+    'payment_confirmation': lambda i: {
+        'patient_name': f'Patient {i}',
+        'amount': Decimal('75.00') + i % 100,
+        'transaction_id': f'txn_{i:08d}',
+        'appointment_date': 'March 14, 2025',
+        'doctor_name': f'Doctor {i % 50}',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure email template renders per second, per recipient and batched'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=2000, help='Recipients to render per template and mode')
+        parser.add_argument(
+            '--template', action='append', choices=sorted(SAMPLE_CONTEXTS),
+            help='Template to benchmark (repeatable, default all)'
+        )
+
+    def handle(self, *args, **options):
+        renders = options['renders']
+        # The loader chain without caching: every render re-reads and re-parses the file
+        template_settings = settings.TEMPLATES[0]
+        uncached_engine = Engine(
+            dirs=template_settings['DIRS'],
+            loaders=['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader'],
+        )
+
+        for template_name in options['template'] or sorted(SAMPLE_CONTEXTS):
+            contexts = [SAMPLE_CONTEXTS[template_name](i) for i in range(renders)]
+            modes = [
+                ('uncached loaders', lambda: [
+                    (uncached_engine.render_to_string(f'emails/{template_name}.html', context),
+                     uncached_engine.render_to_string(f'emails/{template_name}.txt', context))
+                    for context in contexts
+                ]),
+                ('render_to_string', lambda: [
+                    (render_to_string(f'emails/{template_name}.html', context),
+                     render_to_string(f'emails/{template_name}.txt', context))
+                    for context in contexts
+                ]),
+                ('render_templates', lambda: EmailService.render_templates(template_name, contexts)),
+            ]
+
+            # Warm the compiled-template caches so only steady-state rendering is timed
+            EmailService.render_templates(template_name, contexts[:1])
+            render_to_string(f'emails/{template_name}.html', contexts[0])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{template_name} ({renders} recipients, HTML + text)'))
+            for label, render in modes:
+                started = time.perf_counter()
+                render()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'  {label:<18} {renders / elapsed:>10,.0f} renders/s  {elapsed:7.3f}s')
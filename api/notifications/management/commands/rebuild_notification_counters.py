@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from notifications.services import NotificationCounterService
+
+
+class Command(BaseCommand):
+    help = 'Recount every user\'s unread notifications into their notification summary'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users recounted per batch')
+
+    def handle(self, *args, **options):
+        processed = NotificationCounterService.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recounted unread notifications for {processed} users'))
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_unread_counts(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationSummary = apps.get_model('notifications', 'NotificationSummary')
+    unread = dict(
+        Notification.objects.filter(read_at__isnull=True)
+        .values_list('user_id')
+        .annotate(count=Count('id'))
+        .values_list('user_id', 'count')
+    )
+    NotificationSummary.objects.bulk_create(
+        [
+            NotificationSummary(user_id=user_id, unread_count=unread.get(user_id, 0))
+            for user_id in User.objects.values_list('id', flat=True).iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'read_at', 'created_at'], name='notif_user_unread_idx'),
+        ),
+        migrations.CreateModel(
+            name='NotificationSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Notification Summary',
+                'verbose_name_plural': 'Notification Summaries',
+                'db_table': 'notifications_summary',
+            },
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
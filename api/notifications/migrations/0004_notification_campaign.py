@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCampaign',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS'), ('push', 'Push Notification'), ('in_app', 'In-App')], max_length=10)),
+                ('recipients', models.IntegerField(default=0)),
+                ('created_count', models.IntegerField(default=0)),
+                ('sent_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Notification Campaign',
+                'verbose_name_plural': 'Notification Campaigns',
+                'db_table': 'notifications_campaign',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -58,6 +58,58 @@ class Notification(models.Model):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at']
+        indexes = [
+            # Unread count and latest-unread list per user
+            models.Index(fields=['user', 'read_at', 'created_at'], name='notif_user_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.get_notification_type_display()}"
+
+
+class NotificationSummary(models.Model):
+    """
+    Per-user unread notification counter
+    
+    Kept in step with Notification by NotificationCounterService, so badge
+    reads are a primary-key lookup instead of a COUNT over notifications.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='notification_summary'
+    )
+    unread_count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'notifications_summary'
+        verbose_name = 'Notification Summary'
+        verbose_name_plural = 'Notification Summaries'
+    
+    def __str__(self):
+        return f"{self.user.get_full_name()} - {self.unread_count} unread"
+
+
+class NotificationCampaign(models.Model):
+    """
+    Delivery progress of a bulk notification
+    
+    Counters are bumped with ``F()`` updates by whichever worker creates or
+    delivers a chunk, so every process sees the same totals.
+    """
+    id = models.CharField(max_length=32, primary_key=True)
+    channel = models.CharField(max_length=10, choices=Notification.CHANNEL_CHOICES)
+    recipients = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    sent_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'notifications_campaign'
+        verbose_name = 'Notification Campaign'
+        verbose_name_plural = 'Notification Campaigns'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Campaign {self.id} ({self.get_channel_display()})"
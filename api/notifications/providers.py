@@ -0,0 +1,155 @@
+"""
+Per-process provider clients for notification delivery
+
+Twilio and SendGrid clients are built once per worker process and reused, so
+every message rides an existing keep-alive HTTPS connection instead of paying
+for a new client, TCP handshake and TLS negotiation. SMTP connections are
+opened per batch with ``email_connection()``.
+
+With ``NOTIFICATION_PROVIDER_MODE = 'stub'`` nothing leaves the process:
+SMS and SendGrid sends are recorded in ``stub_outbox`` and email goes to
+Django's locmem backend (``django.core.mail.outbox``).
+"""
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.mail import get_connection
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client as TwilioClient
+
+SENDGRID_SEND_URL = 'https://api.sendgrid.com/v3/mail/send'
+PROVIDER_HTTP_TIMEOUT = 10  # seconds
+# Enough pooled connections for SMSService.send_many's worker threads
+PROVIDER_POOL_SIZE = 16
+
+_clients: Dict[Tuple[Any, ...], Any] = {}
+_clients_lock = threading.Lock()
+
+# Messages captured in stub mode, as (provider, payload) pairs
+stub_outbox: List[Tuple[str, Dict[str, Any]]] = []
+
+
+def stub_mode() -> bool:
+    return getattr(settings, 'NOTIFICATION_PROVIDER_MODE', 'live') == 'stub'
+
+
+def _pooled(name: str, credentials: Tuple[str, ...], factory: Callable[[], Any]) -> Any:
+    """
+    Return the process's client for ``name``, building it on first use.
+
+    The key includes the pid so a forked Celery worker never reuses its
+    parent's sockets, and the credentials so rotated keys get a new client.
+    """
+    key = (os.getpid(), name) + credentials
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = factory()
+    return client
+
+
+def reset_clients() -> None:
+    """Drop every pooled client, closing their sessions"""
+    with _clients_lock:
+        for client in _clients.values():
+            close = getattr(client, 'close', None)
+            if close:
+                close()
+        _clients.clear()
+
+
+class PooledSendGridClient:
+    """SendGrid v3 mail/send over a keep-alive ``requests`` session"""
+
+    def __init__(self, api_key: str):
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=PROVIDER_POOL_SIZE))
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def send(self, message) -> requests.Response:
+        """Send a ``sendgrid.helpers.mail.Mail``; the response has ``status_code`` and ``headers``"""
+        return self.session.post(SENDGRID_SEND_URL, json=message.get(), timeout=PROVIDER_HTTP_TIMEOUT)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class StubResponse:
+    def __init__(self, status_code: int, headers: Dict[str, str]):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class StubSendGridClient:
+    def send(self, message) -> StubResponse:
+        message_id = uuid.uuid4().hex
+        stub_outbox.append(('sendgrid', {'message_id': message_id, **message.get()}))
+        return StubResponse(202, {'X-Message-Id': message_id})
+
+
+class StubTwilioMessage:
+    def __init__(self, sid: str):
+        self.sid = sid
+
+
+class StubTwilioMessages:
+    def create(self, body: str, from_: str, to: str) -> StubTwilioMessage:
+        sid = f'SM{uuid.uuid4().hex}'
+        stub_outbox.append(('twilio', {'sid': sid, 'body': body, 'from': from_, 'to': to}))
+        return StubTwilioMessage(sid)
+
+
+class StubTwilioClient:
+    def __init__(self):
+        self.messages = StubTwilioMessages()
+
+
+def twilio_client() -> Optional[Any]:
+    """Pooled Twilio client, or ``None`` when Twilio is not configured"""
+    if stub_mode():
+        return _pooled('twilio-stub', (), StubTwilioClient)
+    if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+        return None
+    return _pooled(
+        'twilio',
+        (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
+        lambda: TwilioClient(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(pool_connections=True, timeout=PROVIDER_HTTP_TIMEOUT)
+        )
+    )
+
+
+def sendgrid_client() -> Optional[Any]:
+    """Pooled SendGrid client, or ``None`` when SendGrid is not configured"""
+    if stub_mode():
+        return _pooled('sendgrid-stub', (), StubSendGridClient)
+    if not settings.SENDGRID_API_KEY:
+        return None
+    return _pooled(
+        'sendgrid',
+        (settings.SENDGRID_API_KEY,),
+        lambda: PooledSendGridClient(settings.SENDGRID_API_KEY)
+    )
+
+
+def email_connection(**kwargs):
+    """
+    An unopened email connection to share across a batch of messages.
+
+    Use it as a context manager so SMTP is connected once and closed at the
+    end of the batch.
+    """
+    if stub_mode():
+        return get_connection('django.core.mail.backends.locmem.EmailBackend', **kwargs)
+    return get_connection(**kwargs)
@@ -2,18 +2,33 @@
 Notification services for email and SMS
 """
 import logging
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Sequence, Tuple
 from django.conf import settings
 from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from twilio.rest import Client as TwilioClient
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from celery import shared_task
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+from django.template import Context
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import linebreaks, strip_tags
+from sendgrid.helpers.mail import Mail, Personalization, To, CustomArg
+from celery import group, shared_task
+
+from users.models import User
+from .models import Notification, NotificationCampaign, NotificationSummary
+from . import providers
 
 logger = logging.getLogger(__name__)
 
+NOTIFICATION_CREATE_BATCH_SIZE = 1000
+UNREAD_COUNTER_REBUILD_CHUNK_SIZE = 1000
+# SendGrid accepts up to 1000 personalizations per mail/send request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+SMS_DISPATCH_BATCH_SIZE = 200
+TWILIO_MAX_CONCURRENCY = 8
+
+
 class EmailService:
     """Email notification service using Gmail SMTP and SendGrid"""
     
@@ -22,9 +37,10 @@ class EmailService:
         to_email: str,
         subject: str,
         message: str,
-        from_email: Optional[str] = None
+        from_email: Optional[str] = None,
+        connection=None
     ) -> bool:
-        """Send a simple text email"""
+        """Send a simple text email, over ``connection`` when sending a batch"""
         try:
             from_email = from_email or settings.DEFAULT_FROM_EMAIL
             send_mail(
@@ -33,6 +49,7 @@ class EmailService:
                 from_email=from_email,
                 recipient_list=[to_email],
                 fail_silently=False,
+                connection=connection or providers.email_connection(),
             )
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -46,9 +63,10 @@ class EmailService:
         subject: str,
         html_content: str,
         text_content: Optional[str] = None,
-        from_email: Optional[str] = None
+        from_email: Optional[str] = None,
+        connection=None
     ) -> bool:
-        """Send an HTML email with text fallback"""
+        """Send an HTML email with text fallback, over ``connection`` when sending a batch"""
         try:
             from_email = from_email or settings.DEFAULT_FROM_EMAIL
             
@@ -56,7 +74,8 @@ class EmailService:
                 subject=subject,
                 body=text_content or strip_tags(html_content),
                 from_email=from_email,
-                to=[to_email]
+                to=[to_email],
+                connection=connection or providers.email_connection()
             )
             msg.attach_alternative(html_content, "text/html")
             msg.send()
@@ -67,32 +86,90 @@ class EmailService:
             logger.error(f"Failed to send HTML email to {to_email}: {str(e)}")
             return False
     
+    @staticmethod
+    def render_template(template_name: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """Render the (HTML, text) bodies of an email template"""
+        return EmailService.render_templates(template_name, [context])[0]
+    
+    @staticmethod
+    def render_templates(template_name: str, contexts: Iterable[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        Render the (HTML, text) bodies of an email template for each context.
+        
+        Both templates come from the engine's cached loader and are rendered
+        against a single ``Context``, pushing each recipient's values on top of it.
+        """
+        html_template = get_template(f'emails/{template_name}.html').template
+        text_template = get_template(f'emails/{template_name}.txt').template
+        template_context = Context(autoescape=html_template.engine.autoescape)
+        rendered = []
+        for context in contexts:
+            with template_context.push(context):
+                rendered.append((html_template.render(template_context), text_template.render(template_context)))
+        return rendered
+    
     @staticmethod
     def send_template_email(
         to_email: str,
         subject: str,
         template_name: str,
         context: Dict[str, Any],
-        from_email: Optional[str] = None
+        from_email: Optional[str] = None,
+        connection=None
     ) -> bool:
         """Send email using Django template"""
         try:
-            from_email = from_email or settings.DEFAULT_FROM_EMAIL
-            
-            # Render HTML template
-            html_content = render_to_string(f'emails/{template_name}.html', context)
-            text_content = render_to_string(f'emails/{template_name}.txt', context)
+            html_content, text_content = EmailService.render_template(template_name, context)
             
             return EmailService.send_html_email(
                 to_email=to_email,
                 subject=subject,
                 html_content=html_content,
                 text_content=text_content,
-                from_email=from_email
+                from_email=from_email,
+                connection=connection
             )
         except Exception as e:
             logger.error(f"Failed to send template email to {to_email}: {str(e)}")
             return False
+    
+    @staticmethod
+    def send_template_emails(
+        recipients: Sequence[Tuple[str, Dict[str, Any]]],
+        subject: str,
+        template_name: str,
+        from_email: Optional[str] = None,
+        connection=None
+    ) -> List[bool]:
+        """
+        Send one template to many (email, context) recipients.
+        
+        Bodies are rendered in one batch and sent over ``connection``, or a
+        single new connection when none is given.
+        """
+        if connection is None:
+            with providers.email_connection() as connection:
+                return EmailService.send_template_emails(
+                    recipients, subject, template_name, from_email=from_email, connection=connection
+                )
+        
+        try:
+            rendered = EmailService.render_templates(template_name, [context for _, context in recipients])
+        except Exception as e:
+            logger.error(f"Failed to render {template_name} for {len(recipients)} recipients: {str(e)}")
+            return [False] * len(recipients)
+        
+        return [
+            EmailService.send_html_email(
+                to_email=to_email,
+                subject=subject,
+                html_content=html_content,
+                text_content=text_content,
+                from_email=from_email,
+                connection=connection
+            )
+            for (to_email, _), (html_content, text_content) in zip(recipients, rendered)
+        ]
 
 class SMSService:
     """SMS notification service using Twilio"""
@@ -105,11 +182,11 @@ class SMSService:
     ) -> bool:
         """Send SMS using Twilio"""
         try:
-            if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+            client = providers.twilio_client()
+            if client is None:
                 logger.warning("Twilio credentials not configured")
                 return False
             
-            client = TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
             from_phone = from_phone or settings.TWILIO_PHONE_NUMBER
             
             message_obj = client.messages.create(
@@ -124,6 +201,33 @@ class SMSService:
             logger.error(f"Failed to send SMS to {to_phone}: {str(e)}")
             return False
 
+    @staticmethod
+    def send_many(messages: Sequence[Tuple[str, str]], from_phone: Optional[str] = None) -> List[Tuple[Optional[str], str]]:
+        """
+        Send (to_phone, body) pairs over the pooled Twilio client with at most
+        ``TWILIO_MAX_CONCURRENCY`` requests in flight. Returns (sid, error)
+        per message, in order.
+        """
+        client = providers.twilio_client()
+        if client is None:
+            logger.warning("Twilio credentials not configured")
+            return [(None, 'Twilio credentials not configured')] * len(messages)
+        
+        from_phone = from_phone or settings.TWILIO_PHONE_NUMBER
+        
+        def send(message: Tuple[str, str]) -> Tuple[Optional[str], str]:
+            to_phone, body = message
+            try:
+                return client.messages.create(body=body, from_=from_phone, to=to_phone).sid, ''
+            except Exception as e:
+                logger.error(f"Failed to send SMS to {to_phone}: {str(e)}")
+                return None, str(e)
+        
+        if not messages:
+            return []
+        with ThreadPoolExecutor(max_workers=min(TWILIO_MAX_CONCURRENCY, len(messages))) as pool:
+            return list(pool.map(send, messages))
+
 class SendGridService:
     """Email service using SendGrid API"""
     
@@ -137,7 +241,8 @@ class SendGridService:
     ) -> bool:
         """Send email using SendGrid API"""
         try:
-            if not settings.SENDGRID_API_KEY:
+            client = providers.sendgrid_client()
+            if client is None:
                 logger.warning("SendGrid API key not configured")
                 return False
             
@@ -151,8 +256,7 @@ class SendGridService:
                 plain_text_content=text_content or strip_tags(html_content)
             )
             
-            sg = SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
-            response = sg.send(message)
+            response = client.send(message)
             
             if response.status_code in [200, 201, 202]:
                 logger.info(f"SendGrid email sent successfully to {to_email}")
@@ -164,7 +268,384 @@ class SendGridService:
             logger.error(f"Failed to send SendGrid email to {to_email}: {str(e)}")
             return False
 
+    @staticmethod
+    def send_batch(
+        recipients: Sequence[Tuple[str, Dict[str, str]]],
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None,
+        from_email: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """
+        Send one message to up to ``SENDGRID_MAX_PERSONALIZATIONS`` recipients in a
+        single request. Each (email, custom_args) pair gets its own
+        personalization, so recipients never see each other and webhook events
+        carry the custom args back. Returns (success, message id or error).
+        """
+        client = providers.sendgrid_client()
+        if client is None:
+            return False, 'SendGrid API key not configured'
+        if len(recipients) > SENDGRID_MAX_PERSONALIZATIONS:
+            raise ValueError(f"SendGrid accepts at most {SENDGRID_MAX_PERSONALIZATIONS} recipients per request")
+        
+        try:
+            message = Mail(
+                from_email=from_email or settings.SENDGRID_FROM_EMAIL,
+                subject=subject,
+                html_content=html_content,
+                plain_text_content=text_content or strip_tags(html_content)
+            )
+            for email, custom_args in recipients:
+                personalization = Personalization()
+                personalization.add_to(To(email))
+                for key, value in custom_args.items():
+                    personalization.add_custom_arg(CustomArg(key, value))
+                message.add_personalization(personalization)
+            
+            response = client.send(message)
+            if response.status_code in [200, 201, 202]:
+                logger.info(f"SendGrid batch sent to {len(recipients)} recipients")
+                return True, response.headers.get('X-Message-Id', '') if response.headers else ''
+            logger.error(f"SendGrid batch failed: {response.status_code}")
+            return False, f"SendGrid returned {response.status_code}"
+        except Exception as e:
+            logger.error(f"Failed to send SendGrid batch of {len(recipients)}: {str(e)}")
+            return False, str(e)
+
+class NotificationCounterService:
+    """
+    Per-user unread counters in NotificationSummary
+    
+    Creates and deletes are counted by signals (and by the bulk insert in
+    NotificationDispatchService); reads go through mark_read and
+    mark_all_read, which decrement by exactly the rows they flipped. All
+    changes are relative ``F()`` updates, so concurrent writers never
+    overwrite each other's counts.
+    """
+    
+    @staticmethod
+    def adjust(user_ids: Iterable[int], delta: int) -> None:
+        """Add ``delta`` to each user's unread count, once per listed user"""
+        user_ids = set(user_ids)
+        if not user_ids or not delta:
+            return
+        updated = NotificationSummary.objects.filter(user_id__in=user_ids).update(
+            unread_count=F('unread_count') + delta
+        )
+        # Decrements never create rows: a missing row means the user is being deleted
+        if delta < 0 or updated == len(user_ids):
+            return
+        missing = user_ids - set(
+            NotificationSummary.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        NotificationSummary.objects.bulk_create(
+            [NotificationSummary(user_id=user_id) for user_id in missing], ignore_conflicts=True
+        )
+        NotificationSummary.objects.filter(user_id__in=missing).update(unread_count=F('unread_count') + delta)
+    
+    @staticmethod
+    def unread_count(user_id: int) -> int:
+        """The user's unread count, read from the summary row alone"""
+        count = NotificationSummary.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+        return max(count or 0, 0)
+    
+    @staticmethod
+    def mark_read(user_id: int, notification_id: int) -> int:
+        """Mark one of the user's notifications read; returns 1 if it was unread"""
+        now = timezone.now()
+        with transaction.atomic():
+            updated = Notification.objects.filter(
+                id=notification_id, user_id=user_id, read_at__isnull=True
+            ).update(read_at=now, status='read', updated_at=now)
+            NotificationCounterService.adjust([user_id], -updated)
+        return updated
+    
+    @staticmethod
+    def mark_all_read(user_id: int) -> int:
+        """Mark all of the user's notifications read; returns how many were unread"""
+        now = timezone.now()
+        with transaction.atomic():
+            updated = Notification.objects.filter(user_id=user_id, read_at__isnull=True).update(
+                read_at=now, status='read', updated_at=now
+            )
+            NotificationCounterService.adjust([user_id], -updated)
+        return updated
+    
+    @staticmethod
+    def rebuild(chunk_size: int = UNREAD_COUNTER_REBUILD_CHUNK_SIZE) -> int:
+        """Recount every user's unread notifications from the table; returns users processed"""
+        processed = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                return processed
+            unread = dict(
+                Notification.objects.filter(user_id__in=user_ids, read_at__isnull=True)
+                .values_list('user_id')
+                .annotate(count=Count('id'))
+                .values_list('user_id', 'count')
+            )
+            NotificationSummary.objects.bulk_create(
+                [NotificationSummary(user_id=user_id, unread_count=unread.get(user_id, 0)) for user_id in user_ids],
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['unread_count']
+            )
+            processed += len(user_ids)
+            last_id = user_ids[-1]
+
+class NotificationDispatchService:
+    """
+    Fan a notification out to many users: rows are inserted with bulk_create
+    in chunks, delivered by Celery task groups over batched provider calls,
+    and per-recipient results are written back with bulk_update.
+    """
+    
+    PROGRESS_COUNTERS = ['created', 'sent', 'failed']
+    
+    @staticmethod
+    def start_progress(campaign_id: str, channel: str, recipients: int) -> NotificationCampaign:
+        return NotificationCampaign.objects.create(id=campaign_id, channel=channel, recipients=recipients)
+    
+    @staticmethod
+    def _increment(campaign_id: Optional[str], counter: str, amount: int) -> None:
+        if not campaign_id or not amount:
+            return
+        column = f'{counter}_count'
+        NotificationCampaign.objects.filter(id=campaign_id).update(**{column: F(column) + amount})
+    
+    @staticmethod
+    def get_progress(campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Return the campaign counters, if the campaign is known"""
+        campaign = NotificationCampaign.objects.filter(id=campaign_id).first()
+        if campaign is None:
+            return None
+        progress = {'campaign_id': campaign.id, 'channel': campaign.channel, 'recipients': campaign.recipients}
+        progress.update({
+            counter: getattr(campaign, f'{counter}_count') for counter in NotificationDispatchService.PROGRESS_COUNTERS
+        })
+        progress['finished'] = progress['sent'] + progress['failed'] >= progress['recipients']
+        return progress
+    
+    @staticmethod
+    def batch_size(channel: str) -> int:
+        """Notifications per delivery task for a channel"""
+        if channel == 'email':
+            return SENDGRID_MAX_PERSONALIZATIONS
+        return SMS_DISPATCH_BATCH_SIZE
+    
+    @staticmethod
+    def create_notifications(
+        user_ids: Sequence[int],
+        notification_type: str,
+        channel: str,
+        title: str,
+        message: str,
+        metadata: Dict[str, Any],
+        chunk_size: int = NOTIFICATION_CREATE_BATCH_SIZE
+    ) -> Iterator[List[int]]:
+        """Insert one notification per existing user, yielding the new ids chunk by chunk"""
+        unique_ids = sorted(set(user_ids))
+        for start in range(0, len(unique_ids), chunk_size):
+            existing = list(
+                User.objects.filter(id__in=unique_ids[start:start + chunk_size]).values_list('id', flat=True)
+            )
+            # bulk_create skips post_save, so the new unread rows are counted here
+            with transaction.atomic():
+                created = Notification.objects.bulk_create([
+                    Notification(
+                        user_id=user_id,
+                        notification_type=notification_type,
+                        channel=channel,
+                        title=title,
+                        message=message,
+                        metadata=metadata
+                    )
+                    for user_id in existing
+                ])
+                NotificationCounterService.adjust(existing, 1)
+            if created:
+                yield [notification.id for notification in created]
+    
+    @staticmethod
+    def _deliver_email(notifications: List[Notification]) -> Dict[int, Tuple[bool, str]]:
+        results = {}
+        deliverable = [notification for notification in notifications if notification.user.email]
+        for notification in notifications:
+            if not notification.user.email:
+                results[notification.id] = (False, 'User has no email address')
+        if not deliverable:
+            return results
+        
+        if providers.sendgrid_client() is not None:
+            # A SendGrid request carries one subject and body, so rows are sent grouped by content
+            by_content: Dict[Tuple[str, str], List[Notification]] = {}
+            for notification in deliverable:
+                by_content.setdefault((notification.title, notification.message), []).append(notification)
+            for (title, message), rows in by_content.items():
+                html_content = linebreaks(message, autoescape=True)
+                for start in range(0, len(rows), SENDGRID_MAX_PERSONALIZATIONS):
+                    chunk = rows[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+                    success, detail = SendGridService.send_batch(
+                        [(notification.user.email, {'notification_id': str(notification.id)}) for notification in chunk],
+                        subject=title,
+                        html_content=html_content,
+                        text_content=message
+                    )
+                    results.update({notification.id: (success, detail) for notification in chunk})
+            return results
+        
+        # Without SendGrid, send over a single SMTP connection
+        messages = []
+        for notification in deliverable:
+            email = EmailMultiAlternatives(
+                subject=notification.title,
+                body=notification.message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[notification.user.email]
+            )
+            email.attach_alternative(linebreaks(notification.message, autoescape=True), "text/html")
+            messages.append(email)
+        try:
+            with providers.email_connection(fail_silently=False) as connection:
+                connection.send_messages(messages)
+            results.update({notification.id: (True, '') for notification in deliverable})
+        except Exception as e:
+            logger.error(f"Failed to send email batch of {len(messages)}: {str(e)}")
+            results.update({notification.id: (False, str(e)) for notification in deliverable})
+        return results
+    
+    @staticmethod
+    def _deliver_sms(notifications: List[Notification]) -> Dict[int, Tuple[bool, str]]:
+        results = {}
+        deliverable = [notification for notification in notifications if notification.user.phone]
+        for notification in notifications:
+            if not notification.user.phone:
+                results[notification.id] = (False, 'User has no phone number')
+        sent = SMSService.send_many([(notification.user.phone, notification.message) for notification in deliverable])
+        for notification, (sid, error) in zip(deliverable, sent):
+            results[notification.id] = (True, sid) if sid else (False, error)
+        return results
+    
+    @staticmethod
+    def _write_back(notifications: List[Notification]) -> None:
+        """
+        Persist delivery outcomes in as few statements as possible.
+
+        Status and timestamps are the same for every row with the same outcome,
+        so they go out as one UPDATE per status. Rows the user read while the
+        batch was in flight keep ``read``: the status is decided inside the
+        UPDATE from ``read_at``, never from the copy loaded before delivery.
+        Only the per-recipient columns (the provider message id of sent rows,
+        the error in failed rows' metadata) go through bulk_update, and only
+        when they actually differ: a SendGrid batch shares one message id and
+        usually one error.
+        """
+        now = timezone.now()
+        for status, column in [('sent', 'external_id'), ('failed', 'metadata')]:
+            rows = [notification for notification in notifications if notification.status == status]
+            if not rows:
+                continue
+            values = {
+                'status': Case(When(read_at__isnull=False, then=Value('read')), default=Value(status)),
+                'updated_at': now,
+                **({'sent_at': now} if status == 'sent' else {}),
+            }
+            first_value = getattr(rows[0], column)
+            if all(getattr(notification, column) == first_value for notification in rows):
+                values[column] = first_value
+            for start in range(0, len(rows), NOTIFICATION_CREATE_BATCH_SIZE):
+                ids = [notification.id for notification in rows[start:start + NOTIFICATION_CREATE_BATCH_SIZE]]
+                Notification.objects.filter(id__in=ids).update(**values)
+            if column not in values:
+                Notification.objects.bulk_update(rows, [column], batch_size=NOTIFICATION_CREATE_BATCH_SIZE)
+    
+    @staticmethod
+    def deliver(notification_ids: Sequence[int], campaign_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Deliver notifications that have not been sent or failed yet and write each outcome back.
+
+        Delivery state is ``sent_at`` plus a recorded error, not ``status``:
+        a notification the user already read in-app is still delivered.
+        """
+        notifications = list(
+            Notification.objects.filter(id__in=notification_ids, sent_at__isnull=True)
+            .exclude(status='failed')
+            .exclude(metadata__has_key='error')
+            .select_related('user')
+            .only('id', 'channel', 'status', 'title', 'message', 'metadata', 'external_id', 'user__email', 'user__phone')
+        )
+        by_channel: Dict[str, List[Notification]] = {}
+        for notification in notifications:
+            by_channel.setdefault(notification.channel, []).append(notification)
+        
+        results = {}
+        for channel, batch in by_channel.items():
+            if channel == 'email':
+                results.update(NotificationDispatchService._deliver_email(batch))
+            elif channel == 'sms':
+                results.update(NotificationDispatchService._deliver_sms(batch))
+            elif channel == 'in_app':
+                results.update({notification.id: (True, '') for notification in batch})
+            else:
+                results.update({
+                    notification.id: (False, f'{channel} delivery is not configured') for notification in batch
+                })
+        
+        counts = {'sent': 0, 'failed': 0}
+        for notification in notifications:
+            success, detail = results[notification.id]
+            if success:
+                notification.status = 'sent'
+                notification.external_id = detail
+                counts['sent'] += 1
+            else:
+                notification.status = 'failed'
+                notification.metadata = {**notification.metadata, 'error': detail}
+                counts['failed'] += 1
+        NotificationDispatchService._write_back(notifications)
+        
+        for counter, amount in counts.items():
+            NotificationDispatchService._increment(campaign_id, counter, amount)
+        return counts
+
+
 # Celery Tasks
+@shared_task
+def dispatch_notification_campaign(
+    campaign_id: str,
+    user_ids: List[int],
+    notification_type: str,
+    channel: str,
+    title: str,
+    message: str,
+    metadata: Dict[str, Any]
+):
+    """Create a campaign's notifications in chunks and enqueue a delivery group per chunk"""
+    batch_size = NotificationDispatchService.batch_size(channel)
+    created = 0
+    for notification_ids in NotificationDispatchService.create_notifications(
+        user_ids, notification_type, channel, title, message, metadata
+    ):
+        created += len(notification_ids)
+        NotificationDispatchService._increment(campaign_id, 'created', len(notification_ids))
+        group(
+            deliver_notifications.s(notification_ids[start:start + batch_size], campaign_id)
+            for start in range(0, len(notification_ids), batch_size)
+        ).apply_async()
+    # Unknown user ids were skipped, so the campaign finishes once the rows actually created are delivered
+    NotificationCampaign.objects.filter(id=campaign_id).update(recipients=created)
+    logger.info(f"Notification campaign {campaign_id}: {created} notifications enqueued over {channel}")
+    return created
+
+@shared_task
+def deliver_notifications(notification_ids: List[int], campaign_id: Optional[str] = None):
+    """Deliver one batch of notifications through their channel's provider"""
+    return NotificationDispatchService.deliver(notification_ids, campaign_id)
+
 @shared_task
 def send_appointment_reminder_email(appointment_id: int):
     """Send appointment reminder email"""
@@ -0,0 +1,20 @@
+"""
+Keep per-user unread counters in step with notification inserts and deletes
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Notification
+from .services import NotificationCounterService
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    if created and instance.read_at is None:
+        NotificationCounterService.adjust([instance.user_id], 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_unread_notification(sender, instance, **kwargs):
+    if instance.read_at is None:
+        NotificationCounterService.adjust([instance.user_id], -1)
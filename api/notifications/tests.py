@@ -0,0 +1,281 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.models import User
+from .models import Notification, NotificationSummary
+from . import providers
+from .services import (
+    NotificationCounterService, NotificationDispatchService, SendGridService, SMSService,
+    dispatch_notification_campaign
+)
+
+
+class NotificationDeliveryTests(TestCase):
+    """Reading a notification in-app neither cancels its delivery nor is undone by it"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='patient', email='pat@example.com', role='patient')
+
+    def notify(self, channel='in_app'):
+        return Notification.objects.create(
+            user=self.user, notification_type='system_update', channel=channel, title='Update', message='Hello'
+        )
+
+    def test_read_notification_is_still_delivered(self):
+        notification = self.notify()
+        NotificationCounterService.mark_read(self.user.id, notification.id)
+
+        self.assertEqual(NotificationDispatchService.deliver([notification.id]), {'sent': 1, 'failed': 0})
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'read')
+        self.assertIsNotNone(notification.sent_at)
+        # Delivered rows are not delivered again
+        self.assertEqual(NotificationDispatchService.deliver([notification.id]), {'sent': 0, 'failed': 0})
+
+    def test_write_back_keeps_concurrent_read(self):
+        sent, failed = self.notify(), self.notify(channel='push')
+        loaded = list(Notification.objects.filter(id__in=[sent.id, failed.id]).order_by('id'))
+        NotificationCounterService.mark_all_read(self.user.id)
+
+        loaded[0].status, loaded[1].status = 'sent', 'failed'
+        loaded[1].metadata = {'error': 'push delivery is not configured'}
+        NotificationDispatchService._write_back(loaded)
+
+        sent.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertEqual((sent.status, failed.status), ('read', 'read'))
+        self.assertIsNotNone(sent.sent_at)
+        self.assertIsNone(failed.sent_at)
+        self.assertEqual(failed.metadata['error'], 'push delivery is not configured')
+
+    def test_failed_read_notification_is_not_retried(self):
+        notification = self.notify(channel='push')
+        NotificationCounterService.mark_read(self.user.id, notification.id)
+
+        self.assertEqual(NotificationDispatchService.deliver([notification.id]), {'sent': 0, 'failed': 1})
+        self.assertEqual(NotificationDispatchService.deliver([notification.id]), {'sent': 0, 'failed': 0})
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'read')
+
+
+class NotificationCounterTests(TestCase):
+    """The unread counter always matches a fresh COUNT of unread rows"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='counted', email='counted@example.com', role='patient')
+        self.other = User.objects.create(username='other', email='other@example.com', role='patient')
+
+    def notify(self, user=None):
+        return Notification.objects.create(
+            user=user or self.user, notification_type='system_update', channel='in_app', title='Update', message='Hello'
+        )
+
+    def assertCounterMatches(self, *users):
+        for user in users or (self.user, self.other):
+            self.assertEqual(
+                NotificationCounterService.unread_count(user.id),
+                Notification.objects.filter(user=user, read_at__isnull=True).count()
+            )
+
+    def test_create(self):
+        self.notify()
+        self.notify()
+        self.notify(self.other)
+        self.assertEqual(NotificationCounterService.unread_count(self.user.id), 2)
+        self.assertCounterMatches()
+
+    def test_bulk_create(self):
+        ids = [
+            notification_id
+            for chunk in NotificationDispatchService.create_notifications(
+                [self.user.id, self.other.id, self.user.id], 'system_update', 'in_app', 'Update', 'Hello', {},
+                chunk_size=1
+            )
+            for notification_id in chunk
+        ]
+        self.assertEqual(len(ids), 2)
+        self.assertCounterMatches()
+
+    def test_mark_read_twice(self):
+        notification = self.notify()
+        self.notify()
+        self.assertEqual(NotificationCounterService.mark_read(self.user.id, notification.id), 1)
+        self.assertEqual(NotificationCounterService.mark_read(self.user.id, notification.id), 0)
+        self.assertEqual(NotificationCounterService.unread_count(self.user.id), 1)
+        self.assertCounterMatches()
+
+    def test_mark_read_of_another_users_notification(self):
+        notification = self.notify(self.other)
+        self.assertEqual(NotificationCounterService.mark_read(self.user.id, notification.id), 0)
+        self.assertCounterMatches()
+
+    def test_mark_all_read(self):
+        first = self.notify()
+        self.notify()
+        self.notify(self.other)
+        NotificationCounterService.mark_read(self.user.id, first.id)
+        before = timezone.now()
+
+        self.assertEqual(NotificationCounterService.mark_all_read(self.user.id), 1)
+        self.assertEqual(NotificationCounterService.unread_count(self.user.id), 0)
+        self.assertEqual(NotificationCounterService.unread_count(self.other.id), 1)
+        self.assertCounterMatches()
+        self.assertFalse(
+            Notification.objects.filter(user=self.user, status='read', updated_at__lt=before).exclude(id=first.id).exists()
+        )
+
+    def test_delete(self):
+        unread, read = self.notify(), self.notify()
+        NotificationCounterService.mark_read(self.user.id, read.id)
+        unread.delete()
+        read.delete()
+        self.assertEqual(NotificationCounterService.unread_count(self.user.id), 0)
+        self.assertCounterMatches()
+
+    def test_rebuild(self):
+        self.notify()
+        self.notify(self.other)
+        read = self.notify()
+        NotificationCounterService.mark_read(self.user.id, read.id)
+        # Drift the counters the way a missed signal would
+        NotificationSummary.objects.update(unread_count=42)
+
+        self.assertEqual(NotificationCounterService.rebuild(chunk_size=1), User.objects.count())
+        self.assertCounterMatches()
+
+
+class ProviderClientTests(TestCase):
+    """Provider clients are pooled per process and per credential set"""
+
+    def setUp(self):
+        providers.reset_clients()
+        self.addCleanup(providers.reset_clients)
+
+    @override_settings(NOTIFICATION_PROVIDER_MODE='live', SENDGRID_API_KEY='key-one')
+    def test_client_is_reused(self):
+        client = providers.sendgrid_client()
+        self.assertIsInstance(client, providers.PooledSendGridClient)
+        self.assertIs(providers.sendgrid_client(), client)
+
+    @override_settings(NOTIFICATION_PROVIDER_MODE='live', SENDGRID_API_KEY='')
+    def test_unconfigured_provider_has_no_client(self):
+        self.assertIsNone(providers.sendgrid_client())
+
+    @override_settings(NOTIFICATION_PROVIDER_MODE='live', SENDGRID_API_KEY='key-one')
+    def test_rotated_credentials_get_a_new_client(self):
+        client = providers.sendgrid_client()
+        with override_settings(SENDGRID_API_KEY='key-two'):
+            rotated = providers.sendgrid_client()
+        self.assertIsNot(rotated, client)
+        self.assertEqual(rotated.session.headers['Authorization'], 'Bearer key-two')
+        self.assertIs(providers.sendgrid_client(), client)
+
+    @override_settings(NOTIFICATION_PROVIDER_MODE='live', TWILIO_ACCOUNT_SID='AC123', TWILIO_AUTH_TOKEN='token')
+    def test_forked_process_gets_a_new_client(self):
+        client = providers.twilio_client()
+        self.assertIs(providers.twilio_client(), client)
+        with mock.patch('notifications.providers.os.getpid', return_value=-1):
+            child = providers.twilio_client()
+        self.assertIsNot(child, client)
+
+    def test_reset_closes_pooled_sessions(self):
+        with override_settings(NOTIFICATION_PROVIDER_MODE='live', SENDGRID_API_KEY='key-one'):
+            client = providers.sendgrid_client()
+        with mock.patch.object(client, 'close') as close:
+            providers.reset_clients()
+        close.assert_called_once_with()
+
+
+@override_settings(NOTIFICATION_PROVIDER_MODE='stub', TWILIO_PHONE_NUMBER='+15550000000')
+class StubProviderTests(TestCase):
+    """Stub mode records provider sends in the outbox instead of calling out"""
+
+    def setUp(self):
+        providers.reset_clients()
+        providers.stub_outbox.clear()
+        self.addCleanup(providers.reset_clients)
+        self.addCleanup(providers.stub_outbox.clear)
+
+    def test_send_many_records_each_sms(self):
+        results = SMSService.send_many([('+15550000001', 'First'), ('+15550000002', 'Second')])
+
+        self.assertEqual([error for _, error in results], ['', ''])
+        sent = {payload['to']: payload for provider, payload in providers.stub_outbox}
+        self.assertEqual({provider for provider, _ in providers.stub_outbox}, {'twilio'})
+        self.assertEqual((sent['+15550000001']['body'], sent['+15550000002']['body']), ('First', 'Second'))
+        self.assertEqual(sent['+15550000001']['from'], '+15550000000')
+        self.assertEqual([sid for sid, _ in results], [sent['+15550000001']['sid'], sent['+15550000002']['sid']])
+
+    def test_send_batch_records_one_request_with_a_personalization_per_recipient(self):
+        success, message_id = SendGridService.send_batch(
+            [('a@example.com', {'notification_id': '1'}), ('b@example.com', {'notification_id': '2'})],
+            subject='Update',
+            html_content='<p>Hello</p>'
+        )
+
+        self.assertTrue(success)
+        self.assertEqual(len(providers.stub_outbox), 1)
+        provider, payload = providers.stub_outbox[0]
+        self.assertEqual(provider, 'sendgrid')
+        self.assertEqual(payload['message_id'], message_id)
+        self.assertEqual(payload['subject'], 'Update')
+        self.assertEqual(
+            sorted((p['to'][0]['email'], p['custom_args']) for p in payload['personalizations']),
+            [('a@example.com', {'notification_id': '1'}), ('b@example.com', {'notification_id': '2'})]
+        )
+
+
+def run_group_eagerly(signatures):
+    """Stand-in for celery.group that runs each task in-process when applied"""
+    signatures = list(signatures)
+    applied = mock.Mock()
+    applied.apply_async.side_effect = lambda: [signature.apply() for signature in signatures]
+    return applied
+
+
+@override_settings(NOTIFICATION_PROVIDER_MODE='stub')
+class NotificationCampaignTests(TestCase):
+    """Campaign progress and email batches"""
+
+    def setUp(self):
+        providers.reset_clients()
+        providers.stub_outbox.clear()
+        self.addCleanup(providers.reset_clients)
+        self.addCleanup(providers.stub_outbox.clear)
+        self.users = [
+            User.objects.create(username=f'user{i}', email=f'user{i}@example.com', role='patient') for i in range(3)
+        ]
+
+    def test_progress_is_counted_in_the_database(self):
+        user_ids = [user.id for user in self.users] + [self.users[0].id, 999999]
+        NotificationDispatchService.start_progress('campaign', 'email', len(set(user_ids)))
+        with mock.patch('notifications.services.group', side_effect=run_group_eagerly):
+            created = dispatch_notification_campaign('campaign', user_ids, 'system_update', 'email', 'Update', 'Hello', {})
+
+        self.assertEqual(created, 3)
+        self.assertEqual(NotificationDispatchService.get_progress('campaign'), {
+            'campaign_id': 'campaign', 'channel': 'email', 'recipients': 3,
+            'created': 3, 'sent': 3, 'failed': 0, 'finished': True,
+        })
+        self.assertIsNone(NotificationDispatchService.get_progress('unknown'))
+
+    def test_email_batch_is_sent_per_content(self):
+        notifications = [
+            Notification.objects.create(
+                user=user, notification_type='system_update', channel='email', title=title, message=f'{title} body'
+            )
+            for user, title in zip(self.users, ['First', 'Second', 'First'])
+        ]
+
+        counts = NotificationDispatchService.deliver([notification.id for notification in notifications])
+
+        self.assertEqual(counts, {'sent': 3, 'failed': 0})
+        sent = sorted(
+            (payload['subject'], sorted(p['to'][0]['email'] for p in payload['personalizations']))
+            for provider, payload in providers.stub_outbox
+        )
+        self.assertEqual(sent, [
+            ('First', ['user0@example.com', 'user2@example.com']),
+            ('Second', ['user1@example.com']),
+        ])
@@ -5,10 +5,12 @@ urlpatterns = [
     path('', views.NotificationListView.as_view(), name='notification-list'),
     path('<int:pk>/', views.NotificationDetailView.as_view(), name='notification-detail'),
     path('unread/', views.unread_notifications, name='unread-notifications'),
+    path('unread/count/', views.unread_notification_count, name='unread-notification-count'),
     path('<int:notification_id>/read/', views.mark_notification_read, name='mark-notification-read'),
     path('mark-all-read/', views.mark_all_notifications_read, name='mark-all-notifications-read'),
     path('send/', views.send_notification, name='send-notification'),
     path('send-bulk/', views.send_bulk_notification, name='send-bulk-notification'),
+    path('campaigns/<str:campaign_id>/', views.notification_campaign_status, name='notification-campaign-status'),
     path('stats/', views.notification_stats, name='notification-stats'),
     
     # Notification Services
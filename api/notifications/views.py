@@ -2,10 +2,15 @@ from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
+from django.urls import reverse
+import uuid
 from .models import Notification
 from .serializers import NotificationSerializer, NotificationCreateSerializer, NotificationListSerializer
 from .services import (
+    NotificationCounterService,
+    NotificationDispatchService,
+    dispatch_notification_campaign,
+    deliver_notifications,
     send_appointment_reminder_email,
     send_appointment_reminder_sms,
     send_payment_confirmation_email,
@@ -57,11 +62,6 @@ def unread_notifications(request):
     Get unread notifications for the current user
     """
     user = request.user
-    unread_count = Notification.objects.filter(
-        user=user,
-        read_at__isnull=True
-    ).count()
-    
     recent_unread = Notification.objects.filter(
         user=user,
         read_at__isnull=True
@@ -70,37 +70,42 @@ def unread_notifications(request):
     serializer = NotificationListSerializer(recent_unread, many=True)
     
     return Response({
-        'unread_count': unread_count,
+        'unread_count': NotificationCounterService.unread_count(user.id),
         'notifications': serializer.data
     })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def unread_notification_count(request):
+    """
+    Get the unread badge count for the current user
+    """
+    return Response({
+        'unread_count': NotificationCounterService.unread_count(request.user.id)
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_notification_read(request, notification_id):
     """
     Mark a notification as read
     """
-    try:
-        notification = Notification.objects.get(
-            id=notification_id,
-            user=request.user
-        )
-        
-        if not notification.read_at:
-            notification.read_at = timezone.now()
-            notification.status = 'read'
-            notification.save()
-        
-        return Response({
-            'message': 'Notification marked as read'
-        })
-        
-    except Notification.DoesNotExist:
+    user = request.user
+    if not NotificationCounterService.mark_read(user.id, notification_id) and not Notification.objects.filter(
+        id=notification_id,
+        user=user
+    ).exists():
         return Response(
             {'error': 'Notification not found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    return Response({
+        'message': 'Notification marked as read',
+        'unread_count': NotificationCounterService.unread_count(user.id)
+    })
 
 
 @api_view(['POST'])
@@ -109,17 +114,11 @@ def mark_all_notifications_read(request):
     """
     Mark all notifications as read for the current user
     """
-    user = request.user
-    updated_count = Notification.objects.filter(
-        user=user,
-        read_at__isnull=True
-    ).update(
-        read_at=timezone.now(),
-        status='read'
-    )
+    updated_count = NotificationCounterService.mark_all_read(request.user.id)
     
     return Response({
-        'message': f'{updated_count} notifications marked as read'
+        'message': f'{updated_count} notifications marked as read',
+        'unread_count': NotificationCounterService.unread_count(request.user.id)
     })
 
 
@@ -155,12 +154,11 @@ def send_notification(request):
             metadata=metadata
         )
         
-        # TODO: Send notification via the specified channel
-        # This would integrate with email/SMS/push notification services
+        deliver_notifications.delay([notification.id])
         
         return Response({
             'notification_id': notification.id,
-            'message': 'Notification sent successfully'
+            'message': 'Notification queued for delivery'
         })
         
     except User.DoesNotExist:
@@ -186,35 +184,40 @@ def send_bulk_notification(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    try:
-        from users.models import User
-        users = User.objects.filter(id__in=user_ids)
-        
-        notifications = []
-        for user in users:
-            notification = Notification.objects.create(
-                user=user,
-                notification_type=notification_type,
-                channel=channel,
-                title=title,
-                message=message,
-                metadata=metadata
-            )
-            notifications.append(notification)
-        
-        # TODO: Send notifications via the specified channel
-        # This would integrate with email/SMS/push notification services
-        
-        return Response({
-            'notifications_sent': len(notifications),
-            'message': 'Bulk notification sent successfully'
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    if not isinstance(user_ids, list) or not all(isinstance(user_id, int) for user_id in user_ids):
+        return Response({'error': 'user_ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if channel not in dict(Notification.CHANNEL_CHOICES):
+        return Response({'error': f'Unknown channel: {channel}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Rows are created and delivered in the background: bulk_create in chunks,
+    # then one Celery group per chunk over batched provider calls
+    campaign_id = uuid.uuid4().hex
+    recipients = len(set(user_ids))
+    NotificationDispatchService.start_progress(campaign_id, channel, recipients)
+    dispatch_notification_campaign.delay(
+        campaign_id, user_ids, notification_type, channel, title, message, metadata
+    )
+    
+    status_url = reverse('notification-campaign-status', kwargs={'campaign_id': campaign_id})
+    return Response({
+        'campaign_id': campaign_id,
+        'recipients': recipients,
+        'status_url': request.build_absolute_uri(status_url),
+        'message': 'Bulk notification queued for delivery'
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
+def notification_campaign_status(request, campaign_id):
+    """
+    Get delivery progress for a bulk notification (admin only)
+    """
+    progress = NotificationDispatchService.get_progress(campaign_id)
+    if progress is None:
+        return Response({'error': 'Campaign not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(progress)
 
 
 @api_view(['GET'])
@@ -4,9 +4,9 @@ from users.models import User
 
 
 class RTCRoom(models.Model):
-    \"\"\"
+    """
     WebRTC room for video consultations
-    \"\"\"
+    """
     STATUS_CHOICES = [
         ('created', 'Created'),
         ('active', 'Active'),
@@ -34,13 +34,13 @@ class RTCRoom(models.Model):
         verbose_name_plural = 'RTC Rooms'
     
     def __str__(self):
-        return f\"Room {self.room_id} - {self.appointment}\"
+        return f"Room {self.room_id} - {self.appointment}"
 
 
 class RTCSignal(models.Model):
-    \"\"\"
+    """
     WebRTC signaling messages
-    \"\"\"
+    """
     SIGNAL_TYPE_CHOICES = [
         ('offer', 'Offer'),
         ('answer', 'Answer'),
@@ -63,13 +63,13 @@ class RTCSignal(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f\"{self.signal_type} from {self.sender.get_full_name()} in {self.room.room_id}\"
+        return f"{self.signal_type} from {self.sender.get_full_name()} in {self.room.room_id}"
 
 
 class RTCJoinToken(models.Model):
-    \"\"\"
+    """
     Short-lived tokens for joining RTC rooms
-    \"\"\"
+    """
     room = models.ForeignKey(RTCRoom, on_delete=models.CASCADE, related_name='join_tokens')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rtc_join_tokens')
     token = models.CharField(max_length=500)
@@ -83,4 +83,4 @@ class RTCJoinToken(models.Model):
         verbose_name_plural = 'RTC Join Tokens'
     
     def __str__(self):
-        return f\"Join token for {self.user.get_full_name()} in {self.room.room_id}\"
+        return f"Join token for {self.user.get_full_name()} in {self.room.room_id}"
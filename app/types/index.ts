@@ -46,6 +46,20 @@ export interface Doctor {
   reviews?: DoctorReview[]
 }
 
+// Slim doctor embedded in other resources, e.g. Appointment.doctor
+export interface DoctorSummary {
+  id: number
+  full_name: string
+  email: string
+  specialties: string[]
+  years_of_experience: number
+  clinic_name?: string
+  clinic_address?: string
+  consultation_fee: number
+  average_rating: number
+  total_reviews: number
+}
+
 export interface DoctorAvailability {
   id: number
   day_of_week: number
@@ -71,7 +85,7 @@ export interface DoctorReview {
 export interface Appointment {
   id: number
   patient: User
-  doctor: Doctor
+  doctor: DoctorSummary
   slot: ScheduleSlot
   appointment_type: 'video' | 'in_person'
   status: 'pending' | 'confirmed' | 'in_progress' | 'completed' | 'cancelled' | 'no_show' | 'refunded'
@@ -43,7 +43,21 @@ export interface Doctor {
   average_rating: number
   total_reviews: number
   availability?: DoctorAvailability[]
-  reviews?: DoctorReview[]
+  review_summary?: DoctorReviewSummary
+}
+
+// Slim doctor embedded in other resources, e.g. Appointment.doctor
+export interface DoctorSummary {
+  id: number
+  full_name: string
+  email: string
+  specialties: string[]
+  years_of_experience: number
+  clinic_name?: string
+  clinic_address?: string
+  consultation_fee: number
+  average_rating: number
+  total_reviews: number
 }
 
 export interface DoctorAvailability {
@@ -67,11 +81,19 @@ export interface DoctorReview {
   created_at: string
 }
 
+export interface DoctorReviewSummary {
+  total_reviews: number
+  average_rating: string
+  category_averages: Record<'communication' | 'treatment' | 'punctuality', string>
+  histogram: Record<'1' | '2' | '3' | '4' | '5', number>
+  recent: DoctorReview[]
+}
+
 // Appointment types
 export interface Appointment {
   id: number
   patient: User
-  doctor: Doctor
+  doctor: DoctorSummary
   slot: ScheduleSlot
   appointment_type: 'video' | 'in_person'
   status: 'pending' | 'confirmed' | 'in_progress' | 'completed' | 'cancelled' | 'no_show' | 'refunded'